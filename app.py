@@ -1,16 +1,29 @@
 import streamlit as st
+import logging
 import os
-import base64
-from pathlib import Path
+import time
 from dotenv import load_dotenv
-from models.text_rewriter import TextRewriter
-from models.tts_generator import TTSGenerator
+from models.tts_generator import SAMPLE_RATE
+from models.model_registry import get_registry
+from models.tts_process_pool import TTSProcessPool
+from models.incremental_renderer import IncrementalRenderer
 from utils.audio_utils import AudioUtils
+from utils.audio_stitcher import AudioStitcher
+from utils.audio_encoders import FORMATS
+from utils.book_index import BookIndex, MAX_SECTION_CHARS
+from utils.dialogue import Line, parse_dialogue, cast_voices, format_script
+from utils.text_chunker import TextChunker
 from utils.session_manager import SessionManager
+from utils.job_queue import get_job_queue, DONE, FAILED, RUNNING
+from utils.metrics import start_exporters, trace_span
 
 # Load environment variables
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("ECHOVERSE_LOG_LEVEL", "INFO"),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("echoverse.app")
+
 # Page configuration
 st.set_page_config(
     page_title="EchoVerse - AI Audiobook Creator",
@@ -210,18 +223,49 @@ def load_css():
     """
     st.markdown(css, unsafe_allow_html=True)
 
+@st.cache_resource
+def load_models():
+    """Load and warm up shared models once per process"""
+    # /metrics endpoint and/or metrics file, as configured through ECHOVERSE_METRICS_*
+    start_exporters()
+    registry = get_registry()
+    registry.warmup()
+    return registry
+
 def initialize_session_state():
     """Initialize session state variables"""
+    registry = load_models()
     if 'narrations' not in st.session_state:
         st.session_state.narrations = []
+    # Sessions hold references to the shared models, never their own copies
     if 'text_rewriter' not in st.session_state:
-        st.session_state.text_rewriter = TextRewriter()
+        st.session_state.text_rewriter = registry.get("text_rewriter")
     if 'tts_generator' not in st.session_state:
-        st.session_state.tts_generator = TTSGenerator()
+        st.session_state.tts_generator = registry.get("tts_generator")
     if 'session_manager' not in st.session_state:
         st.session_state.session_manager = SessionManager()
     if 'selected_voice' not in st.session_state:
         st.session_state.selected_voice = "Tina (Female - US)"
+    if 'job_ids' not in st.session_state:
+        st.session_state.job_ids = []
+    if 'job_errors' not in st.session_state:
+        st.session_state.job_errors = []
+
+def index_upload(uploaded_file) -> BookIndex:
+    """Chapter index of an uploaded file, built once per upload and kept across reruns"""
+    file_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    cached = st.session_state.get('book_index')
+    if cached is None or cached[0] != file_key:
+        cached = (file_key, BookIndex.build(uploaded_file))
+        st.session_state.book_index = cached
+    return cached[1]
+
+@st.cache_resource
+def get_tts_pool():
+    """Shared multi-process synthesis pool, enabled by setting ECHOVERSE_TTS_WORKERS > 1"""
+    if int(os.getenv("ECHOVERSE_TTS_WORKERS", "0")) > 1:
+        return TTSProcessPool()
+    return None
 
 def get_voice_options():
     """Return available voice options with gender and accent info"""
@@ -285,6 +329,36 @@ def main():
             st.markdown("### 🔧 Advanced Settings")
             max_length = st.slider("Max tokens for rewriting", 100, 600, 300, 50)  # Reduced max to 600
             audio_speed = st.slider("Audio speed", 0.5, 2.0, 1.0, 0.1)
+            long_form = st.checkbox(
+                "📚 Long-form mode",
+                value=True,
+                help="Narrate the full text by splitting it into chunks instead of truncating it"
+            )
+            incremental = st.checkbox(
+                "♻️ Reuse unchanged passages",
+                value=True,
+                disabled=not long_form,
+                help="When you regenerate an edited text, only the passages that changed are rewritten and re-synthesized"
+            )
+            dialogue = st.checkbox(
+                "🗣️ Multi-voice dialogue",
+                value=False,
+                help="Voice quoted speech and tagged lines (\"ALICE: ...\") with a different voice per character; "
+                     "the selected voice narrates"
+            )
+            # Incremental renders join WAV passages as they are; compressed formats re-encode the whole document
+            reuse_passages = long_form and incremental
+            output_format = st.selectbox(
+                "💾 Output format",
+                options=list(FORMATS.keys()),
+                index=list(FORMATS.keys()).index("wav" if reuse_passages else "mp3"),
+                format_func=lambda key: FORMATS[key]["label"],
+                help="Compressed formats make downloads and session history much smaller"
+                     + ("; with passage reuse they are encoded again in full on every render" if reuse_passages else "")
+            )
+            bitrate_kbps = None
+            if output_format == "mp3":
+                bitrate_kbps = st.select_slider("MP3 bitrate (kbps)", options=[32, 48, 64, 96, 128, 160], value=64)
             
             # Statistics
             st.markdown("### 📊 Session Stats")
@@ -295,6 +369,19 @@ def main():
                 <div>Narrations Created</div>
             </div>
             """, unsafe_allow_html=True)
+            with st.expander("🧠 Model stats", expanded=False):
+                for name, model_stats in load_models().stats().items():
+                    st.caption(
+                        f"**{name}**: loaded in {model_stats['load_seconds']:.1f}s, "
+                        f"{model_stats['parameter_bytes'] / 1024 / 1024:.0f} MB parameters, "
+                        f"+{model_stats['rss_delta_bytes'] / 1024 / 1024:.0f} MB RSS"
+                    )
+            cache_stats = st.session_state.tts_generator.get_cache_stats()
+            if cache_stats:
+                st.caption(
+                    f"Audio cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                    f"({cache_stats['hit_rate']:.0%}), {cache_stats['bytes'] / 1024 / 1024:.1f} MB"
+                )
         
         # Main content area
         col1, col2 = st.columns([2, 1], gap="large")
@@ -311,11 +398,12 @@ def main():
             )
             
             text_input = ""
+            load_text = None  # Uploads are only decoded once generation starts
             if input_method == "Type/Paste Text":
                 text_input = st.text_area(
                     "Enter your text here:",
                     height=250,
-                    placeholder="Paste your text here or upload a .txt file...\n\nTip: Keep text under 600 tokens for full reading!",
+                    placeholder="Paste your text here or upload a .txt file...\n\nTip: Enable long-form mode in the sidebar to narrate full chapters!",
                     help="Enter the text you want to convert to an audiobook"
                 )
             else:
@@ -326,15 +414,27 @@ def main():
                 )
                 if uploaded_file:
                     try:
-                        text_input = uploaded_file.read().decode('utf-8', errors='replace')  # Robust decoding
-                        st.success(f"✅ File uploaded successfully! ({len(text_input)} characters)")
+                        book = index_upload(uploaded_file)
+                        st.success(f"✅ File uploaded successfully! ({book.characters:,} characters, "
+                                   f"{len(book.sections)} sections)")
+                        section_labels = [f"{section.title} ({section.characters:,} characters)"
+                                          for section in book.sections]
+                        # Small files are narrated whole; for books, start with the first section
+                        default_sections = (list(range(len(book.sections)))
+                                            if book.characters <= MAX_SECTION_CHARS else [0])
+                        selected_sections = st.multiselect(
+                            "Chapters to narrate:",
+                            options=list(range(len(book.sections))),
+                            default=default_sections,
+                            format_func=section_labels.__getitem__,
+                            help="Only the selected chapters are read from the file"
+                        )
                         with st.expander("📄 File Content Preview", expanded=False):
-                            st.text_area(
-                                "Preview:",
-                                text_input[:1000] + "..." if len(text_input) > 1000 else text_input,
-                                height=150,
-                                disabled=True
-                            )
+                            preview_section = book.sections[selected_sections[0] if selected_sections else 0]
+                            st.text_area("Preview:", book.preview(uploaded_file, preview_section),
+                                         height=150, disabled=True)
+                        load_text = lambda: book.read(uploaded_file, [book.sections[index]
+                                                                      for index in selected_sections])
                     except Exception as e:
                         st.error(f"❌ Error reading file: {str(e)}")
             
@@ -342,10 +442,18 @@ def main():
             generate_col1, generate_col2, generate_col3 = st.columns([1, 2, 1])
             with generate_col2:
                 if st.button("🎯 Generate Audiobook", type="primary", use_container_width=True):
+                    if load_text is not None:
+                        text_input = load_text()
                     if not text_input.strip():
                         st.error("⚠️ Please provide some text to convert.")
                     else:
-                        generate_audiobook(text_input, tone, st.session_state.selected_voice, voice_options, max_length, audio_speed)
+                        generate_audiobook(text_input, tone, st.session_state.selected_voice, voice_options, max_length, audio_speed, long_form,
+                                           output_format, bitrate_kbps, incremental, dialogue)
+            
+            # Jobs poll once a second while any are queued or running, without rerunning the whole page
+            has_active_jobs = bool(st.session_state.job_ids)
+            st.fragment(display_jobs, run_every=1.0 if has_active_jobs else None)()
+            display_last_result()
         
         with col2:
             st.markdown('<h2 class="section-header">📚 Past Narrations</h2>', unsafe_allow_html=True)
@@ -353,79 +461,238 @@ def main():
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-def generate_audiobook(text, tone, selected_voice, voice_options, max_length, audio_speed):
-    progress_container = st.container()
-    with progress_container:
-        st.markdown('<div class="progress-container">', unsafe_allow_html=True)
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        st.markdown('</div>', unsafe_allow_html=True)
-    
+def generate_audiobook(text, tone, selected_voice, voice_options, max_length, audio_speed, long_form=False,
+                       output_format="wav", bitrate_kbps=None, incremental=False, dialogue=False):
+    """Queue an audiobook job; it runs in the background and is polled by display_jobs"""
+    voice_info = voice_options[selected_voice]
+    # Characters are cast from the other voices on offer
+    character_voices = [info["embedding_id"] for info in voice_options.values()] if dialogue else None
+    # Validate embedding_id against gender (debugging)
+    logger.info("Queueing voice: %s, Embedding ID: %s, Expected Gender: %s",
+                selected_voice, voice_info['embedding_id'], voice_info['gender'])
     try:
-        # Step 1: Rewrite text (truncate before rewriting to fit 600-token limit)
-        status_text.markdown("🔄 **Step 1/3:** Rewriting text with selected tone...")
-        progress_bar.progress(25)
-        # Truncate text to max_length (capped at 600 for model compatibility)
-        truncated_text = text[:max_length] if len(text) > max_length else text
-        print(f"Truncated text length: {len(truncated_text)} characters")
-        rewritten_text = st.session_state.text_rewriter.rewrite_text(truncated_text, tone, max_length=max_length)
-        print(f"Rewritten text length: {len(rewritten_text)} characters")
-        
-        # Step 2: Generate speech with validated voice
-        status_text.markdown("🎤 **Step 2/3:** Converting text to speech...")
-        progress_bar.progress(60)
-        
-        voice_info = voice_options[selected_voice]
-        expected_gender = voice_info["gender"]
-        embedding_id = voice_info["embedding_id"]
-        
-        # Validate embedding_id against gender (debugging)
-        print(f"Generating with voice: {selected_voice}, Embedding ID: {embedding_id}, Expected Gender: {expected_gender}")
-        audio_data = st.session_state.tts_generator.generate_speech(
-            rewritten_text, 
-            voice_embedding_id=embedding_id,
-            speed=audio_speed
+        job_id = get_job_queue().submit(
+            st.session_state.session_manager.session_id,
+            run_generation_job,
+            text, tone, selected_voice, voice_info["embedding_id"], max_length, audio_speed, long_form,
+            output_format, bitrate_kbps, incremental, character_voices,
+            # Models are handed over here: job threads have no access to session state
+            text_rewriter=st.session_state.text_rewriter,
+            tts_generator=st.session_state.tts_generator,
+            executor=get_tts_pool() if long_form or dialogue else None,
+            description=f"{selected_voice} · {tone.title()} · {len(text)} chars"
         )
-        
+    except RuntimeError as e:
+        st.markdown(f"""
+        <div class="toast-error">
+            ⚠️ <strong>Could not queue audiobook:</strong> {str(e)}
+        </div>
+        """, unsafe_allow_html=True)
+        return
+    st.session_state.job_ids.append(job_id)
+
+def run_generation_job(job, text, tone, selected_voice, embedding_id, max_length, audio_speed, long_form,
+                       output_format, bitrate_kbps, incremental, character_voices, text_rewriter, tts_generator,
+                       executor=None):
+    """Rewrite, synthesize and encode one audiobook on a job thread (no Streamlit calls in here)"""
+    # One trace per audiobook; every stage span below nests under it
+    with trace_span("generate_audiobook", job_id=job.job_id, long_form=long_form, characters=len(text)):
+        if character_voices:
+            # Step 1: Rewrite the narration; characters' speech is kept word for word
+            job.update(0.05, "🔄 **Step 1/3:** Rewriting narration with selected tone...")
+            lines = parse_dialogue(text)
+            voices = cast_voices(lines, embedding_id, character_voices)
+            logger.info("Dialogue cast: %s", {speaker or "narrator": voice for speaker, voice in voices.items()})
+            lines = rewrite_narration(lines, text_rewriter, tone, max_length,
+                                      progress_callback=lambda done, total: job.update(0.05 + 0.25 * done / total))
+            rewritten_text = format_script(lines)
+
+            # Step 2: Generate speech, each line in its speaker's voice
+            job.update(0.3, "🎤 **Step 2/3:** Converting dialogue to speech...")
+            synthesis_started = time.perf_counter()
+            stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, output_format=output_format, bitrate_kbps=bitrate_kbps)
+            time_to_first_audio = None
+            for speech in tts_generator.stream_dialogue(
+                lines, voices, speed=audio_speed,
+                progress_callback=lambda done, total: job.update(0.3 + 0.6 * done / total),
+                executor=executor
+            ):
+                if stitcher.segment_count == 0:
+                    time_to_first_audio = time.perf_counter() - synthesis_started
+                    job.update(preview=speech, time_to_first_audio=time_to_first_audio)
+                stitcher.add(speech)
+            clip = stitcher.finish_clip()
+        elif long_form and incremental:
+            # Passages are rewritten and narrated together; ones unchanged since an earlier render are reused
+            job.update(0.05, "🔄 **Steps 1-2/3:** Rewriting and narrating changed passages...")
+            synthesis_started = time.perf_counter()
+            render = IncrementalRenderer(tts_generator, text_rewriter, executor=executor).render(
+                text, tone, voice_embedding_id=embedding_id, speed=audio_speed, max_length=max_length,
+                output_format=output_format, bitrate_kbps=bitrate_kbps,
+                # Raises JobCancelled between windows once the user cancels
+                progress_callback=lambda done, total: job.update(0.05 + 0.85 * done / total),
+                preview_callback=lambda speech: job.update(
+                    preview=speech, time_to_first_audio=time.perf_counter() - synthesis_started
+                ),
+            )
+            logger.info("Reused %d of %d passages", render.reused, render.segments)
+            rewritten_text, clip, time_to_first_audio = render.text, render.clip, render.time_to_first_audio
+        else:
+            # Step 1: Rewrite text
+            job.update(0.05, "🔄 **Step 1/3:** Rewriting text with selected tone...")
+            if long_form:
+                rewritten_text = text_rewriter.rewrite_long_text(
+                    text, tone, max_length=max_length,
+                    progress_callback=lambda done, total: job.update(0.05 + 0.25 * done / total)
+                )
+            else:
+                # Truncate text to max_length (capped at 600 for model compatibility)
+                truncated_text = text[:max_length] if len(text) > max_length else text
+                logger.debug("Truncated text length: %d characters", len(truncated_text))
+                rewritten_text = text_rewriter.rewrite_text(truncated_text, tone, max_length=max_length)
+            logger.debug("Rewritten text length: %d characters", len(rewritten_text))
+    
+            # Step 2: Generate speech
+            job.update(0.3 if long_form else 0.6, "🎤 **Step 2/3:** Converting text to speech...")
+            synthesis_started = time.perf_counter()
+            if long_form:
+                # Stream segments so the first one can be previewed while the rest render
+                stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, output_format=output_format, bitrate_kbps=bitrate_kbps)
+                time_to_first_audio = None
+                for speech in tts_generator.stream_speech(
+                    rewritten_text,
+                    voice_embedding_id=embedding_id,
+                    speed=audio_speed,
+                    # Raises JobCancelled between chunks once the user cancels
+                    progress_callback=lambda done, total: job.update(0.3 + 0.6 * done / total),
+                    executor=executor
+                ):
+                    if stitcher.segment_count == 0:
+                        time_to_first_audio = time.perf_counter() - synthesis_started
+                        job.update(preview=speech, time_to_first_audio=time_to_first_audio)
+                    stitcher.add(speech)
+                clip = stitcher.finish_clip()
+            else:
+                clip = tts_generator.generate_speech(
+                    rewritten_text, 
+                    voice_embedding_id=embedding_id,
+                    speed=audio_speed,
+                    output_format=output_format,
+                    bitrate_kbps=bitrate_kbps
+                )
+                time_to_first_audio = time.perf_counter() - synthesis_started
+    
         # Step 3: Process and save
-        status_text.markdown("💾 **Step 3/3:** Processing audio...")
-        progress_bar.progress(90)
-        audio_file = AudioUtils.save_audio(audio_data, rewritten_text[:50])
-        
-        progress_bar.progress(100)
-        status_text.markdown("✅ **Complete!** Audiobook generated successfully!")
-        
-        display_results(text, audio_data, audio_file, tone, selected_voice)
-        
-        st.session_state.session_manager.add_narration({
+        job.update(0.9, "💾 **Step 3/3:** Processing audio...")
+        audio_file = AudioUtils.save_audio(clip, rewritten_text[:50])
+        clip.encoded  # Encode on the job thread, not in the next rerun
+    
+        return {
             'original_text': text[:100] + "..." if len(text) > 100 else text,
+            'full_text': text,
             'rewritten_text': rewritten_text,
             'tone': tone,
             'voice': selected_voice,
             'audio_file': audio_file,
-            'audio_data': audio_data,
-            'timestamp': st.session_state.session_manager.get_timestamp()
-        })
-        
-        import time
-        time.sleep(2)
-        progress_container.empty()
-        st.markdown("""
-        <div class="toast-success">
-            🎉 <strong>Success!</strong> Your audiobook has been generated and added to your session history.
-        </div>
-        """, unsafe_allow_html=True)
+            'audio': clip,
+            'time_to_first_audio': time_to_first_audio,
+        }
+
+def rewrite_narration(lines, text_rewriter, tone, max_length, progress_callback=None):
+    """Rewrite the narration lines of parsed dialogue in one batch, leaving speech untouched"""
+    chunker = TextChunker(max_length)
+    narration = [index for index, line in enumerate(lines) if line.speaker is None]
+    chunks = [chunker.split(lines[index].text) for index in narration]
+    rewritten = iter(text_rewriter.rewrite_many([chunk for line_chunks in chunks for chunk in line_chunks], tone,
+                                                max_length=max_length, progress_callback=progress_callback))
+    lines = list(lines)
+    for index, line_chunks in zip(narration, chunks):
+        lines[index] = Line("\n\n".join(next(rewritten) for _ in line_chunks), None)
+    return lines
+
+def collect_finished_job(job):
+    """Move a finished job's audio into session history and remember it for display"""
+    result = dict(job.result)
+    full_text = result.pop('full_text')
+    time_to_first_audio = result.pop('time_to_first_audio')
+    session_manager = st.session_state.session_manager
+    session_manager.add_narration({**result, 'timestamp': session_manager.get_timestamp()})
+    st.session_state.last_result = {
+        'narration': session_manager.get_narrations()[-1],
+        'original_text': full_text,
+        'time_to_first_audio': time_to_first_audio,
+        'announced': False,
+    }
+
+def display_jobs():
+    """Show queued and running jobs; reruns itself on a timer while any are active"""
+    queue = get_job_queue()
+    finished_any = False
+    for job_id in list(st.session_state.job_ids):
+        job = queue.get(job_id)
+        if job is None:
+            st.session_state.job_ids.remove(job_id)
+            continue
+        if job.finished:
+            if job.state == DONE:
+                collect_finished_job(job)
+            elif job.state == FAILED:
+                st.session_state.job_errors.append(job.error)
+            queue.forget(job_id)
+            finished_any = True
+            st.session_state.job_ids.remove(job_id)
+            continue
         
-    except Exception as e:
-        status_text.markdown(f"❌ **Error:** {str(e)}")
-        progress_bar.empty()
+        with st.container(border=True):
+            st.markdown(f"**{job.description}**")
+            status_col, cancel_col = st.columns([4, 1])
+            with status_col:
+                st.progress(job.progress)
+                status = job.message if job.state == RUNNING else f"⏳ Queued ({job.job_id})"
+                if job.cancel_requested:
+                    status = "🛑 Cancelling..."
+                st.markdown(status)
+            with cancel_col:
+                if st.button("Cancel", key=f"cancel_{job_id}", disabled=job.cancel_requested):
+                    queue.cancel(job_id)
+            
+            preview = job.details.get('preview')
+            if preview is not None:
+                st.caption(f"⏱️ Time to first audio: {job.details['time_to_first_audio']:.2f}s")
+                st.audio(preview, sample_rate=SAMPLE_RATE)
+    
+    if finished_any:
+        st.rerun()  # Full rerun so results and history pick up the change
+
+def display_last_result():
+    """Show the most recently finished job and any failures since the last rerun"""
+    for error in st.session_state.job_errors:
         st.markdown(f"""
         <div class="toast-error">
-            ⚠️ <strong>Error generating audiobook:</strong> {str(e)}
+            ⚠️ <strong>Error generating audiobook:</strong> {error}
         </div>
         """, unsafe_allow_html=True)
+    st.session_state.job_errors = []
+    
+    last_result = st.session_state.get('last_result')
+    if not last_result:
+        return
+    narration = last_result['narration']
+    clip = st.session_state.session_manager.get_audio(narration)
+    if clip is None:
+        return
+    display_results(last_result['original_text'], clip, narration['audio_file'], narration['tone'],
+                    narration['voice'], last_result['time_to_first_audio'])
+    if last_result['announced']:
+        return
+    last_result['announced'] = True
+    st.markdown("""
+    <div class="toast-success">
+        🎉 <strong>Success!</strong> Your audiobook has been generated and added to your session history.
+    </div>
+    """, unsafe_allow_html=True)
         
-def display_results(original_text, audio_data, audio_file, tone, voice):
+def display_results(original_text, clip, audio_file, tone, voice, time_to_first_audio=None):
     """Display results with enhanced styling"""
     
     st.markdown('<h2 class="section-header">📊 Generation Results</h2>', unsafe_allow_html=True)
@@ -441,21 +708,24 @@ def display_results(original_text, audio_data, audio_file, tone, voice):
     st.markdown("### 🎧 Audio Playback & Download")
     
     # Audio info
-    duration = AudioUtils.get_audio_duration(audio_data)
+    # The clip carries its metadata; no decode or header probe needed
+    duration = clip.duration
     st.markdown(f"""
     **Voice:** {voice} | **Tone:** {tone.title()} | **Duration:** {duration:.1f}s
     """)
+    if time_to_first_audio is not None:
+        st.caption(f"⏱️ Time to first audio: {time_to_first_audio:.2f}s")
     
     col1, col2 = st.columns([3, 1])
     with col1:
-        st.audio(audio_data, format='audio/wav')
+        st.audio(clip.encoded, format=clip.mime)
     
     with col2:
         st.download_button(
-            label="📥 Download MP3",
-            data=audio_data,
+            label=f"📥 Download {audio_file.rsplit('.', 1)[-1].upper()}",
+            data=clip.encoded,
             file_name=audio_file,
-            mime="audio/wav",
+            mime=clip.mime,
             use_container_width=True
         )
     
@@ -482,23 +752,38 @@ def display_past_narrations():
                 <strong>Text:</strong> {narration['original_text']}<br>
                 <strong>Voice:</strong> {narration['voice']}<br>
                 <strong>Tone:</strong> {narration['tone'].title()}<br>
+                <strong>Duration:</strong> {narration['audio_meta'].duration if narration.get('audio_meta') else 0:.1f}s<br>
                 <strong>Time:</strong> {narration['timestamp']}
             </div>
             """, unsafe_allow_html=True)
             
+            session_manager = st.session_state.session_manager
+            if not session_manager.has_audio(narration):
+                st.caption("🗄️ Audio was evicted from storage to stay within the memory budget.")
+                continue
+            
+            # Audio lives in the spill store and is only loaded when requested
             col1, col2 = st.columns(2)
             with col1:
                 if st.button(f"🔄 Replay", key=f"replay_{i}"):
-                    st.audio(narration['audio_data'], format='audio/wav')
+                    clip = session_manager.get_audio(narration)
+                    if clip is not None:
+                        st.audio(clip.encoded, format=clip.mime)
             
             with col2:
-                st.download_button(
-                    label="📥 Re-download",
-                    data=narration['audio_data'],
-                    file_name=narration['audio_file'],
-                    mime="audio/wav",
-                    key=f"download_{i}"
-                )
+                if st.session_state.get('prepared_download') == narration['audio_ref']:
+                    clip = session_manager.get_audio(narration)
+                    if clip is not None:
+                        st.download_button(
+                            label="💾 Save file",
+                            data=clip.encoded,
+                            file_name=narration['audio_file'],
+                            mime=clip.mime,
+                            key=f"download_{i}"
+                        )
+                elif st.button("📥 Re-download", key=f"prepare_download_{i}"):
+                    st.session_state.prepared_download = narration['audio_ref']
+                    st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
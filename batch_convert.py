@@ -0,0 +1,348 @@
+"""
+Convert a directory of .txt files into audiobooks without the Streamlit UI.
+
+Each book is rewritten in the chosen tone, split into token-budgeted chunks
+and synthesized, optionally across a pool of worker processes. Rewritten
+chunks and synthesized chunk audio are checkpointed as they finish, so an
+interrupted run resumes where it stopped instead of starting the book over.
+A JSON manifest records per-book status, settings and timings, and a
+throughput summary is printed at the end.
+
+Usage (from the repository root):
+    python batch_convert.py books/ audiobooks/ --workers 4 --tone suspenseful --format mp3
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from models.rewrite_backends import BACKENDS, create_backend
+from models.text_rewriter import TextRewriter
+from models.tts_generator import TTSGenerator, SAMPLE_RATE, MAX_CHUNK_TOKENS, MAX_INPUT_TOKENS, BATCH_SIZE
+from models.tts_process_pool import TTSProcessPool
+from utils.audio_cache import AudioCache
+from utils.audio_encoders import FORMATS
+from utils.audio_stitcher import AudioStitcher
+from utils.metrics import get_metrics, start_exporters, trace_span
+from utils.text_chunker import TextChunker
+
+MANIFEST_NAME = "manifest.json"
+CHECKPOINT_DIR = ".checkpoints"
+REWRITE_WINDOW = 16  # Rewrite chunks sent per checkpointed round
+
+logger = logging.getLogger(__name__)
+
+
+def _write_atomic(path: str, write):
+    """Write through a temporary file so a crash never leaves a partial file behind"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"books": {}}
+
+
+def save_manifest(path: str, manifest: dict):
+    _write_atomic(path, lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")))
+
+
+class BatchConverter:
+    def __init__(self, output_dir: str, tts_generator: TTSGenerator, text_rewriter: TextRewriter = None,
+                 executor: TTSProcessPool = None, tone: str = "neutral", voice_embedding_id: int = 9000,
+                 speed: float = 1.0, max_length: int = 300, output_format: str = "mp3",
+                 bitrate_kbps: int = None, keep_checkpoints: bool = False):
+        """
+        Convert books one at a time, checkpointing every finished chunk
+
+        Args:
+            output_dir: Directory for audiobooks, the manifest and checkpoints
+            tts_generator: Generator used for chunking, caching and speed changes
+            text_rewriter: Rewriter for the tone pass (None to narrate the text as is)
+            executor: Optional TTSProcessPool to shard chunks across processes
+            tone: Rewrite tone
+            voice_embedding_id: ID of the voice embedding to use
+            speed: Audio playback speed multiplier
+            max_length: Maximum length of each rewritten chunk
+            output_format: Output format key ("wav", "mp3", "ogg" or "flac")
+            bitrate_kbps: MP3 bitrate when output_format is "mp3"
+            keep_checkpoints: Keep chunk checkpoints after a book is finished
+        """
+        self.output_dir = output_dir
+        self.tts_generator = tts_generator
+        self.text_rewriter = text_rewriter
+        self.executor = executor
+        self.voice_embedding_id = voice_embedding_id
+        self.speed = speed
+        self.output_format = output_format
+        self.bitrate_kbps = bitrate_kbps
+        self.keep_checkpoints = keep_checkpoints
+        self.settings = {
+            "rewrite_model": text_rewriter.model_id if text_rewriter is not None else None,
+            "tone": tone if text_rewriter is not None else None,
+            "max_length": max_length,
+            "voice_embedding_id": voice_embedding_id,
+            "speed": speed,
+            "output_format": output_format,
+            "bitrate_kbps": bitrate_kbps,
+            "model_revision": tts_generator.model_revision,
+        }
+        self.window = BATCH_SIZE * 4 * (executor.num_workers if executor is not None else 1)
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self.manifest = load_manifest(self.manifest_path)
+        os.makedirs(os.path.join(output_dir, CHECKPOINT_DIR), exist_ok=True)
+
+    def is_done(self, name: str, source_sha1: str) -> bool:
+        """Whether a book was already converted, fully rewritten, from the same source with the same settings"""
+        entry = self.manifest["books"].get(name)
+        return (entry is not None and entry["status"] == "done" and entry["source_sha1"] == source_sha1
+                and not entry.get("rewrite_chunks_failed")
+                and entry["settings"] == self.settings
+                and os.path.exists(os.path.join(self.output_dir, entry["output"])))
+
+    def convert(self, source_path: str) -> dict:
+        """
+        Convert one book, resuming from its checkpoints
+
+        Args:
+            source_path: Path to a UTF-8 .txt file
+
+        Returns:
+            The book's manifest entry
+        """
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        with open(source_path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        source_sha1 = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+        entry = self.manifest["books"].get(name, {})
+        if self.is_done(name, source_sha1):
+            entry["skipped"] = True
+            return entry
+
+        output_name = f"{name}.{FORMATS[self.output_format]['extension']}"
+        entry = {
+            "source": source_path,
+            "source_sha1": source_sha1,
+            "output": output_name,
+            "settings": self.settings,
+            "status": "running",
+            "characters": len(text),
+            "skipped": False,
+        }
+        self.manifest["books"][name] = entry
+        checkpoint_dir = os.path.join(self.output_dir, CHECKPOINT_DIR, name)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        started = time.perf_counter()
+        try:
+            with trace_span("convert_book", book=name, characters=len(text)):
+                self._convert(text, source_sha1, checkpoint_dir, output_name, entry)
+            entry["status"] = "done"
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            logger.exception("Error converting %s", source_path)
+        finally:
+            entry["seconds"] = round(time.perf_counter() - started, 3)
+            if entry["status"] == "running":
+                entry["status"] = "interrupted"
+            save_manifest(self.manifest_path, self.manifest)
+
+        # Chunks whose rewrite failed are retried from the checkpoint on the next run
+        if entry["status"] == "done" and not entry.get("rewrite_chunks_failed") and not self.keep_checkpoints:
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        return entry
+
+    def _convert(self, text: str, source_sha1: str, checkpoint_dir: str, output_name: str, entry: dict):
+        started = time.perf_counter()
+        narration = self._rewrite(text, source_sha1, checkpoint_dir, entry)
+        entry["rewrite_seconds"] = round(time.perf_counter() - started, 3)
+
+        synthesis_started = time.perf_counter()
+        chunk_paths = self._synthesize(narration, checkpoint_dir, entry)
+        entry["synthesis_seconds"] = round(time.perf_counter() - synthesis_started, 3)
+
+        with trace_span("stitch", chunks=len(chunk_paths)):
+            entry["audio_seconds"] = round(self._stitch(chunk_paths, output_name), 3)
+
+    def _rewrite(self, text: str, source_sha1: str, checkpoint_dir: str, entry: dict) -> str:
+        """Rewrite the book in checkpointed rounds of chunks; returns the narration text"""
+        if self.text_rewriter is None:
+            return text
+
+        max_length = self.settings["max_length"]
+        chunks = TextChunker(max_length).split(text)
+        checkpoint_key = hashlib.sha1(
+            f"{source_sha1}\x1f{self.settings['rewrite_model']}\x1f{self.settings['tone']}\x1f{max_length}"
+            .encode("utf-8")
+        ).hexdigest()[:16]
+        checkpoint_path = os.path.join(checkpoint_dir, f"rewrite_{checkpoint_key}.json")
+        # None marks a chunk not rewritten yet; failed rewrites stay None so a later run retries them
+        rewritten = [None] * len(chunks)
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, encoding="utf-8") as f:
+                saved = json.load(f)[:len(chunks)]
+            rewritten[:len(saved)] = saved
+        pending = [index for index, chunk in enumerate(rewritten) if chunk is None]
+
+        entry["rewrite_chunks_total"] = len(chunks)
+        entry["rewrite_chunks_resumed"] = len(chunks) - len(pending)
+        narration = [chunk if chunk is not None else chunks[index] for index, chunk in enumerate(rewritten)]
+        failed_total = 0
+        for start in range(0, len(pending), REWRITE_WINDOW):
+            indices = pending[start:start + REWRITE_WINDOW]
+            failed = set()
+            results = self.text_rewriter.rewrite_many([chunks[index] for index in indices], self.settings["tone"],
+                                                      max_length=max_length, error_callback=failed.add)
+            for position, (index, result) in enumerate(zip(indices, results)):
+                narration[index] = result
+                if position not in failed:
+                    rewritten[index] = result
+            failed_total += len(failed)
+            _write_atomic(checkpoint_path, lambda f: f.write(json.dumps(rewritten).encode("utf-8")))
+            print(f"  rewrite {entry['rewrite_chunks_resumed'] + start + len(indices)}/{len(chunks)} chunks")
+        if failed_total:
+            entry["rewrite_chunks_failed"] = failed_total
+            logger.warning("%d chunks could not be rewritten and are narrated as is; a rerun retries them",
+                           failed_total)
+        return "\n\n".join(narration)
+
+    def _synthesize(self, narration: str, checkpoint_dir: str, entry: dict) -> list:
+        """Synthesize every chunk without a checkpoint; returns checkpoint paths in reading order"""
+        tts = self.tts_generator
+        chunks = TextChunker(min(MAX_CHUNK_TOKENS, MAX_INPUT_TOKENS), count_tokens=tts._count_tokens).split(narration)
+        # File names carry the chunk's audio cache key, so changed text or settings never reuse stale audio
+        chunk_paths = [
+            os.path.join(checkpoint_dir, "chunk_{:05d}_{}.npy".format(
+                index, AudioCache.make_key(chunk, self.voice_embedding_id, self.speed, tts.model_revision)[:16]
+            ))
+            for index, chunk in enumerate(chunks)
+        ]
+        pending = [index for index, path in enumerate(chunk_paths) if not os.path.exists(path)]
+        entry["chunks_total"] = len(chunks)
+        entry["chunks_resumed"] = len(chunks) - len(pending)
+
+        synthesize = self.executor.synthesize if self.executor is not None else None
+        for start in range(0, len(pending), self.window):
+            indices = pending[start:start + self.window]
+            speeches = tts._synthesize_chunks(
+                [(chunks[index], self.voice_embedding_id) for index in indices], self.speed, synthesize=synthesize
+            )
+            for index, speech in zip(indices, speeches):
+                if speech is None:
+                    # Keep timing roughly intact for silent chunks
+                    speech = np.zeros(int(len(chunks[index]) * 0.15 * SAMPLE_RATE), dtype=np.float32)
+                speech = np.asarray(speech, dtype=np.float32)
+                _write_atomic(chunk_paths[index], lambda f: np.save(f, speech))
+            entry["chunks_done"] = entry["chunks_resumed"] + start + len(indices)
+            save_manifest(self.manifest_path, self.manifest)
+            print(f"  synthesis {entry['chunks_done']}/{len(chunks)} chunks")
+        entry["chunks_done"] = len(chunks)
+        return chunk_paths
+
+    def _stitch(self, chunk_paths: list, output_name: str) -> float:
+        """Join checkpointed chunks into the output file; returns its duration in seconds"""
+        stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, output_format=self.output_format,
+                                 bitrate_kbps=self.bitrate_kbps)
+        for path in chunk_paths:
+            stitcher.add(np.load(path, mmap_mode="r"))
+        clip = stitcher.finish_clip()
+        _write_atomic(os.path.join(self.output_dir, output_name), lambda f: f.write(clip.view()))
+        return clip.duration
+
+
+def print_summary(entries: list, wall_seconds: float):
+    converted = [entry for entry in entries if entry.get("status") == "done" and not entry.get("skipped")]
+    skipped = [entry for entry in entries if entry.get("skipped")]
+    failed = [entry for entry in entries if entry.get("status") == "failed"]
+    characters = sum(entry["characters"] for entry in converted)
+    audio_seconds = sum(entry["audio_seconds"] for entry in converted)
+    chunks = sum(entry["chunks_total"] - entry["chunks_resumed"] for entry in converted)
+    resumed = sum(entry["chunks_resumed"] for entry in converted)
+
+    print()
+    print(f"Books: {len(converted)} converted, {len(skipped)} already done, {len(failed)} failed")
+    print(f"Chunks: {chunks} synthesized, {resumed} resumed from checkpoints")
+    print(f"Text: {characters} characters, audio: {audio_seconds / 60:.1f} min, wall time: {wall_seconds:.1f}s")
+    if converted and wall_seconds > 0:
+        print(f"Throughput: {characters / wall_seconds:.0f} chars/s, {chunks / wall_seconds:.2f} chunks/s, "
+              f"{audio_seconds / wall_seconds:.2f}x realtime")
+    for entry in failed:
+        print(f"Failed: {entry['source']}: {entry.get('error')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="Directory of .txt files")
+    parser.add_argument("output_dir", help="Directory for audiobooks, manifest and checkpoints")
+    parser.add_argument("--workers", type=int, default=1, help="Synthesis worker processes (1 runs in-process)")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads per worker")
+    parser.add_argument("--tone", default="neutral", choices=["neutral", "suspenseful", "inspiring"])
+    parser.add_argument("--no-rewrite", action="store_true", help="Narrate the text as is")
+    parser.add_argument("--rewrite-backend", default=None, choices=list(BACKENDS),
+                        help="Rewrite backend (default: ECHOVERSE_REWRITE_BACKEND, or remote)")
+    parser.add_argument("--max-length", type=int, default=300, help="Maximum length of each rewritten chunk")
+    parser.add_argument("--voice", type=int, default=9000, help="Voice embedding ID")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier")
+    parser.add_argument("--format", default="mp3", choices=list(FORMATS), help="Output format")
+    parser.add_argument("--bitrate", type=int, default=None, help="MP3 bitrate in kbps")
+    parser.add_argument("--keep-checkpoints", action="store_true", help="Keep chunk audio after a book is done")
+    parser.add_argument("--metrics-file", default=os.getenv("ECHOVERSE_METRICS_FILE"),
+                        help="Write Prometheus metrics here while running and at the end")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("ECHOVERSE_LOG_LEVEL", "WARNING"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    start_exporters(path=args.metrics_file)
+
+    sources = sorted(
+        os.path.join(args.input_dir, name) for name in os.listdir(args.input_dir) if name.endswith(".txt")
+    )
+    if not sources:
+        print(f"No .txt files in {args.input_dir}")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    tts_generator = TTSGenerator()
+    if args.voice not in tts_generator.voice_bank:
+        print(f"Unknown voice {args.voice}; available: {tts_generator.voice_bank.ids()}")
+        return 1
+    text_rewriter = None if args.no_rewrite else TextRewriter(backend=create_backend(args.rewrite_backend))
+
+    pool = TTSProcessPool(args.workers, args.threads) if args.workers > 1 else None
+    entries = []
+    started = time.perf_counter()
+    with pool if pool is not None else contextlib.nullcontext():
+        converter = BatchConverter(
+            args.output_dir, tts_generator, text_rewriter, executor=pool, tone=args.tone,
+            voice_embedding_id=args.voice, speed=args.speed, max_length=args.max_length,
+            output_format=args.format, bitrate_kbps=args.bitrate, keep_checkpoints=args.keep_checkpoints
+        )
+        try:
+            for number, source in enumerate(sources, 1):
+                print(f"[{number}/{len(sources)}] {source}")
+                entries.append(converter.convert(source))
+        except KeyboardInterrupt:
+            print("Interrupted; rerun the same command to resume from the last checkpoint.")
+            return 130
+        finally:
+            print_summary(entries, time.perf_counter() - started)
+            if args.metrics_file:
+                get_metrics().write_file(args.metrics_file)
+    return 1 if any(entry["status"] == "failed" for entry in entries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Output size and encode time per audio format.
+
+Encodes a speech-like test signal incrementally (in one-second blocks, as the
+stitcher does) and reports file size, effective bitrate, encode time and
+real-time factor for each format.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_encoders --seconds 60 --bitrates 32 64 128
+"""
+import argparse
+import time
+
+from benchmarks.bench_time_stretch import SAMPLE_RATE, make_voice_like
+from utils.audio_encoders import FORMATS, AudioEncoder
+
+
+def encode_blocks(audio, fmt, bitrate_kbps=None):
+    encoder = AudioEncoder(fmt, SAMPLE_RATE, bitrate_kbps=bitrate_kbps)
+    for start in range(0, audio.size, SAMPLE_RATE):
+        encoder.write(audio[start:start + SAMPLE_RATE])
+    return encoder.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60, help="Length of the test clip")
+    parser.add_argument("--bitrates", type=int, nargs="+", default=[32, 64, 128], help="MP3 bitrates to try")
+    args = parser.parse_args()
+
+    audio = make_voice_like(args.seconds)
+    runs = [(fmt, None) for fmt in FORMATS if fmt != "mp3"] + [("mp3", bitrate) for bitrate in args.bitrates]
+
+    wav_size = None
+    print(f"{'format':<14}{'bytes':>12}{'kbps':>8}{'vs wav':>8}{'encode ms':>11}{'x realtime':>12}")
+    for fmt, bitrate in runs:
+        start = time.perf_counter()
+        data = encode_blocks(audio, fmt, bitrate)
+        elapsed = time.perf_counter() - start
+        wav_size = wav_size or (len(data) if fmt == "wav" else None)
+        label = f"{fmt} {bitrate}k" if bitrate else fmt
+        ratio = f"{len(data) / wav_size:>8.2f}" if wav_size else f"{'-':>8}"
+        print(f"{label:<14}{len(data):>12}{len(data) * 8 / args.seconds / 1000:>8.0f}{ratio}"
+              f"{elapsed * 1000:>11.1f}{args.seconds / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Frames and time of guarded decoding against the stock generate_speech loop.
+
+Both loops decode the same sentences one at a time and as one padded batch,
+from the same seed. The report gives frames decoded, wall time, the guarded
+loop's stop reasons, and the frames actually saved (stock minus guarded),
+next to the guarded loop's own frames_saved estimate.
+
+With --random-weights the stop token's bias is pushed far negative, so the
+model never stops on its own: the runaway case the guards are for.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_guarded_decoding
+    python -m benchmarks.bench_guarded_decoding --random-weights --sentences 2   # offline smoke run
+"""
+import argparse
+import time
+
+import torch
+
+from models.guarded_decoding import guarded_generate_speech
+
+SENTENCES = [
+    "The train was late.",
+    "She opened the letter and read it twice before speaking.",
+    "Rain hammered the windows while the town slept, and nobody in the village remembered "
+    "when the old stone bridge had been built or who had built it.",
+]
+SEED = 1234
+
+
+def _load(random_weights: bool):
+    """Acoustic model, batch tokenizer function and speaker embedding"""
+    if not random_weights:
+        from models.tts_generator import TTSGenerator, MAX_INPUT_TOKENS
+
+        generator = TTSGenerator(use_cache=False, guarded=False)
+        tokenize = lambda texts: generator.processor(text=texts, return_tensors="pt", padding=True, truncation=True,
+                                                     max_length=MAX_INPUT_TOKENS)
+        return generator.model, tokenize, generator._get_speaker_embedding(9000)
+
+    from transformers import SpeechT5Config, SpeechT5ForTextToSpeech
+
+    torch.manual_seed(SEED)
+    model = SpeechT5ForTextToSpeech(SpeechT5Config()).eval()
+    with torch.no_grad():
+        model.speech_decoder_postnet.prob_out.bias.fill_(-20.0)
+
+    def tokenize(texts):
+        lengths = [len(text) for text in texts]
+        input_ids = torch.ones(len(texts), max(lengths), dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        for row, text in enumerate(texts):
+            input_ids[row, :len(text)] = torch.tensor([4 + ord(char) % 75 for char in text])
+            attention_mask[row, :len(text)] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+    return model, tokenize, torch.randn(1, 512)
+
+
+def _stock_frames(model, inputs, speakers) -> int:
+    """Frames the stock loop decodes"""
+    if speakers.size(0) == 1:
+        return len(model.generate_speech(inputs["input_ids"], speakers))
+    _, frame_counts = model.generate_speech(inputs["input_ids"], speakers, attention_mask=inputs["attention_mask"],
+                                            return_output_lengths=True)
+    # Every row is decoded for as long as the longest one
+    return max(frame_counts) * speakers.size(0)
+
+
+@torch.inference_mode()
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Use randomly initialized models (no download; output is noise)")
+    parser.add_argument("--sentences", type=int, default=len(SENTENCES),
+                        help="Use only the first N sentences (runaway stock decoding of long ones is slow)")
+    args = parser.parse_args()
+
+    model, tokenize, speaker_embedding = _load(args.random_weights)
+    sentences = SENTENCES[:args.sentences]
+    cases = [(f"sentence {index + 1}", [text]) for index, text in enumerate(sentences)]
+    cases.append((f"batch of {len(sentences)}", sentences))
+
+    print(f"{'case':<14}{'stock frames':>14}{'stock s':>10}{'guarded frames':>16}{'guarded s':>11}"
+          f"{'saved':>8}{'estimate':>10}  stops")
+    for label, texts in cases:
+        inputs = tokenize(texts)
+        speakers = speaker_embedding.expand(len(texts), -1)
+
+        torch.manual_seed(SEED)
+        start = time.perf_counter()
+        stock_frames = _stock_frames(model, inputs, speakers)
+        stock_seconds = time.perf_counter() - start
+
+        torch.manual_seed(SEED)
+        start = time.perf_counter()
+        _, report = guarded_generate_speech(model, inputs["input_ids"], speakers,
+                                            attention_mask=inputs["attention_mask"])
+        guarded_seconds = time.perf_counter() - start
+
+        print(f"{label:<14}{stock_frames:>14}{stock_seconds:>10.2f}{report.frames:>16}{guarded_seconds:>11.2f}"
+              f"{stock_frames - report.frames:>8}{report.frames_saved:>10}  {report.stops}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
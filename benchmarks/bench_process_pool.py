@@ -0,0 +1,64 @@
+"""
+Compare single-process batched synthesis, with and without the pipelined
+spectrogram/vocoder stages, against the TTSProcessPool backend.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_process_pool --chunks 64 --workers 2 4 8 --threads 4
+"""
+import argparse
+import os
+import time
+
+from models.tts_generator import TTSGenerator
+from models.tts_process_pool import TTSProcessPool
+
+SENTENCES = [
+    "The lighthouse keeper climbed the spiral stairs one last time.",
+    "Rain hammered the windows while the town slept.",
+    "She opened the letter and read it twice before speaking.",
+    "Nobody in the village remembered when the bridge was built.",
+    "The train was late, and the platform was nearly empty.",
+    "He counted the coins slowly, as if they might disappear.",
+]
+
+
+def make_items(count):
+    return [(SENTENCES[index % len(SENTENCES)], 9000) for index in range(count)]
+
+
+def time_call(func, items):
+    start = time.perf_counter()
+    func(items)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=64, help="Number of sentence chunks to synthesize")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="Worker counts to try")
+    parser.add_argument("--threads", type=int, default=4, help="Torch threads per worker")
+    args = parser.parse_args()
+
+    items = make_items(args.chunks)
+    print(f"CPU cores: {os.cpu_count()}, chunks: {args.chunks}")
+
+    generator = TTSGenerator(use_cache=False)
+    generator.pipelined = False
+    generator._synthesize_batch(items[:2])  # Warm up
+    baseline = time_call(generator._synthesize_batch, items)
+    print(f"{'backend':<24}{'seconds':>10}{'chunks/s':>12}{'speedup':>10}")
+    print(f"{'single process':<24}{baseline:>10.2f}{args.chunks / baseline:>12.2f}{1.0:>10.2f}")
+    generator.pipelined = True
+    elapsed = time_call(generator._synthesize_batch, items)
+    print(f"{'single process pipelined':<24}{elapsed:>10.2f}{args.chunks / elapsed:>12.2f}{baseline / elapsed:>10.2f}")
+
+    for workers in args.workers:
+        with TTSProcessPool(num_workers=workers, threads_per_worker=args.threads) as pool:
+            pool.warmup()
+            elapsed = time_call(pool.synthesize, items)
+        label = f"pool {workers}x{args.threads}"
+        print(f"{label:<24}{elapsed:>10.2f}{args.chunks / elapsed:>12.2f}{baseline / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Accuracy, latency and memory of int8 quantized inference against fp32.
+
+Each mode is loaded in its own spawned process, so the RSS numbers are not
+polluted by the other model. Both modes synthesize the same sentences with the
+same seeds: SpeechT5's decoder pre-net applies dropout even at inference time,
+so unseeded runs would differ regardless of quantization.
+
+Accuracy is reported at three points:
+  - mel: L1 distance and cosine similarity of the spectrograms over their
+    common length, plus the length ratio (a changed stop decision shows here)
+  - vocoder: SNR of the optimized vocoder against the eager one on the same
+    fp32 spectrogram, isolating the vocoder from the acoustic model
+  - end to end: log-spectral distance between the final waveforms
+
+Usage (from the repository root):
+    python -m benchmarks.bench_quantization --repeats 3
+    python -m benchmarks.bench_quantization --random-weights   # offline smoke run
+"""
+import argparse
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SENTENCES = [
+    "The train was late.",
+    "She opened the letter and read it twice before speaking.",
+    "Rain hammered the windows while the town slept, and nobody in the village remembered "
+    "when the old stone bridge had been built or who had built it.",
+]
+SAMPLE_RATE = 16000
+SEED = 1234
+
+
+def _load(quantize: bool, random_weights: bool):
+    """Acoustic model, vocoder, tokenizer function and speaker embedding for one mode"""
+    import torch
+
+    if not random_weights:
+        from models.tts_generator import TTSGenerator, MAX_INPUT_TOKENS
+
+        generator = TTSGenerator(use_cache=False, quantize=quantize)
+        tokenize = lambda text: generator.processor(text=text, return_tensors="pt", truncation=True,
+                                                    max_length=MAX_INPUT_TOKENS)["input_ids"]
+        return generator.model, generator.vocoder, tokenize, generator._get_speaker_embedding(9000)
+
+    from transformers import SpeechT5Config, SpeechT5ForTextToSpeech, SpeechT5HifiGan, SpeechT5HifiGanConfig
+    from models.quantization import FrozenVocoder, quantize_acoustic_model
+
+    torch.manual_seed(SEED)  # Identical random weights in both processes
+    model = SpeechT5ForTextToSpeech(SpeechT5Config()).eval()
+    vocoder = SpeechT5HifiGan(SpeechT5HifiGanConfig()).eval()
+    speaker_embedding = torch.randn(1, 512)
+    if quantize:
+        model = quantize_acoustic_model(model)
+        vocoder = FrozenVocoder(vocoder)
+    vocab_size = model.config.vocab_size
+    tokenize = lambda text: torch.tensor([[4 + ord(char) % (vocab_size - 4) for char in text] + [2]])
+    return model, vocoder, tokenize, speaker_embedding
+
+
+def run_mode(quantize: bool, random_weights: bool, repeats: int, reference_mels=None) -> dict:
+    """Load one mode and time it; runs in a fresh process"""
+    import torch
+    from models.quantization import module_bytes
+    from utils.metrics import current_rss_bytes, peak_rss_bytes
+
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    model, vocoder, tokenize, speaker_embedding = _load(quantize, random_weights)
+    result = {
+        "load_seconds": time.perf_counter() - start,
+        "rss_delta_bytes": current_rss_bytes() - rss_before,
+        "acoustic_bytes": module_bytes(model),
+        "vocoder_bytes": module_bytes(vocoder),
+        "sentences": [],
+    }
+
+    with torch.inference_mode():
+        for index, text in enumerate(SENTENCES):
+            input_ids = tokenize(text)
+            mel_ms, vocoder_ms = [], []
+            for _ in range(repeats):
+                torch.manual_seed(SEED + index)
+                start = time.perf_counter()
+                mel = model.generate_speech(input_ids, speaker_embedding)
+                mel_ms.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                waveform = vocoder(mel)
+                vocoder_ms.append((time.perf_counter() - start) * 1000)
+            sentence = {
+                "mel": mel.numpy(),
+                "waveform": waveform.numpy(),
+                "mel_ms": statistics.median(mel_ms),
+                "vocoder_ms": statistics.median(vocoder_ms),
+            }
+            if reference_mels is not None:
+                sentence["vocoded_reference"] = vocoder(torch.from_numpy(reference_mels[index])).numpy()
+            result["sentences"].append(sentence)
+    result["peak_rss_bytes"] = peak_rss_bytes()
+    return result
+
+
+def _in_subprocess(*args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_mode, *args).result()
+
+
+def snr_db(reference: np.ndarray, test: np.ndarray) -> float:
+    length = min(reference.size, test.size)
+    noise = np.sum((reference[:length] - test[:length]) ** 2)
+    return float("inf") if noise == 0 else 10 * np.log10(np.sum(reference[:length] ** 2) / noise)
+
+
+def log_spectral_distance(reference: np.ndarray, test: np.ndarray, frame: int = 512) -> float:
+    """RMS difference in dB between STFT magnitudes over the common frames"""
+    frames = min(reference.size, test.size) // frame
+    if frames == 0:
+        return float("nan")
+    window = np.hanning(frame)
+
+    def spectrum(audio):
+        blocks = audio[:frames * frame].reshape(frames, frame) * window
+        return 20 * np.log10(np.abs(np.fft.rfft(blocks, axis=1)) + 1e-6)
+
+    return float(np.sqrt(np.mean((spectrum(reference) - spectrum(test)) ** 2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per sentence; the median is reported")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Use randomly initialized models (runs offline; accuracy numbers are not meaningful)")
+    args = parser.parse_args()
+
+    fp32 = _in_subprocess(False, args.random_weights, args.repeats)
+    int8 = _in_subprocess(True, args.random_weights, args.repeats, [s["mel"] for s in fp32["sentences"]])
+
+    print(f"{'':<22}{'fp32':>12}{'int8':>12}{'ratio':>8}")
+    for label, key, scale in (("load seconds", "load_seconds", 1), ("acoustic weights MB", "acoustic_bytes", 2 ** 20),
+                              ("vocoder weights MB", "vocoder_bytes", 2 ** 20),
+                              ("RSS after load MB", "rss_delta_bytes", 2 ** 20),
+                              ("peak RSS MB", "peak_rss_bytes", 2 ** 20)):
+        a, b = fp32[key] / scale, int8[key] / scale
+        print(f"{label:<22}{a:>12.1f}{b:>12.1f}{b / a if a else float('nan'):>8.2f}")
+
+    print()
+    print(f"{'chars':>6}{'mel ms':>16}{'vocoder ms':>18}{'RTF':>14}  "
+          f"{'mel L1':>8}{'mel cos':>9}{'len':>6}{'voc SNR':>9}{'LSD dB':>8}")
+    for text, a, b in zip(SENTENCES, fp32["sentences"], int8["sentences"]):
+        seconds = a["waveform"].size / SAMPLE_RATE
+        rtf_a = (a["mel_ms"] + a["vocoder_ms"]) / 1000 / seconds
+        rtf_b = (b["mel_ms"] + b["vocoder_ms"]) / 1000 / max(b["waveform"].size / SAMPLE_RATE, 1e-9)
+        frames = min(len(a["mel"]), len(b["mel"]))
+        mel_a, mel_b = a["mel"][:frames].ravel(), b["mel"][:frames].ravel()
+        mel_l1 = float(np.mean(np.abs(mel_a - mel_b)))
+        mel_cos = float(mel_a @ mel_b / (np.linalg.norm(mel_a) * np.linalg.norm(mel_b) + 1e-12))
+        print(f"{len(text):>6}{a['mel_ms']:>8.0f}/{b['mel_ms']:<7.0f}{a['vocoder_ms']:>9.0f}/{b['vocoder_ms']:<8.0f}"
+              f"{rtf_a:>6.2f}/{rtf_b:<7.2f}{mel_l1:>8.3f}{mel_cos:>9.4f}{len(b['mel']) / len(a['mel']):>6.2f}"
+              f"{snr_db(a['waveform'], b['vocoded_reference']):>9.1f}"
+              f"{log_spectral_distance(a['waveform'], b['waveform']):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Latency of each text rewrite backend.
+
+For every backend this reports load time, the latency of the first rewrite
+(one-off setup such as a local model's first forward pass), the median
+latency of one rewrite per input length, and throughput for a batch of texts
+sent through rewrite_many, which is how long documents are rewritten. The
+local backend runs twice, with and without reusing the key/value cache of the
+tone prefix, to show what prefix reuse saves on each call.
+
+The remote backend is measured against the stub inference server started
+in-process, so its numbers are the client's overhead plus the stub's fixed
+latency; pass --api-url to measure a real endpoint instead.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_rewrite_backends --backends rules,remote
+    python -m benchmarks.bench_rewrite_backends --backends local --local-model HuggingFaceTB/SmolLM2-135M-Instruct
+"""
+import argparse
+import os
+import statistics
+import time
+
+WORDS = (
+    "the old lighthouse keeper climbed the stairs slowly each night and watched the dark water "
+    "for ships that never came while the wind pulled at the shutters and the lamp burned on"
+).split()
+PARAMETERS = {"max_new_tokens": 64, "do_sample": False}
+
+
+def make_text(characters: int) -> str:
+    words = []
+    while len(" ".join(words)) < characters:
+        words.append(WORDS[len(words) % len(WORDS)])
+    return (" ".join(words)[:characters].rstrip() + ".").capitalize()
+
+
+def rewrite(backend, texts, tone: str) -> list:
+    """Rewrite texts through rewrite_many, raising the first failure"""
+    results = [None] * len(texts)
+
+    def on_result(index, result):
+        results[index] = result
+
+    backend.rewrite_many(texts, tone, PARAMETERS, on_result)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results
+
+
+def measure(label: str, make_backend, lengths, batch: int, repeats: int, tone: str) -> dict:
+    start = time.perf_counter()
+    backend = make_backend()
+    row = {"backend": label, "load_s": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    rewrite(backend, [make_text(lengths[0])], tone)
+    row["first_ms"] = (time.perf_counter() - start) * 1000
+
+    for length in lengths:
+        timings = []
+        for repeat in range(repeats):
+            # A different text each time so nothing downstream can cache it
+            text = f"{repeat + 1}. {make_text(length)}"
+            start = time.perf_counter()
+            rewrite(backend, [text], tone)
+            timings.append((time.perf_counter() - start) * 1000)
+        row[f"{length}_chars_ms"] = statistics.median(timings)
+
+    texts = [f"{index + 1}. {make_text(lengths[-1])}" for index in range(batch)]
+    start = time.perf_counter()
+    rewrite(backend, texts, tone)
+    row["batch_chars_per_s"] = sum(len(text) for text in texts) / (time.perf_counter() - start)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="rules,remote,local", help="Comma-separated backends to measure")
+    parser.add_argument("--lengths", default="100,300", help="Comma-separated input lengths in characters")
+    parser.add_argument("--batch", type=int, default=8, help="Texts per rewrite_many batch")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tone", default="suspenseful", choices=["neutral", "suspenseful", "inspiring"])
+    parser.add_argument("--local-model", default=None, help="Local model id or path (default: the backend's)")
+    parser.add_argument("--api-url", default=None, help="Remote endpoint (default: an in-process stub server)")
+    parser.add_argument("--stub-latency", type=float, default=0.5, help="Stub server seconds per response")
+    args = parser.parse_args()
+
+    from models.rewrite_backends import LocalLMBackend, RemoteBackend, RuleBasedBackend
+
+    lengths = [int(length) for length in args.lengths.split(",")]
+    runs = []
+    for name in args.backends.split(","):
+        if name == "rules":
+            runs.append(("rules", RuleBasedBackend))
+        elif name == "remote":
+            if args.api_url is None:
+                from benchmarks.stub_inference_server import serve
+
+                server, _ = serve(port=0, latency=args.stub_latency)
+                os.environ["ECHOVERSE_REWRITE_API_URL"] = f"http://127.0.0.1:{server.server_address[1]}/models"
+            else:
+                os.environ["ECHOVERSE_REWRITE_API_URL"] = args.api_url
+            runs.append(("remote", RemoteBackend))
+        elif name == "local":
+            runs.append(("local", lambda: LocalLMBackend(args.local_model)))
+            runs.append(("local (no prefix reuse)", lambda: LocalLMBackend(args.local_model, reuse_prefix=False)))
+        else:
+            parser.error(f"unknown backend {name!r}")
+
+    rows = [measure(label, make_backend, lengths, args.batch, args.repeats, args.tone)
+            for label, make_backend in runs]
+
+    columns = ["load_s", "first_ms"] + [f"{length}_chars_ms" for length in lengths] + ["batch_chars_per_s"]
+    print(f"{'backend':<26}" + "".join(f"{column:>18}" for column in columns))
+    for row in rows:
+        print(f"{row['backend']:<26}" + "".join(f"{row[column]:>18.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
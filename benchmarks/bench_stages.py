@@ -0,0 +1,255 @@
+"""
+Time each stage of the narration pipeline at several text lengths.
+
+Stages: rewrite prompt building, rewrite output cleanup, tokenization,
+spectrogram generation, vocoding, the whole batched synthesis (pipelined where
+the generator would pipeline it), speed change and encoding. Each is reported
+as the fastest of --repeats runs in milliseconds (the least disturbed by other
+load, so comparable across runs) and as real-time factor (stage time / audio
+duration), so it is clear where a chunk's time goes.
+
+Every model stage runs through TTSGenerator's own methods (_spectrograms,
+_vocode, _synthesize_batch, _modify_speed) and encoding through AudioClip, so
+a regression in those wrappers shows up here. The default stub backend swaps
+the generator's processor, model and vocoder attributes for deterministic
+stand-ins of realistic output size, so the suite runs offline and measures
+the surrounding code; tokenization, spectrogram and vocoder numbers are then
+only meaningful relative to each other. --backend speecht5 uses the real
+weights from the local Hugging Face cache (nothing is downloaded).
+
+Baselines are stored as JSON per backend in benchmarks/baselines; they are
+specific to the machine that recorded them, so re-record one with
+--save-baseline on the machine that runs the gate. Later runs compare against
+them and flag any stage slower than the baseline by more than --tolerance,
+exiting non-zero so the suite can gate a change.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_stages
+    python -m benchmarks.bench_stages --lengths 20 80 250 --save-baseline
+    python -m benchmarks.bench_stages --backend speecht5 --repeats 3
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.bench_time_stretch import SAMPLE_RATE, make_voice_like
+from models.tts_generator import TTSGenerator, MAX_CHUNK_TOKENS, MAX_INPUT_TOKENS
+from utils.audio_clip import AudioClip
+from utils.audio_encoders import FORMATS
+from utils.text_chunker import TextChunker
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+HOP_LENGTH = 256  # Waveform samples per spectrogram frame (SpeechT5/HiFi-GAN)
+NUM_MEL_BINS = 80
+VOICE_ID = 9000
+
+PASSAGE = (
+    "The lighthouse keeper climbed the spiral stairs one last time. Rain hammered the windows while the "
+    "town slept. She opened the letter and read it twice before speaking. Nobody in the village remembered "
+    "when the bridge was built. The train was late, and the platform was nearly empty. He counted the coins "
+    "slowly, as if they might disappear. "
+)
+
+
+def make_text(words: int) -> str:
+    passage = PASSAGE.split()
+    return " ".join(passage[index % len(passage)] for index in range(words))
+
+
+class StubTokenizer:
+    """Character tokens, like SpeechT5's tokenizer"""
+
+    def __call__(self, text):
+        return {"input_ids": list(text.encode("utf-8")) + [2]}
+
+
+class StubProcessor:
+    """SpeechT5Processor stand-in for the calls TTSGenerator makes"""
+
+    def __init__(self):
+        self.tokenizer = StubTokenizer()
+
+    def __call__(self, text, return_tensors="pt", padding=True, truncation=True, max_length=MAX_INPUT_TOKENS):
+        rows = [self.tokenizer(item)["input_ids"][:max_length] for item in text]
+        input_ids = torch.ones(len(rows), max(len(row) for row in rows), dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        for index, row in enumerate(rows):
+            input_ids[index, :len(row)] = torch.tensor(row)
+            attention_mask[index, :len(row)] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+class StubModel:
+    """SpeechT5ForTextToSpeech stand-in: ~4 deterministic frames per token"""
+    frames_per_token = 4
+
+    def generate_speech(self, input_ids, speaker_embeddings, attention_mask=None, return_output_lengths=False):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        frame_counts = (attention_mask.sum(dim=1) * self.frames_per_token).tolist()
+        generator = torch.Generator().manual_seed(int(input_ids.sum()))
+        padded = torch.randn(input_ids.size(0), max(frame_counts), NUM_MEL_BINS, generator=generator)
+        if not return_output_lengths:
+            return padded[0]
+        return padded, frame_counts
+
+
+class StubVocoder:
+    """HiFi-GAN stand-in: frame energy shapes a speech-like carrier"""
+
+    def __init__(self):
+        self.carrier = torch.from_numpy(make_voice_like(30.0).astype(np.float32))
+
+    def __call__(self, spectrograms):
+        envelope = spectrograms.abs().mean(dim=-1).repeat_interleave(HOP_LENGTH, dim=-1)
+        samples = envelope.size(-1)
+        carrier = self.carrier.repeat(-(-samples // self.carrier.numel()))[:samples]
+        return envelope * carrier
+
+
+class StubVoiceBank:
+    def __init__(self):
+        self.embedding = np.random.default_rng(VOICE_ID).standard_normal(512).astype(np.float32)
+
+    def __contains__(self, voice_id):
+        return True
+
+    def get(self, voice_id):
+        return self.embedding
+
+
+def make_generator(backend: str) -> TTSGenerator:
+    """The app's TTSGenerator, with its models replaced by stand-ins for the stub backend"""
+    if backend == "speecht5":
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        return TTSGenerator(use_cache=False)
+
+    generator = TTSGenerator.__new__(TTSGenerator)  # Skips loading weights and the voice bank
+    generator.quantized = False
+    generator.guarded = False
+    generator.pipelined = os.getenv("ECHOVERSE_TTS_PIPELINE", "1") != "0" and (os.cpu_count() or 1) > 1
+    generator.audio_cache = None
+    generator.model_revision = "stub"
+    generator.processor = StubProcessor()
+    generator.model = StubModel()
+    generator.vocoder = StubVocoder()
+    generator.voice_bank = StubVoiceBank()
+    return generator
+
+
+def best_ms(func, repeats: int):
+    """Fastest wall time of func() in milliseconds, and its last result"""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+@torch.inference_mode()
+def run_stages(generator: TTSGenerator, words: int, repeats: int, speed: float, formats) -> dict:
+    """Time every stage on one text; returns {"audio_seconds": ..., "stages": {stage: ms}}"""
+    from models.rewrite_backends import build_prompt, clean_output
+
+    text = make_text(words)
+    items = [(chunk, VOICE_ID) for chunk in
+             TextChunker(MAX_CHUNK_TOKENS, count_tokens=generator._count_tokens).split(text)]
+    stages = {}
+
+    stages["rewrite_prompt"], prompt = best_ms(lambda: build_prompt(text, "suspenseful"), repeats)
+    generated = f"{prompt} Here is the rewritten text: {text} Extra"
+    stages["clean_output"], _ = best_ms(lambda: clean_output(generated), repeats)
+    stages["tokenize"], _ = best_ms(
+        lambda: generator.processor(text=[chunk for chunk, _ in items], return_tensors="pt", padding=True,
+                                    truncation=True, max_length=MAX_INPUT_TOKENS), repeats)
+    stages["spectrogram"], spectrograms = best_ms(lambda: generator._spectrograms(items), repeats)
+    stages["vocoder"], _ = best_ms(lambda: generator._vocode(spectrograms), repeats)
+    stages["synthesize"], speeches = best_ms(lambda: generator._synthesize_batch(items), repeats)
+    audio = np.concatenate([speech for speech in speeches if speech is not None]).astype(np.float32)
+    stages["speed"], _ = best_ms(lambda: generator._modify_speed(audio, speed), repeats)
+    for fmt in formats:
+        stages[f"encode_{fmt}"], _ = best_ms(lambda: AudioClip.from_samples(audio, SAMPLE_RATE, fmt).encoded,
+                                               repeats)
+    return {"audio_seconds": audio.size / SAMPLE_RATE, "stages": stages}
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Stages slower than baseline * (1 + tolerance) and by at least min_delta_ms, as (words, stage, ms, baseline_ms)"""
+    regressions = []
+    for words, result in results.items():
+        for stage, ms in result["stages"].items():
+            reference = baseline.get(words, {}).get("stages", {}).get(stage)
+            # The absolute floor keeps microsecond stages from flagging on timer noise
+            if reference and ms > reference * (1 + tolerance) and ms - reference >= min_delta_ms:
+                regressions.append((words, stage, ms, reference))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["stub", "speecht5"], default="stub", help="Model backend")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[20, 80, 250], help="Text lengths in words")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per stage; the fastest is reported")
+    parser.add_argument("--speed", type=float, default=1.25, help="Rate for the speed stage")
+    parser.add_argument("--formats", nargs="+", default=["wav", "mp3"], choices=list(FORMATS), help="Encode stages")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON (default: baselines/stages_<backend>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative slowdown before flagging (run-to-run noise on a shared machine "
+                             "reaches ~40%% on millisecond stages)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    generator = make_generator(args.backend)
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"stages_{args.backend}.json")
+    baseline = {}
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    # One untimed pass so one-off setup (imports, allocator, kernels) stays out of the numbers
+    run_stages(generator, args.lengths[0], 1, args.speed, args.formats)
+
+    results = {}
+    print(f"backend: {args.backend}, repeats: {args.repeats}, speed stage rate: {args.speed}")
+    print(f"{'words':>6}  {'stage':<16}{'ms':>10}{'RTF':>10}{'vs base':>10}")
+    for words in args.lengths:
+        result = run_stages(generator, words, args.repeats, args.speed, args.formats)
+        results[str(words)] = result
+        reference = baseline.get(str(words), {}).get("stages", {})
+        for stage, ms in result["stages"].items():
+            rtf = ms / 1000 / result["audio_seconds"]
+            change = f"{ms / reference[stage]:>9.2f}x" if reference.get(stage) else f"{'-':>10}"
+            print(f"{words:>6}  {stage:<16}{ms:>10.3f}{rtf:>10.4f}{change}")
+        total = sum(result["stages"].values())
+        print(f"{words:>6}  {'total':<16}{total:>10.3f}{total / 1000 / result['audio_seconds']:>10.4f}"
+              f"   ({result['audio_seconds']:.1f}s audio)")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path) or ".", exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"backend": args.backend, "repeats": args.repeats, "speed": args.speed,
+                       "results": results}, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if not baseline:
+        print(f"No baseline at {baseline_path}; run with --save-baseline to record one")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for words, stage, ms, reference in regressions:
+        print(f"REGRESSION {stage} at {words} words: {ms:.2f} ms vs {reference:.2f} ms baseline")
+    if not regressions:
+        print(f"No stage slower than baseline by more than {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Compare the built-in WSOLA time stretcher with librosa.effects.time_stretch.
+
+Reports latency per clip length and rate, librosa's one-off import cost, and
+the dominant frequency of the output as a pitch-preservation check. librosa
+is optional; without it only the built-in stretcher is timed.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_time_stretch --lengths 1 5 30 120 --rates 0.75 1.5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.time_stretch import time_stretch
+
+SAMPLE_RATE = 16000
+
+
+def make_voice_like(seconds: float) -> np.ndarray:
+    """Harmonic signal with slow pitch drift and noise, loosely speech-like"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    audio = sum(np.sin(h * phase) / h for h in range(1, 6))
+    audio *= 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2  # Syllable-rate envelope
+    audio += 0.01 * np.random.default_rng(0).standard_normal(t.size)
+    return (0.3 * audio).astype(np.float32)
+
+
+def dominant_frequency(audio: np.ndarray) -> float:
+    segment = audio[:min(audio.size, 1 << 15)]
+    spectrum = np.abs(np.fft.rfft(segment * np.hanning(segment.size)))
+    return float(np.fft.rfftfreq(segment.size, 1 / SAMPLE_RATE)[np.argmax(spectrum)])
+
+
+def best_of(func, repeats: int = 3) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=float, nargs="+", default=[1, 5, 30, 120], help="Clip lengths in seconds")
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.75, 1.5], help="Speed factors")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        import librosa
+        librosa.effects.time_stretch(np.zeros(4096, dtype=np.float32), rate=1.5)
+        print(f"librosa import + first call: {time.perf_counter() - start:.2f}s")
+    except ImportError:
+        librosa = None
+        print("librosa not installed; timing the built-in stretcher only")
+
+    print(f"{'length':>8}{'rate':>6}{'wsola ms':>11}{'librosa ms':>12}{'speedup':>9}{'f0 in':>8}{'wsola':>8}{'librosa':>9}")
+    for seconds in args.lengths:
+        audio = make_voice_like(seconds)
+        f0_in = dominant_frequency(audio)
+        for rate in args.rates:
+            wsola_time = best_of(lambda: time_stretch(audio, rate, sample_rate=SAMPLE_RATE))
+            f0_wsola = dominant_frequency(time_stretch(audio, rate, sample_rate=SAMPLE_RATE))
+            if librosa is not None:
+                librosa_time = best_of(lambda: librosa.effects.time_stretch(audio, rate=rate))
+                f0_librosa = dominant_frequency(librosa.effects.time_stretch(audio, rate=rate))
+                extra = f"{librosa_time * 1000:>12.1f}{librosa_time / wsola_time:>9.1f}"
+                f0_extra = f"{f0_librosa:>9.0f}"
+            else:
+                extra = f"{'-':>12}{'-':>9}"
+                f0_extra = f"{'-':>9}"
+            print(f"{seconds:>8.0f}{rate:>6.2f}{wsola_time * 1000:>11.1f}{extra}{f0_in:>8.0f}{f0_wsola:>8.0f}{f0_extra}")
+
+
+if __name__ == "__main__":
+    main()
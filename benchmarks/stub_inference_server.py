@@ -0,0 +1,91 @@
+"""
+Local stand-in for the text-generation inference API.
+
+Echoes each prompt back as an upper-cased "rewrite" after a fixed latency and
+can inject 429/503 responses (at random, or for the first requests) to
+exercise retries. Point the rewriter at it with
+ECHOVERSE_REWRITE_API_URL=http://127.0.0.1:8808/models.
+
+Usage (from the repository root):
+    python -m benchmarks.stub_inference_server --port 8808 --latency 0.5 --fail-rate 0.1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency: float, fail_rate: float, fail_first: int = 0):
+    stats = {"requests": 0, "failures": 0, "in_flight": 0, "peak_in_flight": 0}
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                stats["requests"] += 1
+                fail = stats["requests"] <= fail_first or random.random() < fail_rate
+                stats["in_flight"] += 1
+                stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+            try:
+                time.sleep(latency)
+                if fail:
+                    with lock:
+                        stats["failures"] += 1
+                        status = (429, 503)[stats["failures"] % 2]  # Alternate, so both get exercised
+                    self._send(status, {"error": "stub overload"}, {"Retry-After": "0"})
+                    return
+                prompt = json.loads(body)["inputs"]
+                text = prompt.split("\n\n")[1] if "\n\n" in prompt else prompt
+                self._send(200, [{"generated_text": f"{prompt} {text.upper()}"}])
+            finally:
+                with lock:
+                    stats["in_flight"] -= 1
+
+        def _send(self, status, payload, headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler, stats
+
+
+def serve(port: int = 8808, latency: float = 0.5, fail_rate: float = 0.0, fail_first: int = 0):
+    """Start the stub server on a background thread and return (server, stats); port 0 picks a free port"""
+    handler, stats = make_handler(latency, fail_rate, fail_first)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of 429/503 responses")
+    args = parser.parse_args()
+
+    server, stats = serve(args.port, args.latency, args.fail_rate)
+    print(f"Stub inference API on http://127.0.0.1:{args.port}/models (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(stats)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
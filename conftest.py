@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from models.tts_generator import SAMPLE_RATE
+
+
+class StubTTS:
+    """Deterministic stand-in for TTSGenerator: a tone per chunk, 10 ms per character"""
+    model_revision = "stub"
+
+    def __init__(self):
+        self.synthesized = 0
+
+    def _count_tokens(self, text):
+        return len(text)
+
+    def _synthesize_chunks(self, items, speed, synthesize=None):
+        self.synthesized += len(items)
+        speeches = []
+        for text, _ in items:
+            samples = int(len(text) * 0.01 * SAMPLE_RATE)
+            speeches.append(0.5 * np.sin(np.arange(samples, dtype=np.float32) * 2 * np.pi * 220 / SAMPLE_RATE))
+        return speeches
+
+
+@pytest.fixture
+def stub_tts():
+    return StubTTS()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from dotenv import load_dotenv
+from utils.metrics import get_metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+metrics = get_metrics()
+REQUEST_SECONDS = metrics.histogram("echoverse_rewrite_request_seconds", "Latency of one rewrite HTTP request")
+RETRIES = metrics.counter("echoverse_rewrite_retries_total", "Rewrite requests retried, by cause",
+                          label_names=("cause",))
+
+DEFAULT_API_URL = "https://api-inference.huggingface.co/models"
+RETRY_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        """
+        Asyncio token-bucket rate limiter
+
+        Args:
+            rate: Tokens added per second (0 disables limiting)
+            burst: Bucket capacity
+        """
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncRewriteClient:
+    def __init__(self, model_id: str, token: str = None, api_url: str = None,
+                 max_concurrency: int = None, rate_per_second: float = None,
+                 max_retries: int = 5, backoff_base: float = 0.5, timeout: float = 120.0):
+        """
+        Concurrent text-generation client for the inference API
+
+        Requests share one keep-alive connection pool, are capped by a
+        concurrency limit and a token-bucket rate limit, and are retried with
+        exponential backoff on 429/503 responses.
+
+        Args:
+            model_id: Model repository id
+            token: API token
+            api_url: Base URL (default: ECHOVERSE_REWRITE_API_URL or the hosted API);
+                point it at a local stub server for testing
+            max_concurrency: Maximum requests in flight
+                (default: ECHOVERSE_REWRITE_CONCURRENCY or 8)
+            rate_per_second: Sustained request rate, 0 for unlimited
+                (default: ECHOVERSE_REWRITE_RATE or 0)
+            max_retries: Retries per request on 429/503 or connection errors
+            backoff_base: First backoff delay in seconds, doubled on each retry
+            timeout: Total timeout per attempt in seconds
+        """
+        self.model_id = model_id
+        self.token = token
+        self.api_url = (api_url or os.getenv("ECHOVERSE_REWRITE_API_URL") or DEFAULT_API_URL).rstrip("/")
+        self.max_concurrency = max_concurrency or int(os.getenv("ECHOVERSE_REWRITE_CONCURRENCY", "8"))
+        self.rate_per_second = rate_per_second if rate_per_second is not None \
+            else float(os.getenv("ECHOVERSE_REWRITE_RATE", "0"))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.api_url}/{self.model_id}"
+
+    @property
+    def configured(self) -> bool:
+        """Whether requests can be sent: a token for the hosted API, or an overridden URL"""
+        return bool(self.token) or self.api_url != DEFAULT_API_URL
+
+    def generate(self, prompt: str, parameters: dict) -> tuple:
+        """
+        Blocking single generation, with the same limits and retries as generate_many
+
+        Returns:
+            (content_type, body bytes) of the response; raises if it failed
+        """
+        result = asyncio.run(self.generate_many([prompt], parameters))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def generate_many(self, prompts, parameters: dict, on_result=None) -> list:
+        """
+        Run generations for many prompts concurrently
+
+        Args:
+            prompts: List of prompt strings
+            parameters: Generation parameters sent with every prompt
+            on_result: Optional callable(index, result) invoked as each prompt finishes
+
+        Returns:
+            List of (content_type, body bytes) responses in input order, or the
+            exception raised for that prompt
+        """
+        import aiohttp
+
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        bucket = TokenBucket(self.rate_per_second, burst=self.max_concurrency)
+
+        async with aiohttp.ClientSession(connector=connector, headers=headers,
+                                         timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            async def run(index, prompt):
+                async with semaphore:
+                    try:
+                        result = await self._post(session, bucket, {"inputs": prompt, "parameters": parameters})
+                    except Exception as e:
+                        result = e
+                if on_result:
+                    on_result(index, result)
+                return result
+
+            return await asyncio.gather(*(run(index, prompt) for index, prompt in enumerate(prompts)))
+
+    async def _post(self, session, bucket: TokenBucket, payload: dict):
+        import aiohttp
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                async with session.post(self.endpoint, json=payload) as response:
+                    if response.status not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        body = await response.read()
+                        REQUEST_SECONDS.observe(time.perf_counter() - started)
+                        return response.headers.get("content-type", ""), body
+                    retry_after = response.headers.get("Retry-After")
+                    error = aiohttp.ClientResponseError(
+                        response.request_info, response.history,
+                        status=response.status, message=response.reason
+                    )
+                    cause = str(response.status)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+                cause = type(e).__name__
+            REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff_base * (2 ** attempt) * (1 + random.random() * 0.25)
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            RETRIES.inc(cause=cause)
+            logger.info("Rewrite request failed (%s); retrying in %.1fs", error, delay)
+            await asyncio.sleep(delay)
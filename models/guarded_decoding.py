@@ -0,0 +1,250 @@
+"""
+Bounded autoregressive decoding for SpeechT5.
+
+The stock generate_speech loop stops a sequence only when its stop-token
+probability crosses the threshold, allows 20 frames per token of the padded
+batch (about 0.3 s per character), and keeps decoding finished rows until the
+whole batch is done. A chunk whose stop token never fires therefore decodes
+several times its useful length of silence or babble.
+
+This loop is built from the same model parts and stops each row on the first of:
+  - the stop token, exactly as the stock loop does
+  - a length cap from the row's own token count (MAX_FRAMES_PER_TOKEN)
+  - trailing silence: SILENCE_SECONDS of frames well below the row's loudest
+    frame, trimmed to TAIL_SECONDS of silence after the speech
+  - repetition: the last REPEAT_WINDOW frames repeat earlier frames within a
+    lag of REPEAT_MAX_LAG almost exactly, which real speech never does; the
+    repeated window is dropped
+Finished rows are removed from the batch, so they cost nothing while the
+others decode. The decoder pre-net also runs on the newest frame only,
+instead of on the whole output sequence at every step. That step reads the
+pre-net's private parts (_consistent_dropout, encode_positions), which is why
+requirements.txt caps transformers below 5.0.
+"""
+from typing import NamedTuple
+
+import torch
+import torch.nn.functional as F
+
+from utils.metrics import get_metrics
+
+FRAME_SECONDS = 256 / 16000  # HiFi-GAN hop length at 16 kHz
+STOCK_MAX_LEN_RATIO = 20.0  # generate_speech's default maxlenratio, for the frames-saved report
+MAX_FRAMES_PER_TOKEN = 12  # ~0.19 s per character, over twice a slow reading pace
+MIN_FRAMES = 32  # Cap floor for very short inputs
+SILENCE_DROP = 2.0  # Log-mel units (log10) below the row's loudest frame that count as silence
+SILENCE_SECONDS = 0.8  # Longer than any pause inside one chunk of narration
+TAIL_SECONDS = 0.15  # Silence kept after the last speech when trimming
+REPEAT_WINDOW = 24  # Frames compared for repetition (~0.4 s)
+REPEAT_MAX_LAG = 96  # Longest repetition period looked for (~1.5 s)
+REPEAT_TOLERANCE = 0.03  # Mean absolute log-mel difference below which two windows are the same
+CHECK_EVERY = 4  # Decoder steps between repetition checks
+
+metrics = get_metrics()
+STOPS = metrics.counter("echoverse_tts_decoder_stops_total", "Spectrogram rows finished, by stop reason",
+                        label_names=("reason",))
+FRAMES_DECODED = metrics.counter("echoverse_tts_decoder_frames_total", "Mel frames decoded by the guarded loop")
+FRAMES_SAVED = metrics.counter("echoverse_tts_decoder_frames_saved_total",
+                               "Mel frames the guarded loop did not decode that the stock loop would have, at most")
+FRAMES_TRIMMED = metrics.counter("echoverse_tts_decoder_frames_trimmed_total",
+                                 "Decoded silent or repeated mel frames dropped from the output")
+
+
+class DecodeReport(NamedTuple):
+    """What one guarded decode did"""
+    frames: int  # Frames decoded, over all rows
+    frames_saved: int  # Frames the stock loop would have decoded beyond that, at most
+    frames_trimmed: int  # Decoded frames dropped as trailing silence or repetition
+    stops: dict  # Rows finished per stop reason
+
+
+class _RowMonitor:
+    """Per-row running state for the silence and repetition checks"""
+
+    def __init__(self):
+        self.chunks = []  # (reduction_factor, mel_bins) spectra, one per step
+        self.frames = 0
+        self.peak = None  # Mean log-mel of the loudest frame so far
+        self.quiet_run = 0  # Trailing frames below peak - SILENCE_DROP
+
+    def add(self, spectrum: torch.Tensor, energies):
+        self.chunks.append(spectrum)
+        self.frames += len(energies)
+        for energy in energies:
+            if self.peak is None or energy > self.peak:
+                self.peak = energy
+            self.quiet_run = self.quiet_run + 1 if energy < self.peak - SILENCE_DROP else 0
+
+    def silent_tail(self) -> bool:
+        return self.quiet_run * FRAME_SECONDS >= SILENCE_SECONDS
+
+    def repeating(self) -> bool:
+        """True if the newest window of voiced frames closely repeats an earlier one"""
+        if self.frames < 2 * REPEAT_WINDOW or self.quiet_run:
+            return False
+        steps = -(-(REPEAT_WINDOW + REPEAT_MAX_LAG) // self.chunks[0].size(0))
+        recent = torch.cat(self.chunks[-steps:])
+        windows = recent.unfold(0, REPEAT_WINDOW, 1)  # (positions, mel_bins, REPEAT_WINDOW)
+        differences = (windows[:-1] - windows[-1]).abs().mean(dim=(1, 2))
+        return bool(differences.min() < REPEAT_TOLERANCE)
+
+    def spectrogram(self, reason: str) -> torch.Tensor:
+        """Decoded frames with trailing silence or the repeated window removed"""
+        frames = torch.cat(self.chunks)
+        if reason == "silence":
+            keep = self.frames - self.quiet_run + int(TAIL_SECONDS / FRAME_SECONDS)
+            frames = frames[:max(keep, 1)]
+        elif reason == "repetition":
+            frames = frames[:self.frames - REPEAT_WINDOW]
+        return frames
+
+
+def _prenet_step(prenet, frames: torch.Tensor, position: int, speaker_embeddings: torch.Tensor) -> torch.Tensor:
+    """
+    Decoder pre-net on the newest frame of each row
+
+    Same computation as SpeechT5SpeechDecoderPrenet.forward for the last
+    position, which is the only one the decoder reads, without redoing the
+    positions before it.
+    """
+    hidden = frames.unsqueeze(1)
+    for layer in prenet.layers:
+        hidden = prenet._consistent_dropout(F.relu(layer(hidden)), prenet.config.speech_decoder_prenet_dropout)
+    hidden = prenet.final_layer(hidden)
+    positions = prenet.encode_positions
+    hidden = positions.dropout(hidden + positions.alpha * positions.pe[:, position:position + 1])
+    speaker = F.normalize(speaker_embeddings).unsqueeze(1)
+    return F.relu(prenet.speaker_embeds_layer(torch.cat([hidden, speaker], dim=-1)))
+
+
+def _select_rows(past_key_values, index: torch.Tensor):
+    """
+    Keep the given batch rows of the decoder's key/value cache
+
+    Newer transformers return a Cache object, older ones a tuple of per-layer
+    tensors; the decoder accepts the tuple form back on either.
+    """
+    if hasattr(past_key_values, "batch_select_indices"):
+        past_key_values.batch_select_indices(index)
+        return past_key_values
+    if hasattr(past_key_values, "to_legacy_cache"):
+        past_key_values = past_key_values.to_legacy_cache()
+    return tuple(tuple(tensor[index] for tensor in layer) for layer in past_key_values)
+
+
+def guarded_generate_speech(model, input_ids: torch.Tensor, speaker_embeddings: torch.Tensor,
+                            attention_mask: torch.Tensor = None, threshold: float = 0.5):
+    """
+    Decode spectrograms for a batch of token sequences with runaway protection
+
+    Args:
+        model: SpeechT5ForTextToSpeech (fp32 or dynamically quantized)
+        input_ids: (batch, tokens) token ids, right padded
+        speaker_embeddings: (batch, 512) speaker embeddings
+        attention_mask: (batch, tokens) mask of real tokens (default: non-pad tokens)
+        threshold: Stop-token probability that ends a row
+
+    Returns:
+        (spectrograms, report): unpadded (frames, mel_bins) tensors in input
+        order and a DecodeReport
+    """
+    config = model.config
+    reduction = config.reduction_factor
+    if attention_mask is None:
+        attention_mask = (input_ids != config.pad_token_id).long()
+    batch = input_ids.size(0)
+
+    encoder_states = model.speecht5.encoder(input_values=input_ids, attention_mask=attention_mask,
+                                            return_dict=True).last_hidden_state
+    tokens = attention_mask.sum(dim=1).tolist()
+    step_caps = [max(-(-count * MAX_FRAMES_PER_TOKEN // reduction), MIN_FRAMES // reduction) for count in tokens]
+    stock_steps = int(encoder_states.size(1) * STOCK_MAX_LEN_RATIO / reduction)
+    prenet = model.speecht5.decoder.prenet
+    decoder = model.speecht5.decoder.wrapped_decoder
+    postnet = model.speech_decoder_postnet
+
+    active = list(range(batch))  # Input row of each position still in the batch
+    monitors = [_RowMonitor() for _ in range(batch)]
+    results = [None] * batch
+    reasons = [None] * batch
+    previous = encoder_states.new_zeros(batch, config.num_mel_bins)
+    past_key_values = None
+    step = 0
+    while active:
+        step += 1
+        hidden = _prenet_step(prenet, previous, step - 1, speaker_embeddings)
+        decoder_out = decoder(
+            hidden_states=hidden,
+            attention_mask=None,
+            encoder_hidden_states=encoder_states,
+            encoder_attention_mask=attention_mask,
+            past_key_values=past_key_values,
+            use_cache=True,
+            return_dict=True,
+        )
+        last_hidden = decoder_out.last_hidden_state.squeeze(1)
+        past_key_values = decoder_out.past_key_values
+        spectra = postnet.feat_out(last_hidden).view(len(active), reduction, config.num_mel_bins)
+        stop_probabilities = torch.sigmoid(postnet.prob_out(last_hidden)).sum(dim=-1).tolist()
+        energies = spectra.mean(dim=-1).tolist()
+        previous = spectra[:, -1]
+
+        keep = []
+        for position, row in enumerate(active):
+            monitor = monitors[row]
+            monitor.add(spectra[position], energies[position])
+            if stop_probabilities[position] >= threshold:
+                reasons[row] = "stop_token"
+            elif monitor.silent_tail():
+                reasons[row] = "silence"
+            elif step % CHECK_EVERY == 0 and monitor.repeating():
+                reasons[row] = "repetition"
+            elif step >= step_caps[row]:
+                reasons[row] = "length"
+            if reasons[row] is None:
+                keep.append(position)
+                continue
+            frames = monitor.spectrogram(reasons[row])
+            results[row] = postnet.postnet(frames.unsqueeze(0)).squeeze(0)
+
+        if len(keep) < len(active):
+            active = [active[position] for position in keep]
+            if not active:
+                break
+            index = torch.tensor(keep)
+            past_key_values = _select_rows(past_key_values, index)
+            encoder_states = encoder_states[index]
+            attention_mask = attention_mask[index]
+            speaker_embeddings = speaker_embeddings[index]
+            previous = previous[index]
+
+    return results, _report(monitors, results, reasons, step_caps, stock_steps, reduction)
+
+
+def _report(monitors, results, reasons, step_caps, stock_steps: int, reduction: int) -> DecodeReport:
+    """
+    Tally the decode against the stock loop
+
+    The stock loop decodes every row until the whole batch stops. A row
+    stopped by its stop token would end at the same step there; a row stopped
+    by a guard is counted as running to the stock length cap, since its stop
+    token had not fired. That makes frames_saved an upper bound.
+    """
+    stops = {}
+    decoded = trimmed = 0
+    for monitor, result, reason in zip(monitors, results, reasons):
+        stops[reason] = stops.get(reason, 0) + 1
+        decoded += monitor.frames
+        trimmed += monitor.frames - len(result)
+    if all(reason == "stop_token" for reason in reasons):
+        stock_batch_steps = max(monitor.frames for monitor in monitors) // reduction
+    else:
+        stock_batch_steps = stock_steps
+    saved = max(0, stock_batch_steps * reduction * len(monitors) - decoded)
+
+    for reason, count in stops.items():
+        STOPS.inc(count, reason=reason)
+    FRAMES_DECODED.inc(decoded)
+    FRAMES_SAVED.inc(saved)
+    FRAMES_TRIMMED.inc(trimmed)
+    return DecodeReport(frames=decoded, frames_saved=saved, frames_trimmed=trimmed, stops=stops)
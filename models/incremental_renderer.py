@@ -0,0 +1,227 @@
+import logging
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from models.tts_generator import SAMPLE_RATE, MAX_CHUNK_TOKENS, MAX_INPUT_TOKENS, BATCH_SIZE
+from utils.audio_clip import AudioClip, AudioMetadata
+from utils.audio_encoders import FORMATS, encode_block, join_blocks
+from utils.audio_stitcher import AudioStitcher
+from utils.metrics import get_metrics, trace_span
+from utils.segment_store import SegmentStore, StoredSegment, get_segment_store
+from utils.text_chunker import TextChunker
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FADE_MS = 5  # Fade at segment edges, which are joined without a crossfade
+
+metrics = get_metrics()
+SEGMENTS = metrics.counter("echoverse_render_segments_total", "Document segments rendered, by source",
+                           label_names=("source",))
+
+
+class RenderResult(NamedTuple):
+    clip: AudioClip
+    text: str  # Narration text, segments separated by paragraph breaks
+    segments: int
+    reused: int
+    time_to_first_audio: float
+
+
+class IncrementalRenderer:
+    def __init__(self, tts_generator, text_rewriter=None, store: SegmentStore = None, executor=None):
+        """
+        Long-form rendering that only redoes the segments an edit touched
+
+        The document is split into rewrite chunks ("segments"). Each segment is
+        rewritten, synthesized and stored as a PCM block under a hash of its
+        source text and the render settings. Rendering an edited document looks
+        every segment up by hash, renders only the misses and joins the stored
+        blocks of the rest without decoding them. Chunks never span a
+        paragraph, so an edit changes at most the segments of its paragraph.
+
+        Only WAV output is joined by concatenation, so only there is the whole
+        render proportional to the edit. MP3, Ogg and FLAC are encoded once
+        over the joined document on every render: separately encoded blocks
+        would each carry their own encoder delay and padding, leaving a gap at
+        every segment boundary.
+
+        Args:
+            tts_generator: Generator used for chunking, synthesis and speed changes
+            text_rewriter: Rewriter for the tone pass (None to narrate the text as is)
+            store: Segment store (default: the process-wide store)
+            executor: Optional TTSProcessPool to shard chunks across processes
+        """
+        self.tts_generator = tts_generator
+        # Without a backend the text is narrated as is, and stored segments must say so
+        self.text_rewriter = text_rewriter if text_rewriter is not None and text_rewriter.available else None
+        self.store = store or get_segment_store()
+        self.executor = executor
+        self.window = BATCH_SIZE * 4 * (executor.num_workers if executor is not None else 1)
+
+    def render(self, text: str, tone: str = "neutral", voice_embedding_id: int = 9000, speed: float = 1.0,
+               max_length: int = 300, output_format: str = "wav", bitrate_kbps: int = None,
+               progress_callback=None, preview_callback=None) -> RenderResult:
+        """
+        Render a document, reusing every segment already rendered with the same settings
+
+        Args:
+            text: Source text of any length
+            tone: Rewrite tone
+            voice_embedding_id: ID of the voice embedding to use
+            speed: Audio playback speed multiplier
+            max_length: Maximum length of each rewritten chunk (also the segment size)
+            output_format: Output format key ("wav", "mp3", "ogg" or "flac"); every format
+                but WAV re-encodes the whole document
+            bitrate_kbps: MP3 bitrate when output_format is "mp3"
+            progress_callback: Optional callable(done, total) invoked as segments become available
+            preview_callback: Optional callable(samples) invoked with the first segment's audio
+
+        Returns:
+            RenderResult with the encoded clip and reuse counts
+        """
+        started = time.perf_counter()
+        sources = TextChunker(max_length).split(text)
+        settings = self._settings(tone, voice_embedding_id, speed, max_length)
+        keys = [SegmentStore.make_key(source, settings) for source in sources]
+
+        segments = {}  # key -> StoredSegment
+        unstored = {}  # key -> block of segments that were rendered but not kept
+        with trace_span("segment_lookup", segments=len(keys)):
+            for key in dict.fromkeys(keys):
+                stored = self.store.get(key)
+                if stored is not None:
+                    segments[key] = stored
+        missing, seen = [], set(segments)
+        for index, key in enumerate(keys):
+            if key not in seen:
+                missing.append(index)
+                seen.add(key)
+        reused = len(keys) - len(missing)
+        SEGMENTS.inc(reused, source="store")
+        SEGMENTS.inc(len(missing), source="rendered")
+        logger.info("Incremental render: %d segments, %d reused, %d to render", len(keys), reused, len(missing))
+
+        time_to_first_audio = None
+        if keys and keys[0] in segments:
+            time_to_first_audio = time.perf_counter() - started
+            if preview_callback:
+                preview_callback(self._decode(segments[keys[0]].read_block()))
+        done = reused
+        if progress_callback:
+            progress_callback(done, len(keys))
+
+        # Windows double like stream_speech's, so the first missing segment is ready quickly
+        position = 0
+        window = 1
+        while position < len(missing):
+            indices = missing[position:position + window]
+            with trace_span("render_segments", segments=len(indices)):
+                rendered = self._render_segments([sources[index] for index in indices], tone, voice_embedding_id,
+                                                 speed, max_length)
+            for index, (narration, samples, block, complete) in zip(indices, rendered):
+                if index == 0:
+                    time_to_first_audio = time.perf_counter() - started
+                    if preview_callback:
+                        preview_callback(samples)
+                key = keys[index]
+                stored = self.store.put(key, narration, block, samples.size) if complete else None
+                if stored is None:
+                    stored = StoredSegment(key, narration, samples.size, None)
+                    unstored[key] = block
+                segments[key] = stored
+            done += len(indices)
+            position += len(indices)
+            window = min(window * 2, self.window)
+            if progress_callback:
+                progress_callback(done, len(keys))
+
+        ordered = [segments[key] for key in keys]
+        total_samples = sum(segment.samples for segment in ordered)
+        encoded = join_blocks((unstored.get(segment.key) or self._read_block(segment) for segment in ordered),
+                              total_samples, SAMPLE_RATE, output_format, bitrate_kbps)
+        spec = FORMATS[output_format]
+        metadata = AudioMetadata(total_samples, SAMPLE_RATE, 1, spec["format"], spec["subtype"])
+        return RenderResult(
+            clip=AudioClip.from_encoded(encoded, output_format, metadata=metadata),
+            text="\n\n".join(segment.text for segment in ordered),
+            segments=len(keys),
+            reused=reused,
+            time_to_first_audio=time_to_first_audio or 0.0,
+        )
+
+    def _settings(self, tone, voice_embedding_id, speed, max_length) -> dict:
+        """
+        Everything besides the source text that a segment's audio depends on
+
+        Blocks are PCM whatever the output format, so one stored segment serves
+        every format; block_format retires stores written before that.
+        """
+        return {
+            "rewrite_model": getattr(self.text_rewriter, "model_id", None),
+            "tone": tone if self.text_rewriter is not None else None,
+            "max_length": max_length,
+            "voice_embedding_id": voice_embedding_id,
+            "speed": round(speed, 4),
+            "model_revision": self.tts_generator.model_revision,
+            "block_format": "pcm16",
+            "fade_ms": SEGMENT_FADE_MS,
+        }
+
+    def _render_segments(self, sources, tone, voice_embedding_id, speed, max_length) -> list:
+        """
+        Rewrite, synthesize and encode segments
+
+        Returns:
+            (narration, samples, block, complete) per segment, where complete is
+            False if the rewrite or any chunk fell back and the result should not be kept
+        """
+        tts = self.tts_generator
+        failed = set()
+        if self.text_rewriter is not None:
+            narrations = self.text_rewriter.rewrite_many(sources, tone, max_length=max_length,
+                                                         error_callback=failed.add)
+        else:
+            narrations = list(sources)
+
+        chunker = TextChunker(min(MAX_CHUNK_TOKENS, MAX_INPUT_TOKENS), count_tokens=tts._count_tokens)
+        segment_chunks = [chunker.split(narration) for narration in narrations]
+        items = [(chunk, voice_embedding_id) for chunks in segment_chunks for chunk in chunks]
+        synthesize = self.executor.synthesize if self.executor is not None else None
+        speeches = tts._synthesize_chunks(items, speed, synthesize=synthesize) if items else []
+
+        results = []
+        position = 0
+        fade = int(SAMPLE_RATE * SEGMENT_FADE_MS / 1000)
+        for index, (narration, chunks) in enumerate(zip(narrations, segment_chunks)):
+            # A failed rewrite falls back to the source text, which must not be kept as the narration
+            complete = index not in failed
+            stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, output_format=None)
+            for chunk, speech in zip(chunks, speeches[position:position + len(chunks)]):
+                if speech is None:
+                    complete = False
+                    speech = np.zeros(int(len(chunk) * 0.15 * SAMPLE_RATE), dtype=np.float32)
+                stitcher.add(speech)
+            position += len(chunks)
+            samples = stitcher.finish_samples()
+            if samples.size > 2 * fade:
+                samples[:fade] *= np.linspace(0.0, 1.0, fade, dtype=np.float32)
+                samples[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)
+            block = encode_block(samples)
+            results.append((narration, samples, block, complete))
+        return results
+
+    @staticmethod
+    def _read_block(segment: StoredSegment) -> bytes:
+        try:
+            return segment.read_block()
+        except OSError as e:
+            # Only happens when one document outgrows the whole store
+            raise RuntimeError(f"Segment {segment.key[:12]} was evicted while the document was rendering; "
+                               f"raise ECHOVERSE_SEGMENT_STORE_MB") from e
+
+    @staticmethod
+    def _decode(block: bytes) -> np.ndarray:
+        """Float samples of a segment block (for previews)"""
+        return np.frombuffer(block, dtype="<i2").astype(np.float32) / 32767
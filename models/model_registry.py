@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+
+from models.text_rewriter import TextRewriter
+from models.tts_generator import TTSGenerator
+from models.quantization import module_bytes
+from utils.metrics import current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def _parameter_bytes(instance) -> int:
+    """Total size of torch weights held by an instance's modules (or its backend's), int8-packed ones included"""
+    values = list(vars(instance).values())
+    backend = getattr(instance, "backend", None)
+    if backend is not None:
+        values.extend(vars(backend).values())
+    return sum(module_bytes(value) for value in values if hasattr(value, "state_dict"))
+
+
+class ModelRegistry:
+    def __init__(self):
+        """
+        Process-wide registry that loads each model once and shares it
+
+        Instances are shared read-only across Streamlit sessions: torch modules
+        are put in eval mode with gradients disabled, and callers must not
+        mutate model state.
+        """
+        self._factories = {
+            "tts_generator": TTSGenerator,
+            "text_rewriter": TextRewriter,
+        }
+        self._instances = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self._factories}
+
+    def get(self, name: str):
+        """
+        Shared instance for a model name, loading it on first use
+
+        Args:
+            name: Registered model name ("tts_generator" or "text_rewriter")
+
+        Returns:
+            The shared instance
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Unknown model: {name}")
+
+        # Per-model lock so loading one model doesn't block readers of another
+        with self._load_locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                instance = self._load(name)
+        return instance
+
+    def warmup(self, names=None):
+        """Load the given models (default: all) and run one tiny inference each"""
+        for name in names or self._factories:
+            instance = self.get(name)
+            if hasattr(instance, "warmup"):
+                start = time.perf_counter()
+                instance.warmup()
+                with self._lock:
+                    self._stats[name]["warmup_seconds"] = time.perf_counter() - start
+
+    def stats(self) -> dict:
+        """Load time and memory figures per loaded model"""
+        with self._lock:
+            return {name: dict(values) for name, values in self._stats.items()}
+
+    def _load(self, name: str):
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        instance = self._factories[name]()
+        load_seconds = time.perf_counter() - start
+
+        for value in vars(instance).values():
+            if hasattr(value, "eval") and hasattr(value, "requires_grad_"):
+                value.eval()
+                value.requires_grad_(False)
+
+        stats = {
+            "load_seconds": load_seconds,
+            "parameter_bytes": _parameter_bytes(instance),
+            "rss_delta_bytes": max(0, current_rss_bytes() - rss_before),
+        }
+        logger.info("Loaded %s in %.1fs (%.0f MB parameters)",
+                    name, load_seconds, stats["parameter_bytes"] / 1024 / 1024)
+        with self._lock:
+            self._stats[name] = stats
+            self._instances[name] = instance
+        return instance
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """The process-wide model registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,313 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+import re
+import threading
+from dotenv import load_dotenv
+from models.async_rewrite_client import AsyncRewriteClient
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REMOTE_MODEL_ID = "ibm-granite/granite-3.1-8b-instruct"
+LOCAL_MODEL_ID = "HuggingFaceTB/SmolLM2-360M-Instruct"
+ANSWER_MARKER = "Rewritten text:"
+TONE_INSTRUCTIONS = {
+    "neutral": "Rewrite the following text in a clear, neutral, and professional tone while preserving the original meaning:",
+    "suspenseful": "Rewrite the following text in a suspenseful, mysterious tone that builds tension while keeping the original meaning:",
+    "inspiring": "Rewrite the following text in an inspiring, uplifting, and motivational tone while preserving the original meaning:",
+}
+
+
+def build_prompt(text: str, tone: str) -> str:
+    """Instruction prompt for a tone; the instruction comes first so prompts of one tone share a prefix"""
+    instruction = TONE_INSTRUCTIONS.get(tone, TONE_INSTRUCTIONS["neutral"])
+    if len(instruction) + len(text) + len(ANSWER_MARKER) + 4 > 2000:
+        text = text[:1500] + "..."
+    return f"{instruction}\n\n{text}\n\n{ANSWER_MARKER}"
+
+
+def clean_output(text: str) -> str:
+    """Strip a trailing sentence fragment and boilerplate lead-ins from generated text"""
+    text = text.strip()
+    sentences = text.split('.')
+    if len(sentences) > 1 and len(sentences[-1].strip()) < 10:
+        text = '.'.join(sentences[:-1]) + '.'
+    unwanted_phrases = [
+        "Here is the rewritten text:",
+        "Rewritten version:",
+        "Here's the text rewritten:",
+        "The rewritten text is:"
+    ]
+    for phrase in unwanted_phrases:
+        text = text.replace(phrase, "").strip()
+    return text
+
+
+class RewriteBackend:
+    """
+    Something that rewrites text in a tone
+
+    TextRewriter owns caching, truncation and metrics; a backend only turns
+    texts into rewrites. model_id names the backend's outputs in cache keys,
+    so two backends never share cached rewrites.
+    """
+    name = "base"
+    model_id = None
+    available = True
+
+    def rewrite(self, text: str, tone: str, parameters: dict) -> str:
+        """Rewrite one text; raises on failure so the error is never cached"""
+        raise NotImplementedError
+
+    def rewrite_many(self, texts, tone: str, parameters: dict, on_result):
+        """
+        Rewrite many texts, calling on_result(index, rewrite or exception) as each finishes
+
+        The default runs them one after another; backends override it when
+        they can do better.
+        """
+        for index, text in enumerate(texts):
+            try:
+                result = self.rewrite(text, tone, parameters)
+            except Exception as e:
+                result = e
+            on_result(index, result)
+
+    def warmup(self):
+        """Run one small rewrite so the first real one doesn't pay one-off setup costs"""
+        self.rewrite("Warm up.", "neutral", {"max_new_tokens": 8, "do_sample": False})
+
+
+class RemoteBackend(RewriteBackend):
+    name = "remote"
+
+    def __init__(self, model_id: str = REMOTE_MODEL_ID, token: str = None):
+        """
+        Hosted inference API: one call per text, or concurrent calls for many
+
+        Every request goes through one AsyncRewriteClient, so single rewrites
+        get the same retries, rate limit and URL override as batches.
+
+        Args:
+            model_id: Model repository id
+            token: API token (default: HUGGINGFACE_TOKEN)
+        """
+        self.model_id = model_id
+        self.token = token or os.getenv("HUGGINGFACE_TOKEN")
+        self.client = AsyncRewriteClient(self.model_id, token=self.token)
+        # Decided from configuration alone: probing the API here would need the network at startup
+        self.available = self.client.configured
+        if self.available:
+            logger.info("Remote rewrite backend initialized with model: %s (%s)", self.model_id, self.client.api_url)
+        else:
+            logger.error("Neither HUGGINGFACE_TOKEN nor ECHOVERSE_REWRITE_API_URL is set. "
+                         "Falling back to no rewriting.")
+
+    def rewrite(self, text: str, tone: str, parameters: dict) -> str:
+        prompt = build_prompt(text, tone)
+        # Raises on error responses, so they are never cached
+        content_type, content = self.client.generate(prompt, parameters)
+        return self._parse_response(content_type, content, prompt)
+
+    def rewrite_many(self, texts, tone: str, parameters: dict, on_result):
+        # All requests go out at once, so a long document takes roughly one request latency
+        prompts = [build_prompt(text, tone) for text in texts]
+
+        def on_response(index, response):
+            if not isinstance(response, Exception):
+                try:
+                    response = self._parse_response(*response, prompts[index])
+                except Exception as e:
+                    response = e
+            on_result(index, response)
+
+        asyncio.run(self.client.generate_many(prompts, parameters, on_result=on_response))
+
+    def warmup(self):
+        pass  # Nothing local to warm up; a network call would only add startup latency
+
+    def _parse_response(self, content_type: str, content: bytes, prompt: str) -> str:
+        """Extract and clean the rewritten text from a raw API response"""
+        if content_type.startswith("application/json"):
+            data = json.loads(content)
+            if isinstance(data, list) and data and "generated_text" in data[0]:
+                generated = data[0]["generated_text"]
+            else:
+                generated = ""
+        else:
+            generated = content.decode("utf-8")
+
+        if ANSWER_MARKER in generated:
+            rewritten = generated.split(ANSWER_MARKER)[-1].strip()
+        else:
+            rewritten = generated[len(prompt):].strip()
+        return clean_output(rewritten)
+
+
+class LocalLMBackend(RewriteBackend):
+    name = "local"
+
+    def __init__(self, model_id: str = None, reuse_prefix: bool = True):
+        """
+        Small causal LM run on this machine's CPU
+
+        Every prompt of a tone starts with the same instruction, so its
+        key/value cache is computed once per tone and each rewrite only
+        prefills its own text before decoding. Generations are serialized: one
+        at a time already uses every core.
+
+        Args:
+            model_id: Model repository id or local path
+                (default: ECHOVERSE_REWRITE_LOCAL_MODEL or SmolLM2-360M-Instruct)
+            reuse_prefix: Reuse the tone prefix's key/value cache (off only for benchmarking)
+        """
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        self.model_id = model_id or os.getenv("ECHOVERSE_REWRITE_LOCAL_MODEL") or LOCAL_MODEL_ID
+        self.reuse_prefix = reuse_prefix
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        self.model = AutoModelForCausalLM.from_pretrained(self.model_id, torch_dtype=torch.float32).eval()
+        self._prefixes = {}  # tone -> (prefix text, prefix token ids, key/value cache)
+        self._lock = threading.Lock()
+        logger.info("Local rewrite backend initialized with model: %s", self.model_id)
+
+    def rewrite(self, text: str, tone: str, parameters: dict) -> str:
+        torch = self.torch
+        with self._lock, torch.inference_mode():
+            prefix, prefix_ids, prefix_cache = self._prefix(tone)
+            suffix = self._render(text, tone)[len(prefix):]
+            suffix_ids = self.tokenizer(suffix, add_special_tokens=False, return_tensors="pt")["input_ids"]
+            input_ids = torch.cat([prefix_ids, suffix_ids], dim=1)
+            generate_options = {
+                "max_new_tokens": parameters.get("max_new_tokens", 300),
+                "do_sample": parameters.get("do_sample", False),
+                "pad_token_id": self.tokenizer.pad_token_id or self.tokenizer.eos_token_id,
+            }
+            if generate_options["do_sample"]:
+                generate_options.update(temperature=parameters.get("temperature", 0.7),
+                                        top_p=parameters.get("top_p", 0.9))
+            if self.reuse_prefix:
+                # generate() extends the cache in place, so each call gets its own copy
+                generate_options["past_key_values"] = copy.deepcopy(prefix_cache)
+            output = self.model.generate(input_ids, attention_mask=torch.ones_like(input_ids), **generate_options)
+        generated = self.tokenizer.decode(output[0, input_ids.shape[1]:], skip_special_tokens=True)
+        return clean_output(generated)
+
+    def _render(self, text: str, tone: str) -> str:
+        """Full prompt text, wrapped in the model's chat template when it has one"""
+        prompt = build_prompt(text, tone)
+        if getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template([{"role": "user", "content": prompt}],
+                                                      tokenize=False, add_generation_prompt=True)
+        return prompt
+
+    def _prefix(self, tone: str):
+        """Text, token ids and key/value cache of the part of the prompt shared by every text in a tone"""
+        if tone not in self._prefixes:
+            # Render with a placeholder to find where the text goes
+            prefix = self._render("\x00", tone).split("\x00")[0]
+            prefix_ids = self.tokenizer(prefix, add_special_tokens=False, return_tensors="pt")["input_ids"]
+            cache = None
+            if self.reuse_prefix:
+                cache = self.model(prefix_ids, use_cache=True).past_key_values
+            self._prefixes[tone] = (prefix, prefix_ids, cache)
+        return self._prefixes[tone]
+
+
+# Case-preserving word swaps per tone
+_TONE_WORDS = {
+    "inspiring": {
+        "problem": "challenge", "problems": "challenges", "difficult": "demanding", "failure": "setback",
+        "failures": "setbacks", "failed": "stumbled", "impossible": "daunting", "try": "strive",
+        "tried": "strove", "hope": "believe", "maybe": "surely",
+    },
+    "suspenseful": {
+        "suddenly": "without warning", "quiet": "still", "dark": "pitch-dark", "saw": "glimpsed",
+        "walked": "crept", "looked": "peered", "sound": "faint sound", "noise": "faint noise",
+    },
+}
+_ABBREVIATIONS = [
+    (re.compile(r"\bDr\."), "Doctor"),
+    (re.compile(r"\bMr\."), "Mister"),
+    (re.compile(r"\bMrs\."), "Missus"),
+    (re.compile(r"\be\.g\.", re.IGNORECASE), "for example"),
+    (re.compile(r"\bi\.e\.", re.IGNORECASE), "that is"),
+    (re.compile(r"\betc\.", re.IGNORECASE), "and so on"),
+    (re.compile(r"\s*&\s*"), " and "),
+    (re.compile(r"(\d)\s*%"), r"\1 percent"),
+]
+_FILLERS = re.compile(r"\b(?:basically|actually|literally|really|very|just|kind of|sort of)\s+", re.IGNORECASE)
+_WORD = re.compile(r"[A-Za-z]+")
+
+
+class RuleBasedBackend(RewriteBackend):
+    name = "rules"
+    model_id = "rules-v1"
+
+    def __init__(self):
+        """
+        Deterministic tone transformer: no model, microseconds per text
+
+        Spells out abbreviations the TTS would read literally, then applies
+        per-tone rules: neutral drops filler words and exclamations,
+        suspenseful swaps in tenser words and trails sentences off into
+        pauses, inspiring swaps in positive words and ends on an exclamation.
+        """
+
+    def rewrite(self, text: str, tone: str, parameters: dict) -> str:
+        text = " ".join(text.split())
+        for pattern, replacement in _ABBREVIATIONS:
+            text = pattern.sub(replacement, text)
+
+        if tone == "suspenseful":
+            text = self._swap_words(text, _TONE_WORDS["suspenseful"])
+            text = re.sub(r",\s+(but|and then|until)\b", r"... \1", text)
+            text = re.sub(r"[.!]$", "...", text)
+        elif tone == "inspiring":
+            text = self._swap_words(text, _TONE_WORDS["inspiring"])
+            text = re.sub(r"\.$", "!", text)
+        else:
+            text = _FILLERS.sub("", text)
+            text = re.sub(r"!+", ".", text)
+        return text[:1].upper() + text[1:]
+
+    def warmup(self):
+        pass
+
+    @staticmethod
+    def _swap_words(text: str, words: dict) -> str:
+        def swap(match):
+            word = match.group(0)
+            replacement = words.get(word.lower())
+            if replacement is None:
+                return word
+            if word.isupper() and len(word) > 1:
+                return replacement.upper()
+            return replacement[:1].upper() + replacement[1:] if word[0].isupper() else replacement
+        return _WORD.sub(swap, text)
+
+
+BACKENDS = {
+    "remote": RemoteBackend,
+    "local": LocalLMBackend,
+    "rules": RuleBasedBackend,
+}
+
+
+def create_backend(name: str = None) -> RewriteBackend:
+    """
+    Instantiate a rewrite backend by name
+
+    Args:
+        name: "remote", "local" or "rules" (default: ECHOVERSE_REWRITE_BACKEND, or remote)
+    """
+    name = name or os.getenv("ECHOVERSE_REWRITE_BACKEND", "remote")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown rewrite backend {name!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
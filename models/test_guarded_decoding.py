@@ -0,0 +1,134 @@
+import pytest
+import torch
+
+from models import guarded_decoding
+from models.guarded_decoding import (FRAME_SECONDS, REPEAT_WINDOW, SILENCE_SECONDS, TAIL_SECONDS, _RowMonitor,
+                                     _select_rows, guarded_generate_speech)
+
+MEL_BINS = 4
+REDUCTION = 2
+
+
+def feed(monitor, frames):
+    """Add (frames, MEL_BINS) log-mel frames to a monitor, REDUCTION per step"""
+    for start in range(0, len(frames), REDUCTION):
+        spectrum = frames[start:start + REDUCTION]
+        monitor.add(spectrum, spectrum.mean(dim=-1).tolist())
+
+
+def speech(frames):
+    torch.manual_seed(0)
+    return torch.randn(frames, MEL_BINS) * 0.5
+
+
+def silence(frames):
+    return torch.full((frames, MEL_BINS), -5.0)
+
+
+def test_trailing_silence_stops_and_is_trimmed_to_the_tail():
+    monitor = _RowMonitor()
+    feed(monitor, speech(40))
+    assert not monitor.silent_tail()
+    quiet = int(SILENCE_SECONDS / FRAME_SECONDS) + REDUCTION
+    feed(monitor, silence(quiet))
+    assert monitor.silent_tail()
+    assert len(monitor.spectrogram("silence")) == 40 + int(TAIL_SECONDS / FRAME_SECONDS)
+
+
+def test_short_pause_is_not_silence():
+    monitor = _RowMonitor()
+    feed(monitor, speech(40))
+    feed(monitor, silence(10))
+    feed(monitor, speech(10))
+    assert monitor.quiet_run == 0
+    assert not monitor.silent_tail()
+
+
+def test_looping_frames_are_repetition_and_the_repeat_is_dropped():
+    monitor = _RowMonitor()
+    loop = speech(20)
+    feed(monitor, torch.cat([loop] * 4))
+    assert monitor.repeating()
+    assert len(monitor.spectrogram("repetition")) == 80 - REPEAT_WINDOW
+
+
+def test_varied_speech_is_not_repetition():
+    monitor = _RowMonitor()
+    torch.manual_seed(1)
+    feed(monitor, torch.randn(120, MEL_BINS))
+    assert not monitor.repeating()
+
+
+def test_other_stops_keep_every_frame():
+    monitor = _RowMonitor()
+    feed(monitor, speech(30))
+    assert len(monitor.spectrogram("stop_token")) == len(monitor.spectrogram("length")) == 30
+
+
+def test_select_rows_of_a_legacy_tuple_cache():
+    layer = tuple(torch.arange(3.0).view(3, 1, 1, 1).expand(3, 2, 5, 4) for _ in range(4))
+    selected = _select_rows((layer, layer), torch.tensor([0, 2]))
+    assert len(selected) == 2 and len(selected[0]) == 4
+    assert selected[1][3][:, 0, 0, 0].tolist() == [0.0, 2.0]
+
+
+@pytest.fixture(scope="module")
+def model():
+    from transformers import SpeechT5Config, SpeechT5ForTextToSpeech
+
+    torch.manual_seed(0)
+    config = SpeechT5Config(hidden_size=32, encoder_layers=1, decoder_layers=1, encoder_attention_heads=2,
+                            decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32,
+                            speech_decoder_prenet_units=32, speech_decoder_postnet_units=32,
+                            speech_decoder_postnet_layers=2, speaker_embedding_dim=8)
+    return SpeechT5ForTextToSpeech(config).eval()
+
+
+def decode(model, lengths, stop_bias):
+    with torch.no_grad():
+        model.speech_decoder_postnet.prob_out.bias.fill_(stop_bias)
+    input_ids = torch.ones(len(lengths), max(lengths), dtype=torch.long)
+    attention_mask = torch.zeros_like(input_ids)
+    for row, length in enumerate(lengths):
+        input_ids[row, :length] = torch.arange(4, 4 + length)
+        attention_mask[row, :length] = 1
+    speakers = torch.randn(len(lengths), 8)
+    with torch.inference_mode():
+        return guarded_generate_speech(model, input_ids, speakers, attention_mask=attention_mask)
+
+
+def test_stop_token_ends_every_row_at_once(model):
+    spectrograms, report = decode(model, [3, 7], stop_bias=20.0)
+    reduction = model.config.reduction_factor
+    assert report.stops == {"stop_token": 2}
+    assert [len(spectrogram) for spectrogram in spectrograms] == [reduction, reduction]
+    assert report.frames == 2 * reduction
+
+
+def test_runaway_rows_stop_within_their_own_length_cap(model):
+    spectrograms, report = decode(model, [2, 9], stop_bias=-20.0)
+    reduction = model.config.reduction_factor
+    assert "stop_token" not in report.stops and sum(report.stops.values()) == 2
+    for spectrogram, tokens in zip(spectrograms, [2, 9]):
+        cap = max(-(-tokens * guarded_decoding.MAX_FRAMES_PER_TOKEN // reduction),
+                  guarded_decoding.MIN_FRAMES // reduction) * reduction
+        assert 0 < len(spectrogram) <= cap
+        assert spectrogram.shape[1] == model.config.num_mel_bins
+    assert report.frames - report.frames_trimmed == sum(len(spectrogram) for spectrogram in spectrograms)
+    assert report.frames_saved > 0
+
+
+def test_legacy_tuple_cache_decodes_the_same(model, monkeypatch):
+    from transformers.cache_utils import EncoderDecoderCache
+
+    torch.manual_seed(3)
+    expected, _ = decode(model, [2, 9], stop_bias=-20.0)
+    def missing(cache):
+        raise AttributeError("batch_select_indices")
+
+    # As on versions whose decoder cache has no batch_select_indices
+    monkeypatch.setattr(EncoderDecoderCache, "batch_select_indices", property(missing))
+    torch.manual_seed(3)
+    spectrograms, _ = decode(model, [2, 9], stop_bias=-20.0)
+    for got, want in zip(spectrograms, expected):
+        torch.testing.assert_close(got, want)
@@ -0,0 +1,81 @@
+import io
+
+import pytest
+import soundfile as sf
+
+from models.incremental_renderer import IncrementalRenderer
+from models.rewrite_backends import RewriteBackend, RuleBasedBackend
+from models.text_rewriter import TextRewriter
+from models.tts_generator import SAMPLE_RATE
+from utils.rewrite_cache import RewriteCache
+from utils.segment_store import SegmentStore
+
+PARAGRAPHS = [
+    "The lighthouse keeper climbed the stairs every night.",
+    "He watched the dark water for ships that never came.",
+    "The wind pulled at the shutters while the lamp burned on.",
+    "In the morning he wrote the same line in his log.",
+    "Nothing to report, he wrote, and went to sleep.",
+    "Years passed in this way until the letter arrived.",
+]
+DOCUMENT = "\n\n".join(PARAGRAPHS)
+
+
+class FailingBackend(RewriteBackend):
+    name = "failing"
+    model_id = "failing"
+
+    def rewrite(self, text, tone, parameters):
+        raise ConnectionError("backend down")
+
+
+def render(tts, rewriter, store, text=DOCUMENT, output_format="wav"):
+    return IncrementalRenderer(tts, rewriter, store=store).render(text, "neutral", max_length=80,
+                                                                  output_format=output_format)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SegmentStore(str(tmp_path / "segments"))
+
+
+def test_rerender_reuses_every_segment_when_rewrite_leaves_text_unchanged(store, stub_tts):
+    # Neutral rules leave plain prose as it is; that is a successful rewrite
+    rewriter = TextRewriter(backend=RuleBasedBackend(), cache=RewriteCache())
+    first = render(stub_tts, rewriter, store)
+    assert first.segments == len(PARAGRAPHS)
+    assert first.reused == 0
+
+    synthesized = stub_tts.synthesized
+    second = render(stub_tts, rewriter, store)
+    assert second.reused == second.segments == len(PARAGRAPHS)
+    assert stub_tts.synthesized == synthesized
+    assert second.clip.metadata.frames == first.clip.metadata.frames
+
+
+def test_edit_rerenders_only_the_changed_segment(store, stub_tts):
+    rewriter = TextRewriter(backend=RuleBasedBackend(), cache=RewriteCache())
+    render(stub_tts, rewriter, store)
+    edited = DOCUMENT.replace("every night", "every single night")
+    result = render(stub_tts, rewriter, store, text=edited)
+    assert result.reused == len(PARAGRAPHS) - 1
+
+
+def test_failed_rewrites_are_not_stored(store, stub_tts):
+    rewriter = TextRewriter(backend=FailingBackend(), cache=RewriteCache())
+    render(stub_tts, rewriter, store)
+    assert render(stub_tts, rewriter, store).reused == 0
+
+
+def test_joined_mp3_decodes_to_the_sum_of_its_segments(store, stub_tts):
+    rewriter = TextRewriter(backend=RuleBasedBackend(), cache=RewriteCache())
+    wav = render(stub_tts, rewriter, store)
+    mp3 = render(stub_tts, rewriter, store, output_format="mp3")
+    # Blocks do not depend on the output format, so the MP3 render reuses the WAV one's segments
+    assert mp3.reused == mp3.segments
+
+    decoded, sample_rate = sf.read(io.BytesIO(mp3.clip.encoded), dtype="float32")
+    assert sample_rate == SAMPLE_RATE
+    assert mp3.clip.metadata.frames == wav.clip.metadata.frames
+    # One encoder delay and padding for the whole file, not one per segment
+    assert abs(len(decoded) - wav.clip.metadata.frames) < 1152
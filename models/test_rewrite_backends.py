@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.stub_inference_server import serve
+from models.async_rewrite_client import AsyncRewriteClient, TokenBucket
+from models.rewrite_backends import RemoteBackend
+
+PARAMETERS = {"max_new_tokens": 16}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Start a stub server; returns start(**options) -> (url, stats), with the rewriter pointed at it"""
+    servers = []
+
+    def start(latency=0.0, fail_first=0):
+        server, stats = serve(port=0, latency=latency, fail_first=fail_first)
+        servers.append(server)
+        url = f"http://127.0.0.1:{server.server_address[1]}/models"
+        monkeypatch.setenv("ECHOVERSE_REWRITE_API_URL", url)
+        return url, stats
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_remote_backend_is_available_from_configuration_alone(stub, monkeypatch):
+    monkeypatch.delenv("HUGGINGFACE_TOKEN", raising=False)
+    monkeypatch.delenv("ECHOVERSE_REWRITE_API_URL", raising=False)
+    assert not RemoteBackend(token="").available
+    assert RemoteBackend(token="secret").available
+
+    stub()
+    assert RemoteBackend(token="").available
+
+
+def test_single_rewrite_goes_through_the_stub_and_retries(stub):
+    _, stats = stub(fail_first=2)  # One 429, then one 503
+    backend = RemoteBackend(token="")
+    backend.client.backoff_base = 0.01
+    assert backend.rewrite("The door creaked.", "neutral", PARAMETERS) == "THE DOOR CREAKED."
+    assert stats["requests"] == 3
+    assert stats["failures"] == 2
+
+
+def test_rewrite_many_reports_each_result(stub):
+    stub()
+    backend = RemoteBackend(token="")
+    results = {}
+    backend.rewrite_many(["one.", "two."], "neutral", PARAMETERS, results.__setitem__)
+    assert results == {0: "ONE.", 1: "TWO."}
+
+
+def test_retries_give_up_after_max_retries(stub):
+    url, stats = stub(fail_first=10)
+    client = AsyncRewriteClient("stub", api_url=url, max_retries=2, backoff_base=0.01)
+    with pytest.raises(Exception) as error:
+        client.generate("prompt", PARAMETERS)
+    assert getattr(error.value, "status", None) in (429, 503)
+    assert stats["requests"] == 3
+
+
+def test_concurrency_is_capped(stub):
+    url, stats = stub(latency=0.1)
+    client = AsyncRewriteClient("stub", api_url=url, max_concurrency=3, rate_per_second=0)
+    results = asyncio.run(client.generate_many([f"prompt {index}" for index in range(9)], PARAMETERS))
+    assert not any(isinstance(result, Exception) for result in results)
+    assert stats["peak_in_flight"] <= 3
+    assert stats["requests"] == 9
+
+
+def test_rate_limit_spaces_requests_to_the_stub(stub):
+    url, stats = stub()
+    client = AsyncRewriteClient("stub", api_url=url, max_concurrency=2, rate_per_second=20.0)
+    started = time.monotonic()
+    asyncio.run(client.generate_many([f"prompt {index}" for index in range(6)], PARAMETERS))
+    # The first two use the burst, the other four wait for tokens
+    assert time.monotonic() - started >= 4 / 20 * 0.9
+    assert stats["requests"] == 6
+
+
+def test_token_bucket_limits_the_sustained_rate():
+    async def take(count):
+        bucket = TokenBucket(rate=50.0, burst=2)
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two tokens come from the burst, the other eight at 50 per second
+    assert asyncio.run(take(10)) >= 8 / 50 * 0.9
+    assert asyncio.run(take(2)) < 0.05
@@ -0,0 +1,83 @@
+import threading
+import time
+
+from models.rewrite_backends import RewriteBackend
+from models.text_rewriter import TextRewriter
+from utils.rewrite_cache import RewriteCache
+
+
+class GatedBackend(RewriteBackend):
+    """Upper-cases text, holding every call until released"""
+    name = "gated"
+    model_id = "gated"
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def rewrite(self, text, tone, parameters):
+        self.calls.append(text)
+        self.started.set()
+        assert self.release.wait(5)
+        return text.upper()
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def run_in_thread(function, *args):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(function(*args)))
+    thread.start()
+    return thread, results
+
+
+def test_interactive_rewrite_waits_for_the_same_chunk_in_a_batch():
+    backend = GatedBackend()
+    rewriter = TextRewriter(backend=backend, cache=RewriteCache())
+    batch, batch_results = run_in_thread(rewriter.rewrite_many, ["It was late.", "Rain fell."], "neutral")
+    assert backend.started.wait(5)
+    single, single_results = run_in_thread(rewriter.rewrite_text, "It was late.", "neutral")
+    wait_until(lambda: rewriter.cache.stats()["coalesced"] == 1)
+    backend.release.set()
+    batch.join(5)
+    single.join(5)
+    assert batch_results == [["IT WAS LATE.", "RAIN FELL."]]
+    assert single_results == ["IT WAS LATE."]
+    assert backend.calls == ["It was late.", "Rain fell."]
+
+
+def test_batch_waits_for_a_chunk_already_being_rewritten():
+    backend = GatedBackend()
+    rewriter = TextRewriter(backend=backend, cache=RewriteCache())
+    single, single_results = run_in_thread(rewriter.rewrite_text, "It was late.", "neutral")
+    assert backend.started.wait(5)
+    failed = []
+    batch, batch_results = run_in_thread(
+        lambda: rewriter.rewrite_many(["It was late.", "Rain fell."], "neutral", error_callback=failed.append))
+    wait_until(lambda: rewriter.cache.stats()["coalesced"] == 1)
+    backend.release.set()
+    single.join(5)
+    batch.join(5)
+    assert batch_results == [["IT WAS LATE.", "RAIN FELL."]]
+    assert sorted(backend.calls) == ["It was late.", "Rain fell."]
+    assert failed == []
+
+
+def test_batch_failures_reach_waiting_callers_and_are_not_cached():
+    class FailingBackend(RewriteBackend):
+        name = model_id = "failing"
+
+        def rewrite(self, text, tone, parameters):
+            raise ConnectionError("down")
+
+    rewriter = TextRewriter(backend=FailingBackend(), cache=RewriteCache())
+    failed = []
+    assert rewriter.rewrite_many(["a.", "", "a."], "neutral", error_callback=failed.append) == ["a.", "", "a."]
+    assert failed == [0, 2]
+    assert rewriter.cache.stats()["entries"] == 0
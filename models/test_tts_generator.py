@@ -0,0 +1,79 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_stages import HOP_LENGTH, StubModel, make_generator, make_text
+
+# Shuffled lengths so buckets, and the order they finish in, differ from input order
+WORDS = [3, 20, 7, 15, 2, 30, 12, 5, 16, 9, 18, 4, 25, 14, 6, 10]
+
+
+@pytest.fixture
+def generator():
+    generator = make_generator("stub")
+    generator.pipelined = True
+    return generator
+
+
+def make_items(voice_ids=(9000,)):
+    return [(make_text(words), voice_ids[index % len(voice_ids)]) for index, words in enumerate(WORDS)]
+
+
+def expected_samples(generator, text):
+    return generator._count_tokens(text) * StubModel.frames_per_token * HOP_LENGTH
+
+
+class SlowVocoder:
+    """Lets several decoded buckets queue up while the vocoder is busy"""
+
+    def __init__(self, vocoder):
+        self.vocoder = vocoder
+        self.batches = 0
+
+    def __call__(self, spectrograms):
+        self.batches += 1
+        time.sleep(0.02)
+        return self.vocoder(spectrograms)
+
+
+def test_pipelined_results_are_in_input_order(generator):
+    items = make_items()
+    calls = []
+    spectrograms = generator._spectrograms
+    generator._spectrograms = lambda batch: calls.append(threading.current_thread().name) or spectrograms(batch)
+    generator.vocoder = SlowVocoder(generator.vocoder)
+
+    results = generator._synthesize_batch(items, batch_size=2)
+    assert set(calls) == {"echoverse_acoustic_model"}
+    assert [len(speech) for speech in results] == [expected_samples(generator, text) for text, _ in items]
+
+
+@pytest.mark.parametrize("voice_ids", [(9000,), (9000, 7306)])
+def test_pipelined_matches_sequential(generator, voice_ids):
+    items = make_items(voice_ids)
+    generator.pipelined = False
+    sequential = generator._synthesize_batch(items, batch_size=3)
+    generator.pipelined = True
+    pipelined = generator._synthesize_batch(items, batch_size=3)
+
+    assert len(pipelined) == len(sequential) == len(items)
+    for expected, actual in zip(sequential, pipelined):
+        np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_pipeline_surfaces_decoder_errors(generator):
+    spectrograms = generator._spectrograms
+    batches = []
+
+    def failing(batch):
+        batches.append(batch)
+        if len(batches) == 2:
+            raise RuntimeError("decoder failed")
+        return spectrograms(batch)
+
+    generator._spectrograms = failing
+    with pytest.raises(RuntimeError, match="decoder failed"):
+        generator._synthesize_batch(make_items(), batch_size=2)
+    assert len(batches) == 2
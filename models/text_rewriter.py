@@ -1,20 +1,60 @@
-from huggingface_hub import InferenceApi, HfApi
 import os
-import json
+import logging
 from dotenv import load_dotenv
+from utils.text_chunker import TextChunker
+from utils.rewrite_cache import RewriteCache
+from utils.metrics import get_metrics, trace_span
+from models.rewrite_backends import RewriteBackend, create_backend
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+metrics = get_metrics()
+REWRITES = metrics.counter("echoverse_rewrite_texts_total", "Texts passed to the rewriter, by outcome",
+                           label_names=("outcome",))
+REWRITE_CHARACTERS = metrics.counter("echoverse_rewrite_input_characters_total", "Characters sent for rewriting")
+
 class TextRewriter:
-    def __init__(self):
-        self.model_id = "ibm-granite/granite-3.1-8b-instruct"
-        self.token = os.getenv("HUGGINGFACE_TOKEN")
-        try:
-            self.client = InferenceApi(repo_id=self.model_id, token=self.token)
-            print(f"TextRewriter initialized with model: {self.model_id}")
-        except Exception as e:
-            print(f"Error initializing TextRewriter: {e}. Falling back to no rewriting.")
-            self.client = None  # Fallback to no API client
+    def __init__(self, deterministic: bool = None, cache: RewriteCache = None, backend: RewriteBackend = None):
+        """
+        Args:
+            deterministic: Use greedy decoding so cached rewrites are exact
+                (default: ECHOVERSE_REWRITE_DETERMINISTIC, off unless set to 1)
+            cache: Rewrite cache to use (default: a new in-memory cache)
+            backend: Backend that produces rewrites
+                (default: the one named by ECHOVERSE_REWRITE_BACKEND, or the remote API)
+        """
+        self.backend = backend or create_backend()
+        self.model_id = self.backend.model_id
+        if deterministic is None:
+            deterministic = os.getenv("ECHOVERSE_REWRITE_DETERMINISTIC", "0") == "1"
+        self.deterministic = deterministic
+        self.cache = cache or RewriteCache()
+        self._register_cache_metrics()
+        logger.info("TextRewriter using the %s backend (%s)", self.backend.name, self.model_id)
+
+    def _register_cache_metrics(self):
+        """Export the rewrite cache's own counters at scrape time"""
+        for key, metric_type, help_text in (
+            ("hits", "counter", "Rewrites served from the rewrite cache"),
+            ("misses", "counter", "Rewrites that needed a model call"),
+            ("coalesced", "counter", "Rewrites that waited on an identical in-flight request"),
+            ("hit_rate", "gauge", "Fraction of rewrites served from the rewrite cache"),
+        ):
+            suffix = "_total" if metric_type == "counter" else ""
+            metrics.register_callback(f"echoverse_rewrite_cache_{key}{suffix}", help_text,
+                                      lambda key=key: self.cache.stats()[key], metric_type)
+
+    @property
+    def available(self) -> bool:
+        """Whether rewrites can happen at all; without a backend every text comes back unchanged"""
+        return self.backend.available
+
+    def warmup(self):
+        """Pay the backend's one-off setup costs (a local model's first forward pass) before the first request"""
+        if self.backend.available:
+            self.backend.warmup()
 
     def rewrite_text(self, text: str, tone: str, max_length: int = 300) -> str:
         """
@@ -31,74 +71,159 @@ class TextRewriter:
         if not text or len(text) > max_length:
             text = text[:max_length] if len(text) > max_length else text
         
-        if self.client is None:
-            print("No rewriting client available. Returning original text.")
+        if not self.backend.available:
+            logger.warning("No rewriting backend available. Returning original text.")
+            REWRITES.inc(outcome="no_client")
             return text
         
-        tone_prompts = {
-            "neutral": (
-                "Rewrite the following text in a clear, neutral, and professional tone while preserving the original meaning:\n\n"
-                f"{text}\n\nRewritten text:"
-            ),
-            "suspenseful": (
-                "Rewrite the following text in a suspenseful, mysterious tone that builds tension while keeping the original meaning:\n\n"
-                f"{text}\n\nRewritten text:"
-            ),
-            "inspiring": (
-                "Rewrite the following text in an inspiring, uplifting, and motivational tone while preserving the original meaning:\n\n"
-                f"{text}\n\nRewritten text:"
-            )
-        }
-        prompt = tone_prompts.get(tone, tone_prompts["neutral"])
-
-        if len(prompt) > 2000:
-            truncated_text = text[:1500] + "..."
-            prompt = tone_prompts[tone].replace(text, truncated_text)
+        parameters = self._generation_parameters(max_length)
+        key = RewriteCache.make_key(self.model_id, tone, max_length, text, parameters)
 
+        REWRITE_CHARACTERS.inc(len(text))
         try:
-            response = self.client(
-                {
-                    "inputs": prompt,
-                    "parameters": {
-                        "max_new_tokens": max_length,
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                        "do_sample": True
-                    }
-                },
-                raw_response=True
-            )
+            with trace_span("rewrite", characters=len(text), backend=self.backend.name):
+                rewritten = self.cache.get_or_compute(key, lambda: self.backend.rewrite(text, tone, parameters))
+            REWRITES.inc(outcome="ok" if rewritten else "empty")
+            return rewritten or text
+        except Exception as e:
+            logger.warning("Error rewriting text: %s. Returning original text.", e)
+            REWRITES.inc(outcome="error")
+            return text
 
-            if response.headers.get('content-type', '').startswith("application/json"):
-                data = json.loads(response.content)
-                if isinstance(data, list) and data and "generated_text" in data[0]:
-                    generated = data[0]["generated_text"]
-                else:
-                    generated = ""
-            else:
-                generated = response.content.decode("utf-8")
+    def _generation_parameters(self, max_length: int) -> dict:
+        if self.deterministic:
+            return {"max_new_tokens": max_length, "do_sample": False}
+        return {
+            "max_new_tokens": max_length,
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "do_sample": True
+        }
 
-            if "Rewritten text:" in generated:
-                rewritten = generated.split("Rewritten text:")[-1].strip()
+    def rewrite_many(self, texts, tone: str, max_length: int = 300, progress_callback=None,
+                     error_callback=None) -> list:
+        """
+        Rewrite many texts in one backend call
+        
+        Cached rewrites are returned directly and identical texts are rewritten
+        once; the rest go to the backend together, so the remote backend sends
+        them concurrently and a long document takes roughly one rewrite latency
+        instead of one per chunk.
+        
+        Args:
+            texts: Input texts to rewrite
+            tone: Desired tone (e.g., neutral, suspenseful, inspiring)
+            max_length: Maximum length of each rewritten text
+            progress_callback: Optional callable(done, total) invoked as texts finish
+            error_callback: Optional callable(index) invoked for each text that
+                could not be rewritten and is returned as is
+        
+        Returns:
+            Rewritten texts in input order; originals where rewriting fails
+        """
+        texts = [text[:max_length] if text and len(text) > max_length else text for text in texts]
+        if not self.backend.available:
+            logger.warning("No rewriting backend available. Returning original text.")
+            REWRITES.inc(len(texts), outcome="no_client")
+            if error_callback:
+                for index, text in enumerate(texts):
+                    if text:
+                        error_callback(index)
+            return list(texts)
+        
+        parameters = self._generation_parameters(max_length)
+        keys = [RewriteCache.make_key(self.model_id, tone, max_length, text, parameters) for text in texts]
+        results = list(texts)
+        claimed = {}  # key -> (future, leader) for keys not in the cache
+        for index, (text, key) in enumerate(zip(texts, keys)):
+            if not text:
+                continue
+            if key not in claimed:
+                value, future, leader = self.cache.claim(key)
+                if future is None:
+                    results[index] = value
+                    continue
+                claimed[key] = (future, leader)
+            results[index] = None
+        # Identical chunks are sent once and fan out to every position; keys another
+        # caller is already rewriting are waited for instead of sent again
+        pending = {}
+        for index, result in enumerate(results):
+            if result is None:
+                pending.setdefault(keys[index], []).append(index)
+        done = len(texts) - sum(len(indices) for indices in pending.values())
+        REWRITES.inc(done, outcome="cached")
+        if progress_callback and done:
+            progress_callback(done, len(texts))
+        if not pending:
+            return self._finish(results, texts, error_callback)
+        
+        def settle(key, rewritten):
+            nonlocal done
+            if isinstance(rewritten, Exception):
+                logger.warning("Error rewriting text: %s. Returning original text.", rewritten)
+                REWRITES.inc(len(pending[key]), outcome="error")
             else:
-                rewritten = generated[len(prompt):].strip()
+                for index in pending[key]:
+                    results[index] = rewritten
+                REWRITES.inc(len(pending[key]), outcome="ok")
+            done += len(pending[key])
+            if progress_callback:
+                progress_callback(done, len(texts))
+        
+        pending_keys = [key for key in pending if claimed[key][1]]
+        pending_texts = [texts[pending[key][0]] for key in pending_keys]
+        unresolved = set(pending_keys)
+        
+        def on_result(position, rewritten):
+            key = pending_keys[position]
+            unresolved.discard(key)
+            if isinstance(rewritten, Exception):
+                self.cache.resolve(key, error=rewritten)
+            else:
+                self.cache.resolve(key, rewritten)
+            settle(key, rewritten)
+        
+        REWRITE_CHARACTERS.inc(sum(len(text) for text in pending_texts))
+        try:
+            if pending_texts:
+                with trace_span("rewrite_batch", requests=len(pending_texts), texts=len(texts),
+                                backend=self.backend.name):
+                    self.backend.rewrite_many(pending_texts, tone, parameters, on_result)
+        finally:
+            # Never leave a claimed key in flight, or its waiters would block forever
+            for key in unresolved:
+                self.cache.resolve(key, error=RuntimeError("rewrite batch aborted"))
+        for key in pending:
+            future, leader = claimed[key]
+            if not leader:
+                exception = future.exception()
+                settle(key, exception if exception is not None else future.result())
+        return self._finish(results, texts, error_callback)
 
-            return self._clean_output(rewritten) or text
-        except Exception as e:
-            print(f"Error rewriting text: {e}. Returning original text.")
-            return text
+    @staticmethod
+    def _finish(results, texts, error_callback) -> list:
+        """Fill failed or empty rewrites with their source text, reporting each one"""
+        finished = []
+        for index, (result, text) in enumerate(zip(results, texts)):
+            if not result and text and error_callback:
+                error_callback(index)
+            finished.append(result or text)
+        return finished
 
-    def _clean_output(self, text: str) -> str:
-        text = text.strip()
-        sentences = text.split('.')
-        if len(sentences) > 1 and len(sentences[-1].strip()) < 10:
-            text = '.'.join(sentences[:-1]) + '.'
-        unwanted_phrases = [
-            "Here is the rewritten text:",
-            "Rewritten version:",
-            "Here's the text rewritten:",
-            "The rewritten text is:"
-        ]
-        for phrase in unwanted_phrases:
-            text = text.replace(phrase, "").strip()
-        return text
\ No newline at end of file
+    def rewrite_long_text(self, text: str, tone: str, max_length: int = 300, progress_callback=None) -> str:
+        """
+        Rewrite text of any length by rewriting it chunk by chunk
+        
+        Args:
+            text: Input text to rewrite
+            tone: Desired tone (e.g., neutral, suspenseful, inspiring)
+            max_length: Maximum length of each rewritten chunk
+            progress_callback: Optional callable(done, total) invoked after each chunk
+        
+        Returns:
+            Rewritten text with chunks separated by paragraph breaks
+        """
+        chunks = TextChunker(max_length).split(text)
+        rewritten = self.rewrite_many(chunks, tone, max_length=max_length, progress_callback=progress_callback)
+        return "\n\n".join(rewritten)
@@ -1,20 +1,70 @@
 from transformers import SpeechT5Processor, SpeechT5ForTextToSpeech, SpeechT5HifiGan
 import torch
 import numpy as np
-import soundfile as sf
-import io
 import os
-from datasets import load_dataset
+import logging
+import queue
+import threading
+import contextvars
 from dotenv import load_dotenv
-import pickle
+import time
+from utils.text_chunker import TextChunker
+from utils.audio_stitcher import AudioStitcher
+from utils.audio_cache import AudioCache
+from utils.time_stretch import time_stretch
+from utils.embedding_bank import EmbeddingBank, XVECTOR_DATASET
+from utils.audio_clip import AudioClip
+from utils.metrics import get_metrics, trace_span
+from models.quantization import quantize_acoustic_model, FrozenVocoder
+from models.guarded_decoding import guarded_generate_speech
 
 load_dotenv()
 
+SAMPLE_RATE = 16000
+MAX_INPUT_TOKENS = 600  # SpeechT5 text positional limit
+MAX_CHUNK_TOKENS = 250  # Per-chunk budget for long-form synthesis
+BATCH_SIZE = 8  # Sequences per batched SpeechT5 forward pass
+BUCKET_LENGTH_RATIO = 1.5  # Max longest/shortest token ratio within one batch
+VOCODER_BATCH_SIZE = 16  # Spectrograms per batched HiFi-GAN pass
+PIPELINE_DEPTH = 2  # Spectrogram batches buffered between the acoustic model and the vocoder
+TURN_PAUSE_MS = 250  # Silence between dialogue lines in different voices
+
+logger = logging.getLogger(__name__)
+
+metrics = get_metrics()
+INPUT_TOKENS = metrics.counter("echoverse_tts_input_tokens_total", "Text tokens fed to SpeechT5")
+OUTPUT_SAMPLES = metrics.counter("echoverse_tts_output_samples_total", "Waveform samples produced by the vocoder")
+CHUNKS = metrics.counter("echoverse_tts_chunks_total", "Chunks synthesized, by source", label_names=("source",))
+SILENT_OUTPUTS = metrics.counter("echoverse_tts_silent_outputs_total", "Synthesized chunks that came out silent")
+FALLBACKS = metrics.counter("echoverse_tts_fallbacks_total", "Silent fallbacks and voice substitutions",
+                            label_names=("reason",))
+TIME_TO_FIRST_AUDIO = metrics.histogram("echoverse_time_to_first_audio_seconds",
+                                        "Delay until the first streamed segment is ready")
+
 class TTSGenerator:
-    def __init__(self):
+    def __init__(self, audio_cache: AudioCache = None, use_cache: bool = True, quantize: bool = None,
+                 guarded: bool = None):
         self.device = 0 if torch.cuda.is_available() else -1
+        # Int8 CPU inference; opt in with quantize=True or ECHOVERSE_TTS_QUANTIZE=1
+        if quantize is None:
+            quantize = os.getenv("ECHOVERSE_TTS_QUANTIZE", "0") == "1"
+        self.quantized = quantize
+        # Length-capped decoding that stops on trailing silence or repetition;
+        # opt in with guarded=True or ECHOVERSE_TTS_GUARDED=1
+        if guarded is None:
+            guarded = os.getenv("ECHOVERSE_TTS_GUARDED", "0") == "1"
+        self.guarded = guarded
+        # Overlap vocoding with spectrogram decoding; disabled with ECHOVERSE_TTS_PIPELINE=0.
+        # On a single core the two stages would only contend, so it is off there.
+        self.pipelined = os.getenv("ECHOVERSE_TTS_PIPELINE", "1") != "0" and (os.cpu_count() or 1) > 1
         self._initialize_model()
         self._load_speaker_embeddings()
+        # Chunk-level audio cache; disabled with use_cache=False or ECHOVERSE_AUDIO_CACHE=0
+        if use_cache and os.getenv("ECHOVERSE_AUDIO_CACHE", "1") != "0":
+            self.audio_cache = audio_cache or AudioCache()
+            self._register_cache_metrics()
+        else:
+            self.audio_cache = None
         
     def _initialize_model(self):
         """Initialize SpeechT5 model components"""
@@ -23,55 +73,59 @@ class TTSGenerator:
             self.processor = SpeechT5Processor.from_pretrained(model_name)
             self.model = SpeechT5ForTextToSpeech.from_pretrained(model_name)
             self.vocoder = SpeechT5HifiGan.from_pretrained("microsoft/speecht5_hifigan")  # Fixed typo here
-            print("SpeechT5 model initialized successfully.")
+            self.model_revision = "+".join(
+                f"{config.name_or_path}@{getattr(config, '_commit_hash', None) or 'local'}"
+                for config in (self.model.config, self.vocoder.config)
+            )
+            if self.quantized:
+                self.model = quantize_acoustic_model(self.model)
+                self.vocoder = FrozenVocoder(self.vocoder)
+                # Quantized output differs slightly, so it must not share cache entries with fp32
+                self.model_revision += "+int8"
+            if self.guarded:
+                # Trimmed silence changes the audio, so guarded output is cached separately too
+                self.model_revision += "+guarded"
+            logger.info("SpeechT5 model initialized (%s)", self.model_revision)
         except Exception as e:
-            print(f"Error initializing SpeechT5 model: {e}")
+            logger.error("Error initializing SpeechT5 model: %s", e)
             raise
     
     def _load_speaker_embeddings(self):
-        cache_file = "speaker_embeddings.pkl"
-        if os.path.exists(cache_file):
-            with open(cache_file, "rb") as f:
-                self.speaker_embeddings = pickle.load(f)
-            print("Speaker embeddings loaded from cache.")
-        else:
-            try:
-                # Attempt to load the dataset; if it fails, use precomputed fallback
-                try:
-                    embeddings_dataset = load_dataset("Matthijs/cmu-arctic-xvectors", split="validation")
-                    print("Dataset loaded successfully.")
-                except Exception as e:
-                    print(f"Failed to load dataset: {e}. Using precomputed fallback embeddings.")
-                    embeddings_dataset = None
-                
-                if embeddings_dataset:
-                    self.speaker_embeddings = {
-                        9000: torch.tensor(embeddings_dataset[9000]["xvector"]).unsqueeze(0),  # Tina (Female - US)
-                        5000: torch.tensor(embeddings_dataset[5000]["xvector"]).unsqueeze(0),  # Sarah (Female - UK)
-                        1234: torch.tensor(embeddings_dataset[1234]["xvector"]).unsqueeze(0),  # Michael (Male - US)
-                        3000: torch.tensor(embeddings_dataset[3000]["xvector"]).unsqueeze(0),  # Zones (Male - Scottish)
-                    }
-                    print("Speaker embeddings loaded from dataset.")
-                else:
-                    # Fallback to precomputed or random embeddings with known gender characteristics
-                    print("Using fallback embeddings due to dataset loading failure.")
-                    self.speaker_embeddings = {
-                        9000: torch.randn(1, 512) * 0.1,  # Default female (Tina) - scaled for better range
-                        5000: torch.randn(1, 512) * 0.1,  # Default female (Sarah)
-                        1234: torch.randn(1, 512) * 0.1,  # Default male (Michael)
-                        3000: torch.randn(1, 512) * 0.1,  # Default male (Zones)
-                    }
-                
-                with open(cache_file, "wb") as f:
-                    pickle.dump(self.speaker_embeddings, f)
-            except Exception as e:
-                print(f"Error loading speaker embeddings: {e}")
-                self.speaker_embeddings = {
-                    9000: torch.randn(1, 512) * 0.1,  # Default female (Tina)
-                    1234: torch.randn(1, 512) * 0.1,  # Default male (Michael)
-                }
+        """Open the memory-mapped speaker embedding bank, building it on first use"""
+        bank_dir = os.getenv("ECHOVERSE_VOICE_BANK", "voices")
+        try:
+            self.voice_bank = EmbeddingBank(bank_dir)
+        except FileNotFoundError:
+            legacy_file = "speaker_embeddings.pkl"
+            if os.path.exists(legacy_file):
+                logger.info("Converting %s into embedding bank at %s", legacy_file, bank_dir)
+                self.voice_bank = EmbeddingBank.from_pickle(legacy_file, bank_dir, metadata=self.get_available_voices())
+            else:
+                # No silent random-voice fallback: fail loudly if the dataset is unavailable
+                logger.info("Building embedding bank at %s from %s", bank_dir, XVECTOR_DATASET)
+                self.voice_bank = EmbeddingBank.from_xvectors(bank_dir, metadata=self.get_available_voices())
+        logger.info("Speaker embedding bank loaded: %d voices", len(self.voice_bank))
+    
+    def _register_cache_metrics(self):
+        """Export the audio cache's own counters at scrape time"""
+        for key, metric_type, help_text in (
+            ("hits", "counter", "Chunk lookups served from the audio cache"),
+            ("misses", "counter", "Chunk lookups that had to be synthesized"),
+            ("hit_rate", "gauge", "Fraction of chunk lookups served from the audio cache"),
+            ("evictions", "counter", "Audio cache entries evicted to stay within budget"),
+            ("bytes", "gauge", "Bytes held by the audio cache"),
+        ):
+            suffix = "_total" if metric_type == "counter" else ""
+            metrics.register_callback(f"echoverse_audio_cache_{key}{suffix}", help_text,
+                                      lambda key=key: self.audio_cache.stats()[key], metric_type)
     
-    def generate_speech(self, text: str, voice_embedding_id: int = 9000, speed: float = 1.0) -> bytes:
+    @torch.inference_mode()
+    def warmup(self):
+        """Run one short inference so the first real request doesn't pay one-off setup costs"""
+        self._synthesize("Warm up.", 9000)
+    
+    def generate_speech(self, text: str, voice_embedding_id: int = 9000, speed: float = 1.0,
+                        output_format: str = "wav", bitrate_kbps: int = None) -> AudioClip:
         """
         Generate speech using specified voice embedding
         
@@ -79,88 +133,470 @@ class TTSGenerator:
             text: Text to convert to speech
             voice_embedding_id: ID of the voice embedding to use
             speed: Audio playback speed multiplier
+            output_format: Output format key ("wav", "mp3", "ogg" or "flac")
+            bitrate_kbps: MP3 bitrate when output_format is "mp3"
         
         Returns:
-            Audio data as bytes
+            AudioClip holding the waveform; encoded to output_format on first access
         """
         try:
-            print(f"Generating speech for text: '{text[:50]}...' with embedding_id: {voice_embedding_id}")
-            
             # Decode text to ensure proper encoding
             if isinstance(text, bytes):
                 text = text.decode('utf-8', errors='replace')
             
-            # Tokenize text and truncate to max sequence length (600)
-            inputs = self.processor(text=text, return_tensors="pt", truncation=True, max_length=600)
-            token_count = inputs["input_ids"].shape[1]
-            print(f"Token count after truncation: {token_count}")
+            speech = self._synthesize_chunks([(text, voice_embedding_id)], speed)[0]
+            if speech is None:
+                logger.warning("Generated audio is silent; using fallback")
+                return self._generate_fallback(text, output_format, bitrate_kbps, reason="silent")
             
-            # Get speaker embedding with strict validation
-            if voice_embedding_id not in self.speaker_embeddings:
-                print(f"Warning: Invalid voice_embedding_id {voice_embedding_id}, falling back to 9000 (Tina)")
-                voice_embedding_id = 9000
-            speaker_embedding = self.speaker_embeddings[voice_embedding_id]
+            return AudioClip.from_samples(speech, SAMPLE_RATE, output_format, bitrate_kbps)
             
-            # Generate speech
-            speech = self.model.generate_speech(
-                inputs["input_ids"], 
-                speaker_embedding, 
-                vocoder=self.vocoder
+        except Exception as e:
+            logger.exception("Error generating speech: %s", e)
+            return self._generate_fallback(text, output_format, bitrate_kbps, reason="error")
+    
+    def generate_speech_batch(self, items, speed: float = 1.0, batch_size: int = BATCH_SIZE,
+                              output_format: str = "wav", bitrate_kbps: int = None) -> list:
+        """
+        Generate speech for many (text, voice_embedding_id) items at once
+        
+        Items are grouped into buckets of similar token length, padded with
+        attention masks and run through SpeechT5 and the vocoder together.
+        
+        Args:
+            items: List of (text, voice_embedding_id) tuples
+            speed: Audio playback speed multiplier
+            batch_size: Maximum number of sequences per forward pass
+            output_format: Output format key ("wav", "mp3", "ogg" or "flac")
+            bitrate_kbps: MP3 bitrate when output_format is "mp3"
+        
+        Returns:
+            List of AudioClip, one per item in input order
+        """
+        texts = [text.decode('utf-8', errors='replace') if isinstance(text, bytes) else text for text, _ in items]
+        try:
+            speeches = self._synthesize_chunks(
+                [(text, voice_id) for text, (_, voice_id) in zip(texts, items)], speed,
+                synthesize=lambda batch: self._synthesize_batch(batch, batch_size=batch_size)
             )
-            
-            # Apply speed modification
-            if speed != 1.0:
-                speech = self._modify_speed(speech.numpy(), speed)
+        except Exception as e:
+            logger.exception("Error generating speech batch: %s", e)
+            speeches = [None] * len(items)
+        
+        results = []
+        for text, speech in zip(texts, speeches):
+            if speech is None:
+                results.append(self._generate_fallback(text, output_format, bitrate_kbps, reason="batch"))
+                continue
+            results.append(AudioClip.from_samples(speech, SAMPLE_RATE, output_format, bitrate_kbps))
+        return results
+    
+    def generate_long_speech(self, text: str, voice_embedding_id: int = 9000, speed: float = 1.0,
+                             max_chunk_tokens: int = MAX_CHUNK_TOKENS, crossfade_ms: float = 30.0,
+                             progress_callback=None, executor=None,
+                             output_format: str = "wav", bitrate_kbps: int = None) -> AudioClip:
+        """
+        Generate speech for text of any length
+        
+        The text is split into token-budgeted sentence/paragraph chunks, each
+        chunk is synthesized separately and the results are stitched into one
+        audiobook with short crossfades and consistent gain. Work grows linearly
+        with the text and only one window of raw chunk audio is held in memory at a
+        time; the encoded result is built in memory and grows with its duration.
+        
+        Args:
+            text: Text to convert to speech
+            voice_embedding_id: ID of the voice embedding to use
+            speed: Audio playback speed multiplier
+            max_chunk_tokens: Token budget per synthesized chunk
+            crossfade_ms: Crossfade length between chunks in milliseconds
+            progress_callback: Optional callable(done, total) invoked after each chunk
+            executor: Optional TTSProcessPool to shard chunks across processes
+            output_format: Output format key ("wav", "mp3", "ogg" or "flac")
+            bitrate_kbps: MP3 bitrate when output_format is "mp3"
+        
+        Returns:
+            AudioClip wrapping the stitched, already encoded file
+        """
+        stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, crossfade_ms=crossfade_ms,
+                                 output_format=output_format, bitrate_kbps=bitrate_kbps)
+        for speech in self.stream_speech(text, voice_embedding_id, speed, max_chunk_tokens=max_chunk_tokens,
+                                         progress_callback=progress_callback, executor=executor):
+            stitcher.add(speech)
+        
+        if stitcher.segment_count == 0:
+            return self._generate_fallback(text, output_format, bitrate_kbps, reason="empty")
+        logger.info("Long-form synthesis complete: %.1fs of audio", stitcher.duration)
+        return stitcher.finish_clip()
+    
+    def stream_speech(self, text: str, voice_embedding_id: int = 9000, speed: float = 1.0,
+                      max_chunk_tokens: int = MAX_CHUNK_TOKENS, progress_callback=None, executor=None):
+        """
+        Yield speech chunk by chunk as soon as each one is synthesized
+        
+        The first chunk is synthesized on its own to minimise time-to-first-audio;
+        later chunks are processed in growing batched windows.
+        
+        Args:
+            text: Text to convert to speech
+            voice_embedding_id: ID of the voice embedding to use
+            speed: Audio playback speed multiplier
+            max_chunk_tokens: Token budget per synthesized chunk
+            progress_callback: Optional callable(done, total) invoked after each chunk
+            executor: Optional TTSProcessPool to shard chunks across processes
+        
+        Yields:
+            Float32 PCM segments at SAMPLE_RATE, in reading order
+        """
+        if isinstance(text, bytes):
+            text = text.decode('utf-8', errors='replace')
+        
+        max_chunk_tokens = min(max_chunk_tokens, MAX_INPUT_TOKENS)
+        chunks = TextChunker(max_chunk_tokens, count_tokens=self._count_tokens).split(text)
+        logger.info("Streaming synthesis: %d chunks, budget %d tokens", len(chunks), max_chunk_tokens)
+        yield from self._stream_items([(chunk, voice_embedding_id) for chunk in chunks], speed,
+                                      progress_callback=progress_callback, executor=executor)
+    
+    def stream_dialogue(self, lines, voices: dict, speed: float = 1.0, max_chunk_tokens: int = MAX_CHUNK_TOKENS,
+                        turn_pause_ms: float = TURN_PAUSE_MS, progress_callback=None, executor=None):
+        """
+        Yield speech for parsed dialogue, each line in its speaker's voice
+        
+        Lines are chunked and streamed in reading order exactly like
+        stream_speech, so a multi-voice chapter is batched in the same windows
+        as a single-voice one; within a window, batches are formed per voice.
+        A short pause separates consecutive lines in different voices.
+        
+        Args:
+            lines: utils.dialogue.Line items in reading order
+            voices: Voice embedding ID per speaker, with the narrator under None (see cast_voices)
+            speed: Audio playback speed multiplier
+            max_chunk_tokens: Token budget per synthesized chunk
+            turn_pause_ms: Silence inserted when the voice changes
+            progress_callback: Optional callable(done, total) invoked after each chunk
+            executor: Optional TTSProcessPool to shard chunks across processes
+        
+        Yields:
+            Float32 PCM segments at SAMPLE_RATE, in reading order
+        """
+        chunker = TextChunker(min(max_chunk_tokens, MAX_INPUT_TOKENS), count_tokens=self._count_tokens)
+        items = []
+        turn_ends = set()  # Indices of chunks followed by a change of voice
+        for line in lines:
+            voice_embedding_id = voices[line.speaker]
+            if items and items[-1][1] != voice_embedding_id:
+                turn_ends.add(len(items) - 1)
+            items.extend((chunk, voice_embedding_id) for chunk in chunker.split(line.text))
+        logger.info("Dialogue synthesis: %d lines, %d chunks, %d voices",
+                    len(lines), len(items), len({voice_id for _, voice_id in items}))
+        
+        pause = np.zeros(int(SAMPLE_RATE * turn_pause_ms / 1000), dtype=np.float32)
+        for index, speech in enumerate(self._stream_items(items, speed, progress_callback=progress_callback,
+                                                          executor=executor)):
+            yield speech
+            if index in turn_ends and pause.size:
+                yield pause
+    
+    def _stream_items(self, items, speed: float, progress_callback=None, executor=None):
+        """
+        Synthesize (text, voice_embedding_id) chunks in growing windows, yielding them in order
+        
+        The first chunk is synthesized on its own to minimise time-to-first-audio.
+        """
+        # Windows double up to a size that gives batching enough sequences to
+        # bucket while memory stays bounded by the window size
+        max_window = BATCH_SIZE * 4
+        synthesize = None
+        if executor is not None:
+            max_window *= executor.num_workers
+            synthesize = executor.synthesize
+        
+        started = time.perf_counter()
+        position = 0
+        window = 1
+        while position < len(items):
+            window_items = items[position:position + window]
+            try:
+                speeches = self._synthesize_chunks(window_items, speed, synthesize=synthesize)
+            except Exception as e:
+                logger.exception("Error generating chunks %d-%d: %s", position + 1, position + len(window_items), e)
+                speeches = [None] * len(window_items)
+            for (chunk, _), speech in zip(window_items, speeches):
+                if speech is None:
+                    # Keep timing roughly intact for failed or silent chunks
+                    FALLBACKS.inc(reason="chunk")
+                    speech = np.zeros(int(len(chunk) * 0.15 * SAMPLE_RATE), dtype=np.float32)
+                if position == 0:
+                    time_to_first_audio = time.perf_counter() - started
+                    TIME_TO_FIRST_AUDIO.observe(time_to_first_audio)
+                    logger.info("Time to first audio: %.2fs", time_to_first_audio)
+                position += 1
+                if progress_callback:
+                    progress_callback(position, len(items))
+                yield speech
+            window = min(window * 2, max_window)
+    
+    def _synthesize_chunks(self, items, speed: float, synthesize=None) -> list:
+        """
+        Synthesize chunks at the given speed, serving repeats from the audio cache
+        
+        Args:
+            items: List of (text, voice_embedding_id) tuples
+            speed: Audio playback speed multiplier
+            synthesize: Callable running the model on a list of items
+                (defaults to the local batched path)
+        
+        Returns:
+            List of float waveforms (or None for silent outputs) in input order
+        """
+        synthesize = synthesize or self._synthesize_batch
+        if self.audio_cache is not None:
+            keys = [AudioCache.make_key(text, voice_id, speed, self.model_revision) for text, voice_id in items]
+            with trace_span("cache_lookup", chunks=len(items)):
+                results = [self.audio_cache.get(key) for key in keys]
+        else:
+            keys = [None] * len(items)
+            results = [None] * len(items)
+        
+        missing = [index for index, speech in enumerate(results) if speech is None]
+        CHUNKS.inc(len(items) - len(missing), source="cache")
+        CHUNKS.inc(len(missing), source="model")
+        if missing:
+            with trace_span("synthesize_chunks", chunks=len(missing)):
+                speeches = synthesize([items[index] for index in missing])
+            for index, speech in zip(missing, speeches):
+                if speech is None:
+                    continue
+                if speed != 1.0:
+                    speech = self._modify_speed(speech, speed)
+                results[index] = speech
+                if keys[index] is not None:
+                    self.audio_cache.put(keys[index], speech, SAMPLE_RATE)
+        if self.audio_cache is not None:
+            logger.debug("Audio cache: %d/%d chunks reused", len(items) - len(missing), len(items))
+        return results
+    
+    def get_cache_stats(self) -> dict:
+        """Hit/miss counters of the audio cache"""
+        return self.audio_cache.stats() if self.audio_cache is not None else {}
+    
+    def _count_tokens(self, text: str) -> int:
+        """Number of model input tokens for text"""
+        return len(self.processor.tokenizer(text)["input_ids"])
+    
+    @torch.inference_mode()
+    def _synthesize(self, text: str, voice_embedding_id: int):
+        """
+        Run SpeechT5 and the vocoder on a single chunk of text
+        
+        Returns:
+            Float waveform as a NumPy array, or None if the output is silent
+        """
+        return self._vocode(self._spectrograms([(text, voice_embedding_id)]))[0]
+    
+    @torch.inference_mode()
+    def _synthesize_batch(self, items, batch_size: int = BATCH_SIZE) -> list:
+        """
+        Run SpeechT5 and the vocoder on many chunks using length-bucketed batches
+        
+        With more than one bucket the two models run as pipeline stages: the
+        acoustic model decodes the next bucket while the vocoder turns the
+        previous spectrograms into audio.
+        
+        Args:
+            items: List of (text, voice_embedding_id) tuples
+            batch_size: Maximum number of sequences per forward pass
+        
+        Returns:
+            List of float waveforms (or None for silent outputs) in input order
+        """
+        if not items:
+            return []
+        
+        lengths = [self._count_tokens(text) for text, _ in items]
+        # One voice per batch, so multi-voice input batches like several single-voice ones
+        buckets = self._length_buckets(lengths, batch_size, groups=[voice_id for _, voice_id in items])
+        if self.pipelined and len(buckets) > 1:
+            return self._synthesize_pipelined(items, buckets)
+        
+        results = [None] * len(items)
+        for bucket in buckets:
+            speeches = self._vocode(self._spectrograms([items[index] for index in bucket]))
+            for index, speech in zip(bucket, speeches):
+                results[index] = speech
+        return results
+    
+    def _synthesize_pipelined(self, items, buckets) -> list:
+        """
+        Decode spectrograms on a producer thread and vocode them on this one
+        
+        The bounded queue keeps at most PIPELINE_DEPTH decoded buckets waiting,
+        so memory stays flat however long the input is. Whatever has queued up
+        by the time the vocoder is free is vocoded together.
+        """
+        ready = queue.Queue(maxsize=PIPELINE_DEPTH)
+        stop = threading.Event()
+        
+        def decode():
+            try:
+                with torch.inference_mode():
+                    for bucket in buckets:
+                        if stop.is_set():
+                            return
+                        ready.put((bucket, self._spectrograms([items[index] for index in bucket])))
+            except BaseException as e:
+                ready.put(e)
+            finally:
+                ready.put(None)
+        
+        # Copy the context so spans opened by the producer nest under the caller's
+        producer = threading.Thread(target=contextvars.copy_context().run, args=(decode,),
+                                    name="echoverse_acoustic_model", daemon=True)
+        producer.start()
+        results = [None] * len(items)
+        try:
+            finished = False
+            while not finished:
+                entries = [ready.get()]
+                while True:
+                    try:
+                        entries.append(ready.get_nowait())
+                    except queue.Empty:
+                        break
+                indices, spectrograms = [], []
+                for entry in entries:
+                    if entry is None:
+                        finished = True
+                    elif isinstance(entry, BaseException):
+                        raise entry
+                    else:
+                        indices.extend(entry[0])
+                        spectrograms.extend(entry[1])
+                for batch in self._length_buckets([len(spectrogram) for spectrogram in spectrograms],
+                                                  VOCODER_BATCH_SIZE):
+                    speeches = self._vocode([spectrograms[position] for position in batch])
+                    for position, speech in zip(batch, speeches):
+                        results[indices[position]] = speech
+        finally:
+            # Unblock the producer if the vocoder stage failed part way
+            stop.set()
+            while producer.is_alive():
+                try:
+                    ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+        return results
+    
+    def _spectrograms(self, items) -> list:
+        """
+        Run the acoustic model on one batch of chunks
+        
+        Args:
+            items: List of (text, voice_embedding_id) tuples
+        
+        Returns:
+            Unpadded (frames, mel_bins) spectrogram tensors in input order
+        """
+        texts = [text for text, _ in items]
+        with trace_span("tokenize", batch=len(items)):
+            inputs = self.processor(text=texts, return_tensors="pt", padding=True,
+                                    truncation=True, max_length=MAX_INPUT_TOKENS)
+        token_count = int(inputs["attention_mask"].sum())
+        INPUT_TOKENS.inc(token_count)
+        speaker_embeddings = torch.cat(
+            [self._get_speaker_embedding(voice_embedding_id) for _, voice_embedding_id in items], dim=0
+        )
+        
+        with trace_span("acoustic_model", tokens=token_count, batch=len(items),
+                        padded_tokens=int(inputs["input_ids"].numel())) as span:
+            if self.guarded:
+                spectrograms, report = guarded_generate_speech(
+                    self.model,
+                    inputs["input_ids"],
+                    speaker_embeddings,
+                    attention_mask=inputs["attention_mask"]
+                )
+                span.set(frames_saved=report.frames_saved, frames_trimmed=report.frames_trimmed)
+            elif len(items) == 1:
+                spectrograms = [self.model.generate_speech(inputs["input_ids"], speaker_embeddings)]
             else:
-                speech = speech.numpy()
-            
-            # Log actual speech length
-            speech_length = len(speech)
-            print(f"Generated speech length: {speech_length} samples")
-            
+                padded, frame_counts = self.model.generate_speech(
+                    inputs["input_ids"],
+                    speaker_embeddings,
+                    attention_mask=inputs["attention_mask"],
+                    return_output_lengths=True
+                )
+                spectrograms = [padded[row, :int(frames)] for row, frames in enumerate(frame_counts)]
+            span.set(frames=sum(len(spectrogram) for spectrogram in spectrograms))
+        logger.debug("Decoded %d spectrograms from %d tokens", len(items), token_count)
+        return spectrograms
+    
+    def _vocode(self, spectrograms) -> list:
+        """
+        Run the vocoder on a batch of spectrograms
+        
+        Returns:
+            Float waveforms as NumPy arrays (or None for silent outputs) in input order
+        """
+        frame_counts = [len(spectrogram) for spectrogram in spectrograms]
+        with trace_span("vocoder", batch=len(spectrograms), frames=sum(frame_counts)):
+            padded = torch.nn.utils.rnn.pad_sequence(spectrograms, batch_first=True)
+            waveforms = self.vocoder(padded).numpy()
+        samples_per_frame = waveforms.shape[1] // max(max(frame_counts), 1)
+        
+        speeches = []
+        for row, frames in enumerate(frame_counts):
+            speech = waveforms[row, :frames * samples_per_frame]
+            OUTPUT_SAMPLES.inc(len(speech))
             # Validate audio (check if it's silent or beepy)
-            audio_flat = speech.flatten()
-            if np.all(np.abs(audio_flat) < 1e-5):
-                print("Warning: Generated audio is silent. Using fallback.")
-                return self._generate_fallback(text)
-            
-            return self._audio_to_bytes(speech, sample_rate=16000)
-            
-        except Exception as e:
-            print(f"Error generating speech: {e}")
-            return self._generate_fallback(text)
+            if np.all(np.abs(speech) < 1e-5):
+                SILENT_OUTPUTS.inc()
+                speech = None
+            speeches.append(speech)
+        return speeches
+    
+    @staticmethod
+    def _length_buckets(lengths, batch_size: int, groups=None):
+        """Group item indices into batches of similar token length, never mixing different groups"""
+        groups = groups or [None] * len(lengths)
+        order = sorted(range(len(lengths)), key=lambda index: (str(groups[index]), lengths[index]))
+        buckets = []
+        current = []
+        for index in order:
+            if current and (len(current) >= batch_size or groups[index] != groups[current[0]]
+                            or lengths[index] > BUCKET_LENGTH_RATIO * max(lengths[current[0]], 1)):
+                buckets.append(current)
+                current = []
+            current.append(index)
+        if current:
+            buckets.append(current)
+        return buckets
+    
+    def _get_speaker_embedding(self, voice_embedding_id: int):
+        """Speaker embedding for a voice id, falling back to Tina for unknown ids"""
+        if voice_embedding_id not in self.voice_bank:
+            logger.warning("Invalid voice_embedding_id %s, falling back to 9000 (Tina)", voice_embedding_id)
+            FALLBACKS.inc(reason="voice")
+            voice_embedding_id = 9000
+        # Copy the row out of the read-only memory map
+        return torch.from_numpy(np.array(self.voice_bank.get(voice_embedding_id))).unsqueeze(0)
     
     def _modify_speed(self, audio: np.ndarray, speed: float) -> np.ndarray:
-        """Modify audio playback speed"""
-        try:
-            import librosa
-            return librosa.effects.time_stretch(audio, rate=speed)
-        except ImportError:
-            # Simple resampling if librosa not available
-            indices = np.round(np.arange(0, len(audio), speed)).astype(int)
-            indices = indices[indices < len(audio)]
-            return audio[indices]
-    
-    def _audio_to_bytes(self, audio: np.ndarray, sample_rate: int) -> bytes:
-        """Convert audio array to bytes"""
-        # Ensure audio is in the right format
-        if audio.dtype != np.int16:
-            audio = (audio * 32767).astype(np.int16)
-        
-        # Create bytes buffer
-        buffer = io.BytesIO()
-        sf.write(buffer, audio, sample_rate, format='WAV')
-        buffer.seek(0)
-        return buffer.read()
-    
-    def _generate_fallback(self, text: str) -> bytes:
+        """Modify audio playback speed without changing pitch"""
+        with trace_span("time_stretch", rate=speed):
+            return time_stretch(audio, rate=speed, sample_rate=SAMPLE_RATE)
+    
+    def _generate_fallback(self, text: str, output_format: str = "wav", bitrate_kbps: int = None,
+                           reason: str = "error") -> AudioClip:
         """Generate a silent fallback audio to avoid beeps"""
-        print("Using silent fallback audio.")
+        logger.warning("Using silent fallback audio (%s)", reason)
+        FALLBACKS.inc(reason=reason)
         duration = len(text) * 0.15  # Duration based on text length
-        sample_rate = 16000
+        sample_rate = SAMPLE_RATE
         samples = int(duration * sample_rate)
         audio = np.zeros(samples, dtype=np.float32)  # Silent audio
-        return self._audio_to_bytes(audio, sample_rate)
+        return AudioClip.from_samples(audio, sample_rate, output_format, bitrate_kbps)
     
     def get_available_voices(self):
         """Return information about available voices"""
@@ -0,0 +1,111 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Per-process generator, created once by the pool initializer
+_worker_generator = None
+
+
+def _init_worker(threads_per_worker: int):
+    """Pin the thread budget and load a private SpeechT5/HiFi-GAN copy"""
+    global _worker_generator
+    import torch
+    from models.tts_generator import TTSGenerator
+
+    torch.set_num_threads(threads_per_worker)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Already set once parallel work has started
+    # Caching happens in the parent before work is dispatched
+    _worker_generator = TTSGenerator(use_cache=False)
+    if threads_per_worker == 1:
+        # One core's budget: pipelined stages would only contend for it
+        _worker_generator.pipelined = False
+    logger.info("TTS worker %d ready with %d threads", os.getpid(), threads_per_worker)
+
+
+def _synthesize_shard(items):
+    return _worker_generator._synthesize_batch(items)
+
+
+class TTSProcessPool:
+    def __init__(self, num_workers: int = None, threads_per_worker: int = None):
+        """
+        Shard synthesis across worker processes, each with its own model copy
+
+        Torch does not scale well past a few intra-op threads on CPU, so a big
+        box is better used by several processes with a small thread budget each.
+
+        Args:
+            num_workers: Number of worker processes
+                (default: ECHOVERSE_TTS_WORKERS, or cores / threads_per_worker)
+            threads_per_worker: Torch intra-op threads per worker
+                (default: ECHOVERSE_TTS_THREADS_PER_WORKER, or 4)
+        """
+        cpu_count = os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker or int(os.getenv("ECHOVERSE_TTS_THREADS_PER_WORKER", "4"))
+        self.threads_per_worker = max(1, min(self.threads_per_worker, cpu_count))
+        self.num_workers = num_workers or int(os.getenv("ECHOVERSE_TTS_WORKERS", "0")) \
+            or max(1, cpu_count // self.threads_per_worker)
+
+        # Spawn so workers never inherit a parent's torch thread pool state
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker,)
+        )
+        logger.info("TTSProcessPool started: %d workers x %d threads", self.num_workers, self.threads_per_worker)
+
+    def synthesize(self, items, shard_size: int = None) -> list:
+        """
+        Synthesize (text, voice_embedding_id) items across the pool
+
+        Items are sorted by voice and length before sharding so each worker
+        receives sequences that batch well together.
+
+        Args:
+            items: List of (text, voice_embedding_id) tuples
+            shard_size: Items per task sent to a worker (default: spread evenly)
+
+        Returns:
+            List of float waveforms (or None for silent outputs) in input order
+        """
+        if not items:
+            return []
+        if shard_size is None:
+            shard_size = max(1, -(-len(items) // self.num_workers))
+
+        order = sorted(range(len(items)), key=lambda index: (items[index][1], len(items[index][0])))
+        shards = [order[start:start + shard_size] for start in range(0, len(order), shard_size)]
+        futures = [
+            self._executor.submit(_synthesize_shard, [items[index] for index in shard])
+            for shard in shards
+        ]
+
+        results = [None] * len(items)
+        for shard, future in zip(shards, futures):
+            for index, speech in zip(shard, future.result()):
+                results[index] = speech
+        return results
+
+    def warmup(self):
+        """Block until every worker has loaded its models"""
+        self.synthesize([("Warm up.", 9000)] * self.num_workers, shard_size=1)
+
+    def close(self):
+        """Shut down the worker processes"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
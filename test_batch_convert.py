@@ -0,0 +1,60 @@
+import glob
+import json
+import os
+
+from batch_convert import BatchConverter
+from models.rewrite_backends import RewriteBackend
+from models.text_rewriter import TextRewriter
+from utils.rewrite_cache import RewriteCache
+
+BOOK = "\n\n".join([
+    "The lighthouse keeper climbed the stairs every night.",
+    "He watched the dark water for ships that never came.",
+    "Years passed in this way until the letter arrived.",
+])
+
+
+class FlakyBackend(RewriteBackend):
+    """Fails every text containing "dark" until fixed"""
+    name = "flaky"
+    model_id = "flaky"
+
+    def __init__(self):
+        self.fixed = False
+        self.calls = []
+
+    def rewrite(self, text, tone, parameters):
+        self.calls.append(text)
+        if "dark" in text and not self.fixed:
+            raise ConnectionError("backend down")
+        return text.upper()
+
+
+def test_failed_rewrites_are_retried_not_checkpointed(tmp_path, stub_tts):
+    source = tmp_path / "book.txt"
+    source.write_text(BOOK, encoding="utf-8")
+    backend = FlakyBackend()
+
+    def convert():
+        rewriter = TextRewriter(backend=backend, cache=RewriteCache())
+        converter = BatchConverter(str(tmp_path / "out"), stub_tts, rewriter, max_length=60, output_format="wav")
+        return converter.convert(str(source))
+
+    entry = convert()
+    assert entry["status"] == "done"
+    assert entry["rewrite_chunks_failed"] == 1
+    checkpoint, = glob.glob(str(tmp_path / "out" / ".checkpoints" / "book" / "rewrite_*.json"))
+    with open(checkpoint, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved[1] is None
+    assert saved[0] == saved[0].upper() and saved[2] == saved[2].upper()
+
+    backend.fixed = True
+    backend.calls.clear()
+    entry = convert()
+    assert not entry["skipped"]
+    assert entry["rewrite_chunks_resumed"] == 2
+    assert backend.calls == ["He watched the dark water for ships that never came."]
+    assert "rewrite_chunks_failed" not in entry
+    assert not os.path.exists(checkpoint)
+    assert convert()["skipped"]
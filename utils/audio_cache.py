@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_EXTENSION = ".flac"
+
+
+class AudioCache:
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        """
+        Content-addressed on-disk cache of synthesized audio chunks
+
+        Entries are FLAC files named by a hash of the synthesis inputs. The cache
+        is capped by total file size and evicts least recently used entries.
+
+        Args:
+            cache_dir: Directory for cache files
+                (default: ECHOVERSE_AUDIO_CACHE_DIR or ~/.cache/echoverse/audio)
+            max_bytes: Size cap in bytes
+                (default: ECHOVERSE_AUDIO_CACHE_MB megabytes, or 512 MB)
+        """
+        self.cache_dir = Path(cache_dir or os.getenv("ECHOVERSE_AUDIO_CACHE_DIR")
+                              or Path.home() / ".cache" / "echoverse" / "audio")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or int(float(os.getenv("ECHOVERSE_AUDIO_CACHE_MB", "512")) * 1024 * 1024)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recent first
+        self._total_bytes = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(text: str, voice_embedding_id: int, speed: float, model_revision: str) -> str:
+        """Hash of everything that determines the synthesized audio"""
+        payload = "\x1f".join([model_revision, str(voice_embedding_id), f"{speed:.4f}", text])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up a cached chunk
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Float waveform, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            audio, _ = sf.read(path, dtype="float32")
+            os.utime(path)  # Persist recency across restarts
+        except Exception:
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: np.ndarray, sample_rate: int):
+        """Store a chunk, evicting old entries if the size cap is exceeded"""
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            sf.write(tmp_path, np.clip(audio, -1.0, 1.0), sample_rate, format="FLAC", subtype="PCM_16")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Error writing audio cache entry: %s", e)
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        size = path.stat().st_size
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            for key in list(self._entries):
+                self._path(key).unlink(missing_ok=True)
+                self._forget(key)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{_EXTENSION}"
+
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times"""
+        files = []
+        for path in self.cache_dir.glob(f"*{_EXTENSION}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def _forget(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            self._path(key).unlink(missing_ok=True)
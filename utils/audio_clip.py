@@ -0,0 +1,125 @@
+import io
+from typing import NamedTuple, Optional
+
+import numpy as np
+import soundfile as sf
+
+from utils.audio_encoders import FORMATS, encode_audio
+
+
+class AudioMetadata(NamedTuple):
+    """Container-level facts about an encoded clip"""
+    frames: int
+    samplerate: int
+    channels: int
+    format: str
+    subtype: str
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+
+def probe_bytes(data) -> Optional[AudioMetadata]:
+    """Read metadata from an encoded payload's header, or None if unreadable"""
+    try:
+        # BytesIO over bytes shares the buffer until written to
+        info = sf.info(io.BytesIO(data))
+        return AudioMetadata(info.frames, info.samplerate, info.channels, info.format, info.subtype)
+    except Exception:
+        return None
+
+
+class AudioClip:
+    def __init__(self, samples: np.ndarray = None, sample_rate: int = 16000, encoded: bytes = None,
+                 output_format: str = "wav", bitrate_kbps: int = None, metadata: AudioMetadata = None):
+        """
+        Audio passed through the pipeline: PCM samples and/or an encoded payload
+
+        Whichever representation is missing is produced lazily on first access
+        and cached, so a clip is encoded at most once and decoded at most once.
+        Metadata comes from the samples when they exist and otherwise from the
+        container header.
+
+        Args:
+            samples: Mono float32 waveform
+            sample_rate: Sample rate of samples
+            encoded: Already encoded payload
+            output_format: Format key of the encoded payload ("wav", "mp3", "ogg" or "flac")
+            bitrate_kbps: MP3 bitrate used when encoding lazily
+            metadata: Known metadata, saving a header probe
+        """
+        if samples is None and encoded is None:
+            raise ValueError("AudioClip needs samples or an encoded payload")
+        if output_format not in FORMATS:
+            raise ValueError(f"Unsupported audio format: {output_format}")
+        self._samples = None if samples is None else np.asarray(samples, dtype=np.float32).reshape(-1)
+        self._encoded = encoded
+        self.sample_rate = sample_rate
+        self.output_format = output_format
+        self.bitrate_kbps = bitrate_kbps
+        self._metadata = metadata
+
+    @classmethod
+    def from_samples(cls, samples: np.ndarray, sample_rate: int, output_format: str = "wav",
+                     bitrate_kbps: int = None) -> "AudioClip":
+        return cls(samples=samples, sample_rate=sample_rate, output_format=output_format, bitrate_kbps=bitrate_kbps)
+
+    @classmethod
+    def from_encoded(cls, encoded: bytes, output_format: str = "wav", metadata: AudioMetadata = None) -> "AudioClip":
+        metadata = metadata or probe_bytes(encoded)
+        sample_rate = metadata.samplerate if metadata else 16000
+        return cls(encoded=encoded, sample_rate=sample_rate, output_format=output_format, metadata=metadata)
+
+    @property
+    def samples(self) -> np.ndarray:
+        """Float32 waveform, decoded from the payload on first access if needed"""
+        if self._samples is None:
+            audio, self.sample_rate = sf.read(io.BytesIO(self._encoded), dtype="float32")
+            self._samples = audio.mean(axis=1) if audio.ndim > 1 else audio
+        return self._samples
+
+    @property
+    def encoded(self) -> bytes:
+        """Encoded payload, produced on first access and cached"""
+        if self._encoded is None:
+            self._encoded = encode_audio(self._samples, self.sample_rate, self.output_format,
+                                         bitrate_kbps=self.bitrate_kbps)
+        return self._encoded
+
+    def view(self) -> memoryview:
+        """Zero-copy read-only view of the encoded payload"""
+        return memoryview(self.encoded)
+
+    @property
+    def metadata(self) -> Optional[AudioMetadata]:
+        if self._metadata is None:
+            if self._samples is not None:
+                spec = FORMATS[self.output_format]
+                self._metadata = AudioMetadata(self._samples.size, self.sample_rate, 1, spec["format"], spec["subtype"])
+            else:
+                self._metadata = probe_bytes(self._encoded)
+        return self._metadata
+
+    @property
+    def duration(self) -> float:
+        return self.metadata.duration if self.metadata else 0.0
+
+    @property
+    def mime(self) -> str:
+        return FORMATS[self.output_format]["mime"]
+
+    @property
+    def extension(self) -> str:
+        return FORMATS[self.output_format]["extension"]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the encoded payload"""
+        return len(self.encoded)
+
+    def release_samples(self):
+        """Drop the PCM buffer once the payload is encoded, keeping only the compressed form"""
+        self.metadata  # Capture metadata before the samples go
+        self.encoded
+        self._samples = None
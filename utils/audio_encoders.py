@@ -0,0 +1,138 @@
+import io
+import struct
+import numpy as np
+import soundfile as sf
+from utils.metrics import trace_span
+
+# Output formats written through libsndfile; no external encoder binaries needed
+FORMATS = {
+    "wav": {"format": "WAV", "subtype": "PCM_16", "mime": "audio/wav", "extension": "wav", "label": "WAV (uncompressed)"},
+    "mp3": {"format": "MP3", "subtype": "MPEG_LAYER_III", "mime": "audio/mpeg", "extension": "mp3", "label": "MP3"},
+    "ogg": {"format": "OGG", "subtype": "VORBIS", "mime": "audio/ogg", "extension": "ogg", "label": "OGG Vorbis"},
+    "flac": {"format": "FLAC", "subtype": "PCM_16", "mime": "audio/flac", "extension": "flac", "label": "FLAC (lossless)"},
+}
+DEFAULT_MP3_BITRATE = 64
+# libsndfile's Vorbis encoder crashes on very large single writes; feed it in blocks
+WRITE_BLOCK_FRAMES = 16384
+
+
+def _mp3_bitrate_range(sample_rate: int):
+    """Min/max CBR bitrate (kbps) libsndfile maps compression levels onto"""
+    if sample_rate >= 32000:
+        return 32, 320  # MPEG-1
+    if sample_rate >= 16000:
+        return 8, 160  # MPEG-2
+    return 8, 64  # MPEG-2.5
+
+
+class AudioEncoder:
+    def __init__(self, fmt: str = "wav", sample_rate: int = 16000, bitrate_kbps: int = None, quality: float = None):
+        """
+        Incremental encoder from float audio to a compressed container in memory
+
+        Args:
+            fmt: Output format key ("wav", "mp3", "ogg" or "flac")
+            sample_rate: Sample rate of the audio written
+            bitrate_kbps: MP3 constant bitrate (snapped to the nearest supported rate)
+            quality: OGG Vorbis quality from 0.0 (smallest) to 1.0 (best)
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported audio format: {fmt}")
+        self.fmt = fmt
+        self.sample_rate = sample_rate
+        spec = FORMATS[fmt]
+
+        options = {}
+        if fmt == "mp3":
+            low, high = _mp3_bitrate_range(sample_rate)
+            bitrate = min(max(bitrate_kbps or DEFAULT_MP3_BITRATE, low), high)
+            # libsndfile rejects exactly 1.0 for MPEG
+            options["compression_level"] = min((high - bitrate) / (high - low), 0.99)
+            options["bitrate_mode"] = "CONSTANT"
+        elif fmt == "ogg" and quality is not None:
+            options["compression_level"] = 1.0 - min(max(quality, 0.0), 1.0)
+        elif fmt == "flac":
+            options["compression_level"] = 1.0  # Lossless either way; favour size
+
+        self._buffer = io.BytesIO()
+        self._file = sf.SoundFile(self._buffer, mode="w", samplerate=sample_rate, channels=1,
+                                  subtype=spec["subtype"], format=spec["format"], **options)
+        self.frames = 0
+
+    def write(self, audio: np.ndarray):
+        """Encode another block of float samples in [-1, 1]"""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        for start in range(0, audio.size, WRITE_BLOCK_FRAMES):
+            self._file.write(np.clip(audio[start:start + WRITE_BLOCK_FRAMES], -1.0, 1.0))
+        self.frames += audio.size
+
+    def finish(self) -> bytes:
+        """Flush the encoder and return the complete file"""
+        self._file.close()
+        return self._buffer.getvalue()
+
+    @property
+    def mime(self) -> str:
+        return FORMATS[self.fmt]["mime"]
+
+
+def encode_audio(audio: np.ndarray, sample_rate: int, fmt: str = "wav", bitrate_kbps: int = None,
+                 quality: float = None) -> bytes:
+    """
+    Encode a whole float waveform in one call
+
+    Args:
+        audio: Float waveform in [-1, 1]
+        sample_rate: Sample rate of audio
+        fmt: Output format key
+        bitrate_kbps: MP3 constant bitrate
+        quality: OGG Vorbis quality from 0.0 to 1.0
+
+    Returns:
+        Encoded file as bytes
+    """
+    with trace_span("encode", format=fmt, samples=int(np.size(audio))):
+        encoder = AudioEncoder(fmt, sample_rate, bitrate_kbps=bitrate_kbps, quality=quality)
+        encoder.write(audio)
+        return encoder.finish()
+
+
+def encode_block(audio: np.ndarray) -> bytes:
+    """
+    Raw 16-bit PCM block that join_blocks can concatenate with others
+
+    Blocks are PCM for every output format: separately encoded MP3 streams
+    each carry their own encoder delay and padding, so joining them would put
+    a gap at every boundary. join_blocks encodes the joined PCM once instead.
+    """
+    return (np.clip(np.asarray(audio, dtype=np.float32).reshape(-1), -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def join_blocks(blocks, total_samples: int, sample_rate: int, fmt: str = "wav", bitrate_kbps: int = None) -> bytes:
+    """
+    Build a complete file from blocks made by encode_block, in order
+
+    WAV is a header plus the blocks as they are. Every other format encodes
+    all of the joined PCM, so its cost grows with the whole document, not
+    with the blocks that changed.
+
+    Args:
+        blocks: Iterable of block bytes
+        total_samples: Sum of the blocks' sample counts (sizes the WAV header)
+        sample_rate: Sample rate of the blocks
+        fmt: Output format key ("wav", "mp3", "ogg" or "flac")
+        bitrate_kbps: MP3 bitrate when fmt is "mp3"
+
+    Returns:
+        Encoded file as bytes
+    """
+    with trace_span("join_blocks", format=fmt, samples=total_samples):
+        if fmt == "wav":
+            data_bytes = total_samples * 2
+            header = struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16, 1, 1,
+                                 sample_rate, sample_rate * 2, 2, 16, b"data", data_bytes)
+            return header + b"".join(blocks)
+        encoder = AudioEncoder(fmt, sample_rate, bitrate_kbps=bitrate_kbps)
+        for block in blocks:
+            encoder.write(np.frombuffer(block, dtype="<i2").astype(np.float32) / 32767)
+        return encoder.finish()
@@ -0,0 +1,188 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SPILL_PREFIX = "echoverse_spill_"
+
+
+class AudioSpillStore:
+    def __init__(self, directory: str = None, session_budget_bytes: int = None, global_budget_bytes: int = None):
+        """
+        Disk store for narration audio with per-session and global byte budgets
+
+        Audio is written to files and referenced by key, so session history
+        holds only small references. When a budget is exceeded the least
+        recently used entries (within the session, then globally) are evicted.
+        The store's directory is deleted on close() or interpreter exit, and
+        directories left by crashed processes are cleared on startup.
+
+        Args:
+            directory: Parent directory for spill files
+                (default: ECHOVERSE_SPILL_DIR or the system temp directory)
+            session_budget_bytes: Byte budget per session
+                (default: ECHOVERSE_SPILL_SESSION_MB megabytes, or 200 MB)
+            global_budget_bytes: Byte budget across all sessions
+                (default: ECHOVERSE_SPILL_GLOBAL_MB megabytes, or 2048 MB)
+        """
+        parent = Path(directory or os.getenv("ECHOVERSE_SPILL_DIR") or tempfile.gettempdir())
+        parent.mkdir(parents=True, exist_ok=True)
+        # Private directory per store, tagged with our pid so later runs can
+        # clear it if this process dies without reaching close()
+        _remove_stale_directories(parent)
+        self.directory = Path(tempfile.mkdtemp(prefix=f"{SPILL_PREFIX}{os.getpid()}_", dir=parent))
+        self.session_budget_bytes = session_budget_bytes or int(float(os.getenv("ECHOVERSE_SPILL_SESSION_MB", "200")) * 1024 * 1024)
+        self.global_budget_bytes = global_budget_bytes or int(float(os.getenv("ECHOVERSE_SPILL_GLOBAL_MB", "2048")) * 1024 * 1024)
+
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (session_id, size), least recent first
+        self._session_bytes = {}
+        self._total_bytes = 0
+        atexit.register(self.close)
+
+    def put(self, session_id: str, audio_data: bytes) -> str:
+        """
+        Spill audio to disk
+
+        Args:
+            session_id: Owning session
+            audio_data: Encoded audio
+
+        Returns:
+            Key for later retrieval
+        """
+        key = uuid.uuid4().hex
+        with open(self._path(key), "wb") as f:
+            f.write(audio_data)
+
+        size = len(audio_data)
+        with self._lock:
+            self._entries[key] = (session_id, size)
+            self._session_bytes[session_id] = self._session_bytes.get(session_id, 0) + size
+            self._total_bytes += size
+            self._evict(session_id)
+        return key
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Load spilled audio, or None if it was evicted"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                self._remove(key)
+            return None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def delete(self, key: str):
+        """Remove one entry"""
+        with self._lock:
+            self._remove(key)
+
+    def drop_session(self, session_id: str):
+        """Remove every entry owned by a session"""
+        with self._lock:
+            for key in [key for key, (owner, _) in self._entries.items() if owner == session_id]:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "sessions": len(self._session_bytes),
+                "evictions": self.evictions,
+                "session_budget_bytes": self.session_budget_bytes,
+                "global_budget_bytes": self.global_budget_bytes,
+            }
+
+    def session_bytes(self, session_id: str) -> int:
+        with self._lock:
+            return self._session_bytes.get(session_id, 0)
+
+    def close(self):
+        """Delete all spill files (also run at interpreter exit)"""
+        atexit.unregister(self.close)
+        with self._lock:
+            self._entries.clear()
+            self._session_bytes.clear()
+            self._total_bytes = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.audio"
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        session_id, size = entry
+        self._total_bytes -= size
+        remaining = self._session_bytes.get(session_id, 0) - size
+        if remaining > 0:
+            self._session_bytes[session_id] = remaining
+        else:
+            self._session_bytes.pop(session_id, None)
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self, session_id: str):
+        # The entry just added is never evicted by its own session's budget
+        while self._session_bytes.get(session_id, 0) > self.session_budget_bytes:
+            victim = next((key for key, (owner, _) in self._entries.items() if owner == session_id), None)
+            if victim is None or victim == next(reversed(self._entries)):
+                break
+            self._remove(victim)
+            self.evictions += 1
+        while self._total_bytes > self.global_budget_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name != "posix":
+        # os.kill would terminate the process on Windows; assume it is alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_stale_directories(parent: Path):
+    """Delete spill directories left behind by processes that no longer exist"""
+    for path in parent.glob(f"{SPILL_PREFIX}*_*"):
+        pid = path.name[len(SPILL_PREFIX):].split("_", 1)[0]
+        if path.is_dir() and pid.isdigit() and int(pid) != os.getpid() and not _process_alive(int(pid)):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_spill_store() -> AudioSpillStore:
+    """The process-wide spill store shared by all sessions"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AudioSpillStore()
+    return _store
@@ -0,0 +1,112 @@
+import numpy as np
+from utils.audio_encoders import AudioEncoder, FORMATS
+from utils.audio_clip import AudioClip, AudioMetadata
+
+
+class AudioStitcher:
+    def __init__(self, sample_rate: int = 16000, crossfade_ms: float = 30.0,
+                 target_rms_db: float = -20.0, peak_limit: float = 0.95,
+                 output_format: str = "wav", bitrate_kbps: int = None):
+        """
+        Incrementally join audio segments into a single encoded audio stream
+
+        Each segment is gain-normalized to a common loudness and joined to the
+        previous one with a short equal-power crossfade. Of the float samples,
+        only the crossfade tail of the previous segment is held; everything else
+        is encoded into the output container as it arrives. That container is an
+        in-memory buffer, so memory still grows with the length of the encoded
+        output (about 1.9 MB per minute for 16 kHz WAV, far less for MP3/OGG).
+
+        Args:
+            sample_rate: Sample rate of all segments
+            crossfade_ms: Crossfade length between consecutive segments
+            target_rms_db: Target RMS level per segment in dBFS
+            peak_limit: Maximum absolute sample value after gain
+            output_format: Output format key ("wav", "mp3", "ogg" or "flac"),
+                or None to keep raw samples for finish_samples()
+            bitrate_kbps: MP3 bitrate when output_format is "mp3"
+        """
+        self.sample_rate = sample_rate
+        self.crossfade_samples = int(sample_rate * crossfade_ms / 1000)
+        self.target_rms = 10 ** (target_rms_db / 20)
+        self.peak_limit = peak_limit
+        self.segment_count = 0
+        self.total_samples = 0
+
+        self.output_format = output_format
+        self._encoder = AudioEncoder(output_format, sample_rate, bitrate_kbps=bitrate_kbps) if output_format else None
+        self._samples = []
+        self._tail = np.zeros(0, dtype=np.float32)
+
+        fade = np.linspace(0.0, np.pi / 2, self.crossfade_samples, dtype=np.float32)
+        self._fade_in = np.sin(fade)
+        self._fade_out = np.cos(fade)
+
+    def add(self, audio: np.ndarray):
+        """Append one segment of float audio in [-1, 1]"""
+        audio = self._normalize_gain(np.asarray(audio, dtype=np.float32).flatten())
+        if audio.size == 0:
+            return
+
+        overlap = min(self.crossfade_samples, self._tail.size, audio.size)
+        if overlap:
+            head = (self._tail[-overlap:] * self._fade_out[-overlap:]
+                    + audio[:overlap] * self._fade_in[:overlap])
+            self._write(self._tail[:-overlap])
+            self._write(head)
+            audio = audio[overlap:]
+        else:
+            self._write(self._tail)
+
+        # Hold back the end of this segment for the next crossfade
+        keep = min(self.crossfade_samples, audio.size)
+        self._write(audio[:audio.size - keep])
+        self._tail = audio[audio.size - keep:].copy()
+        self.segment_count += 1
+
+    def finish(self) -> bytes:
+        """Flush the remaining tail and return the complete encoded file as bytes"""
+        self._write(self._tail)
+        self._tail = np.zeros(0, dtype=np.float32)
+        return self._encoder.finish()
+
+    def finish_samples(self) -> np.ndarray:
+        """Flush the remaining tail and return the joined float samples (output_format=None only)"""
+        self._write(self._tail)
+        self._tail = np.zeros(0, dtype=np.float32)
+        if not self._samples:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self._samples)
+
+    def finish_clip(self) -> AudioClip:
+        """Flush the remaining tail and return the result as an AudioClip with known metadata"""
+        encoded = self.finish()
+        spec = FORMATS[self.output_format]
+        metadata = AudioMetadata(self.total_samples, self.sample_rate, 1, spec["format"], spec["subtype"])
+        return AudioClip.from_encoded(encoded, self.output_format, metadata=metadata)
+
+    @property
+    def duration(self) -> float:
+        """Duration written so far in seconds"""
+        return (self.total_samples + self._tail.size) / self.sample_rate
+
+    def _write(self, audio: np.ndarray):
+        if audio.size:
+            if self._encoder is not None:
+                self._encoder.write(audio)
+            else:
+                self._samples.append(np.array(audio, dtype=np.float32))
+            self.total_samples += audio.size
+
+    def _normalize_gain(self, audio: np.ndarray) -> np.ndarray:
+        """Scale segment to the target RMS without exceeding the peak limit"""
+        if audio.size == 0:
+            return audio
+        rms = float(np.sqrt(np.mean(np.square(audio))))
+        if rms < 1e-5:
+            return audio  # Silence: leave untouched
+        gain = self.target_rms / rms
+        peak = float(np.max(np.abs(audio)))
+        if peak * gain > self.peak_limit:
+            gain = self.peak_limit / peak
+        return audio * gain
@@ -1,18 +1,20 @@
 import io
 import uuid
-import numpy as np
 import soundfile as sf
-from pathlib import Path
+from typing import Optional, Union
+from utils.audio_encoders import FORMATS, DEFAULT_MP3_BITRATE, encode_audio
+from utils.audio_clip import AudioClip, AudioMetadata, probe_bytes
 
 class AudioUtils:
     @staticmethod
-    def save_audio(audio_data: bytes, text_preview: str = "") -> str:
+    def save_audio(audio_data: Union[AudioClip, bytes], text_preview: str = "", output_format: str = None) -> str:
         """
         Generate a unique filename for the audio file
         
         Args:
-            audio_data: Audio data as bytes
+            audio_data: AudioClip or audio data as bytes
             text_preview: Preview of the text for filename generation
+            output_format: Format key used for the file extension (default: the clip's format, else WAV)
         
         Returns:
             Generated filename
@@ -25,10 +27,13 @@ class AudioUtils:
         unique_id = str(uuid.uuid4())[:8]
         
         # Create filename
+        if output_format is None:
+            output_format = audio_data.output_format if isinstance(audio_data, AudioClip) else "wav"
+        extension = FORMATS[output_format]["extension"]
         if safe_text:
-            filename = f"echoverse_{safe_text}_{unique_id}.wav"
+            filename = f"echoverse_{safe_text}_{unique_id}.{extension}"
         else:
-            filename = f"echoverse_{unique_id}.wav"
+            filename = f"echoverse_{unique_id}.{extension}"
         
         # Clean filename
         filename = filename.replace(" ", "_")
@@ -36,52 +41,88 @@ class AudioUtils:
         return filename
     
     @staticmethod
-    def convert_to_mp3(audio_data: bytes) -> bytes:
+    def convert_to_mp3(audio_data: Union[AudioClip, bytes], bitrate_kbps: int = DEFAULT_MP3_BITRATE) -> bytes:
         """
-        Convert audio to MP3 format (placeholder - requires additional libraries)
+        Convert audio to MP3 format
         
         Args:
-            audio_data: Input audio data
+            audio_data: AudioClip, or audio data in any format libsndfile can read
+            bitrate_kbps: Constant MP3 bitrate
         
         Returns:
             MP3 audio data
         """
-        # For now, return the original data
-        # In production, you would use pydub or similar library
-        return audio_data
+        return AudioUtils.convert_format(audio_data, "mp3", bitrate_kbps=bitrate_kbps)
     
     @staticmethod
-    def get_audio_duration(audio_data: bytes) -> float:
+    def convert_format(audio_data: Union[AudioClip, bytes], output_format: str, bitrate_kbps: int = None) -> bytes:
+        """
+        Re-encode audio into another format
+        
+        Args:
+            audio_data: AudioClip, or audio data in any format libsndfile can read
+            output_format: Output format key ("wav", "mp3", "ogg" or "flac")
+            bitrate_kbps: MP3 bitrate when output_format is "mp3"
+        
+        Returns:
+            Encoded audio data
+        """
+        if isinstance(audio_data, AudioClip):
+            # Uses the clip's PCM buffer directly when it is still held
+            audio, sample_rate = audio_data.samples, audio_data.sample_rate
+        else:
+            audio, sample_rate = sf.read(io.BytesIO(audio_data), dtype='float32')
+            if audio.ndim > 1:
+                audio = audio.mean(axis=1)
+        return encode_audio(audio, sample_rate, output_format, bitrate_kbps=bitrate_kbps)
+    
+    @staticmethod
+    def get_mime_type(output_format: str) -> str:
+        """MIME type for a format key"""
+        return FORMATS[output_format]["mime"]
+    
+    @staticmethod
+    def probe(audio_data: Union[AudioClip, bytes]) -> Optional[AudioMetadata]:
+        """
+        Read audio metadata from the container header without decoding samples
+        
+        Cost does not grow with clip length for WAV/FLAC/OGG; callers should
+        keep the result alongside the clip instead of probing on every render.
+        
+        Args:
+            audio_data: AudioClip (uses its cached metadata) or encoded audio data
+        
+        Returns:
+            AudioMetadata, or None if the data is not a readable audio file
+        """
+        if isinstance(audio_data, AudioClip):
+            return audio_data.metadata
+        return probe_bytes(audio_data)
+    
+    @staticmethod
+    def get_audio_duration(audio_data: Union[AudioClip, bytes]) -> float:
         """
         Get duration of audio in seconds
         
         Args:
-            audio_data: Audio data as bytes
+            audio_data: AudioClip or audio data as bytes
         
         Returns:
             Duration in seconds
         """
-        try:
-            buffer = io.BytesIO(audio_data)
-            audio, sample_rate = sf.read(buffer)
-            return len(audio) / sample_rate
-        except Exception:
-            return 0.0
+        metadata = AudioUtils.probe(audio_data)
+        return metadata.duration if metadata else 0.0
     
     @staticmethod
-    def validate_audio_format(audio_data: bytes) -> bool:
+    def validate_audio_format(audio_data: Union[AudioClip, bytes]) -> bool:
         """
         Validate if audio data is in correct format
         
         Args:
-            audio_data: Audio data to validate
+            audio_data: AudioClip or audio data to validate
         
         Returns:
             True if valid, False otherwise
         """
-        try:
-            buffer = io.BytesIO(audio_data)
-            sf.read(buffer)
-            return True
-        except Exception:
-            return False
+        metadata = AudioUtils.probe(audio_data)
+        return metadata is not None and metadata.frames > 0
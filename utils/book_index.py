@@ -0,0 +1,139 @@
+import codecs
+import re
+from typing import BinaryIO, List, NamedTuple, Sequence
+
+READ_BYTES = 64 * 1024  # Largest piece read at once; a line longer than this is read in pieces
+MAX_HEADING_CHARS = 80  # Longer lines are never treated as headings
+MIN_SECTION_CHARS = 500  # A heading this close to the previous heading extends its section (tables of contents)
+MAX_SECTION_CHARS = 100_000  # Sections are split at the next line break beyond this
+OPENING_TITLE = "Opening"  # Title of the text before the first heading
+
+_NUMBER = (
+    r"[0-9]+|[ivxlcdm]+|"
+    r"(?:one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|"
+    r"sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred)"
+    r"(?:[- ](?:one|two|three|four|five|six|seven|eight|nine))?|"
+    r"first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth|last"
+)
+# A heading is a short line on its own after a blank line: "Chapter 12", "PART TWO: The Return",
+# "Prologue", or a Markdown "# Heading"
+_HEADING_RE = re.compile(
+    rf"^(?:(?:chapter|book|part|section|act|scene|volume)\s+(?:{_NUMBER})\b[.:]?(?:\s+.*)?"
+    r"|(?:prologue|epilogue|preface|foreword|introduction|afterword|interlude)\b[.:]?(?:\s+.*)?"
+    r"|#{1,3}\s+\S.*)$",
+    re.IGNORECASE,
+)
+
+
+class Section(NamedTuple):
+    """One chapter or section of an indexed text, located by byte offsets"""
+    title: str
+    start: int
+    end: int
+    characters: int
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+class BookIndex:
+    def __init__(self, sections: List[Section], size: int):
+        """
+        Chapter/section offsets of a UTF-8 text, built without decoding it into memory
+
+        Build one with BookIndex.build(), keep it in place of the text, and
+        decode only the sections that are needed with read().
+
+        Args:
+            sections: Sections in reading order, covering the whole text
+            size: Total size in bytes
+        """
+        self.sections = sections
+        self.size = size
+
+    @property
+    def characters(self) -> int:
+        return sum(section.characters for section in self.sections)
+
+    @classmethod
+    def build(cls, stream: BinaryIO) -> "BookIndex":
+        """
+        Index a binary stream in one pass
+
+        The stream is read in pieces of at most READ_BYTES and decoded
+        incrementally, so memory use does not depend on the size of the text.
+        Sections start at detected headings; text before the first heading
+        becomes "Opening", and text without any headings is cut into parts at
+        line breaks once a part exceeds MAX_SECTION_CHARS.
+
+        Args:
+            stream: Seekable binary stream of UTF-8 text (an upload or an open file)
+        """
+        stream.seek(0)
+        decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        sections = []
+        title, part, start, characters, has_content = OPENING_TITLE, 1, 0, 0, False
+        offset = 0
+        at_line_start = True  # The next piece begins a line
+        previous_blank = True  # The last complete line was blank
+
+        while True:
+            piece = stream.readline(READ_BYTES)
+            if not piece:
+                break
+            text = decoder.decode(piece)
+            complete = piece.endswith(b"\n")
+            line = text.strip() if at_line_start and complete and len(text) <= MAX_HEADING_CHARS else None
+
+            if line and previous_blank and _HEADING_RE.match(line):
+                heading = line.lstrip("#").strip()
+                if has_content and (characters >= MIN_SECTION_CHARS or title == OPENING_TITLE):
+                    sections.append(Section(_part_title(title, part), start, offset, characters))
+                    title, part, start, characters, has_content = heading, 1, offset, 0, False
+                elif not has_content and title == OPENING_TITLE:
+                    title = heading
+                else:
+                    has_content = True  # A heading too close to the last one is part of its text
+            else:
+                if at_line_start and characters > MAX_SECTION_CHARS:
+                    sections.append(Section(_part_title(title, part), start, offset, characters))
+                    part, start, characters, has_content = part + 1, offset, 0, False
+                has_content = has_content or bool(text.strip())
+
+            if at_line_start:
+                previous_blank = line == ""
+            characters += len(text)
+            offset += len(piece)
+            at_line_start = complete
+        characters += len(decoder.decode(b"", final=True))
+        if offset > start:
+            sections.append(Section(_part_title(title, part), start, offset, characters))
+        return cls(sections, offset)
+
+    def read(self, stream: BinaryIO, sections: Sequence[Section] = None) -> str:
+        """
+        Decode the given sections (default: all), joined with blank lines
+
+        Args:
+            stream: The stream the index was built from
+            sections: Sections to materialize, in the order they should be read
+        """
+        texts = []
+        for section in self.sections if sections is None else sections:
+            stream.seek(section.start)
+            text = stream.read(section.size).decode("utf-8", errors="replace")
+            texts.append(text.lstrip("\ufeff").strip())
+        return "\n\n".join(text for text in texts if text)
+
+    def preview(self, stream: BinaryIO, section: Section, characters: int = 1000) -> str:
+        """The opening characters of a section, read without decoding the rest"""
+        stream.seek(section.start)
+        # UTF-8 uses at most 4 bytes per character
+        data = stream.read(min(section.size, characters * 4))
+        text = data.decode("utf-8", errors="ignore").lstrip("\ufeff")
+        return text[:characters] + "..." if section.characters > characters else text
+
+
+def _part_title(title: str, part: int) -> str:
+    return title if part == 1 else f"{title} ({part})"
@@ -0,0 +1,179 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+SPEECH_VERBS = (
+    "said", "says", "asked", "asks", "replied", "replies", "answered", "shouted", "yelled", "cried", "called",
+    "whispered", "murmured", "muttered", "added", "continued", "exclaimed", "snapped", "began", "told",
+)
+_NOT_NAMES = {"He", "She", "They", "I", "We", "It", "You", "The", "A", "An", "His", "Her", "Then", "And", "But"}
+
+_QUOTE_RE = re.compile(r'"([^"\n]+)"|“([^”]+)”')
+_NAME = r"(?:(?:Mr|Mrs|Ms|Dr)\.?\s+)?[A-Z][a-z'’-]+(?:\s+[A-Z][a-z'’-]+)?"
+_VERB = r"(?:" + "|".join(SPEECH_VERBS) + r")"
+# '"...," said Alice' / '"...," Alice said' in the narration right after a quote
+_ATTRIBUTION_AFTER_RE = re.compile(rf"^\W*(?:{_VERB}\s+({_NAME})|({_NAME})\s+{_VERB})\b")
+# 'Alice said, "..."' / 'Alice asked: "..."' in the narration right before a quote
+_ATTRIBUTION_BEFORE_RE = re.compile(rf"\b({_NAME})\s+{_VERB}(?:\s+\w+)?\W*$")
+# 'Bob shook his head. "..."': the subject of the narration before a quote
+_BEAT_RE = re.compile(rf"^\W*({_NAME})\s+[a-z]")
+# 'ALICE: ...' or 'Alice: ...' script lines
+_TAG_RE = re.compile(r"^\s*([A-Z][\w'’.-]*(?:\s+[A-Z][\w'’.-]*){0,2})\s*:\s+(\S.*)$")
+MIN_TAG_LINES = 2  # A "Name:" prefix counts as a character tag if it is in capitals or starts this many lines
+
+
+class Line(NamedTuple):
+    """A run of text spoken by one voice: a character's speech, or narration when speaker is None"""
+    text: str
+    speaker: Optional[str]
+
+
+def parse_dialogue(text: str) -> List[Line]:
+    """
+    Split text into narration and character speech, in reading order
+
+    Speech is recognised two ways:
+      - script lines tagged with a character name ("ALICE: Where were you?")
+        written in capitals or starting at least MIN_TAG_LINES lines
+      - quoted speech ("..." or “...”), attributed from a speech verb next to
+        the quote ("said Alice", "Bob asked") or else from the subject of the
+        narration just before it ("Bob shook his head."). All quotes in a
+        paragraph belong to one speaker, as in conventional prose; an
+        unattributed paragraph of speech goes to whichever of the last two
+        speakers did not speak last.
+    Speech whose speaker cannot be found is narrated.
+
+    Args:
+        text: Source text; paragraphs are separated by blank lines
+
+    Returns:
+        Lines with adjacent runs of the same speaker merged
+    """
+    raw_lines = text.splitlines()
+    tag_counts = {}
+    for raw_line in raw_lines:
+        match = _TAG_RE.match(raw_line)
+        if match:
+            name = match.group(1)
+            tag_counts[name] = tag_counts.get(name, 0) + 1
+    tags = {_speaker_name(name) for name, count in tag_counts.items()
+            if count >= MIN_TAG_LINES or name.isupper()}
+
+    lines = []
+    recent = []  # Last two distinct speakers, most recent last
+    for paragraph in _paragraphs(raw_lines, tags):
+        match = _TAG_RE.match(paragraph)
+        if match and _speaker_name(match.group(1)) in tags:
+            speaker = _speaker_name(match.group(1))
+            lines.append(Line(match.group(2).strip(), speaker))
+        else:
+            speaker = _parse_prose(paragraph, recent, lines)
+        if speaker is not None:
+            if speaker in recent:
+                recent.remove(speaker)
+            recent = (recent + [speaker])[-2:]
+        lines.append(Line("", None))  # Paragraph break marker, dropped when merging
+    return _merge(lines)
+
+
+def cast_voices(lines: Sequence[Line], narrator_voice: int, voice_ids: Sequence[int]) -> Dict[Optional[str], int]:
+    """
+    Voice for the narrator (key None) and each speaker
+
+    Speakers get voice_ids in order of first appearance, skipping the
+    narrator's voice, and cycle through them when there are more speakers
+    than voices.
+
+    Args:
+        lines: Parsed lines
+        narrator_voice: Voice id of the narration
+        voice_ids: Voice ids available for characters
+    """
+    voices = {None: narrator_voice}
+    pool = [voice_id for voice_id in voice_ids if voice_id != narrator_voice] or [narrator_voice]
+    for line in lines:
+        if line.speaker not in voices:
+            voices[line.speaker] = pool[(len(voices) - 1) % len(pool)]
+    return voices
+
+
+def format_script(lines: Sequence[Line]) -> str:
+    """Readable transcript: speech prefixed with its speaker, narration as is"""
+    return "\n\n".join(f"{line.speaker}: {line.text}" if line.speaker else line.text for line in lines)
+
+
+def _paragraphs(raw_lines, tags):
+    """Blank-line separated paragraphs; tagged script lines are paragraphs of their own"""
+    current = []
+    for raw_line in raw_lines:
+        match = _TAG_RE.match(raw_line)
+        if not raw_line.strip() or (match and _speaker_name(match.group(1)) in tags):
+            if current:
+                yield " ".join(current)
+            current = []
+            if raw_line.strip():
+                yield raw_line.strip()
+        else:
+            current.append(raw_line.strip())
+    if current:
+        yield " ".join(current)
+
+
+def _parse_prose(paragraph: str, recent: list, lines: list) -> Optional[str]:
+    """Append a prose paragraph's narration and speech to lines; returns its speaker"""
+    pieces = []  # (text, is_speech)
+    position = 0
+    for match in _QUOTE_RE.finditer(paragraph):
+        pieces.append((paragraph[position:match.start()], False))
+        pieces.append((match.group(1) or match.group(2), True))
+        position = match.end()
+    pieces.append((paragraph[position:], False))
+    if not any(is_speech for _, is_speech in pieces):
+        lines.append(Line(paragraph, None))
+        return None
+
+    speaker = None
+    for index, (piece, is_speech) in enumerate(pieces):
+        if not is_speech:
+            continue
+        after = _ATTRIBUTION_AFTER_RE.match(pieces[index + 1][0]) if index + 1 < len(pieces) else None
+        before = _ATTRIBUTION_BEFORE_RE.search(pieces[index - 1][0]) if index > 0 else None
+        beat = _BEAT_RE.match(pieces[index - 1][0]) if index > 0 else None
+        candidates = ((after.group(1) or after.group(2)) if after else None,
+                      before.group(1) if before else None,
+                      beat.group(1) if beat else None)
+        for candidate in candidates:
+            if candidate and candidate.split()[0] not in _NOT_NAMES:
+                speaker = _speaker_name(candidate)
+                break
+        if speaker:
+            break
+    if speaker is None and len(recent) == 2:
+        speaker = recent[0]  # Turn-taking: the other half of the conversation
+
+    for piece, is_speech in pieces:
+        piece = piece.strip(" ,;—–-")
+        if re.search(r"\w", piece):
+            lines.append(Line(piece, speaker if is_speech else None))
+    return speaker
+
+
+def _speaker_name(name: str) -> str:
+    """Canonical speaker name, so "ALICE" and "Alice" are one character"""
+    return " ".join(word.capitalize() for word in name.split())
+
+
+def _merge(lines) -> List[Line]:
+    """Join adjacent lines of one speaker; paragraph breaks survive as blank lines inside a run"""
+    merged = []
+    pending_break = False
+    for line in lines:
+        if not line.text:
+            pending_break = True
+            continue
+        if merged and merged[-1].speaker == line.speaker:
+            separator = "\n\n" if pending_break else " "
+            merged[-1] = Line(merged[-1].text + separator + line.text, line.speaker)
+        else:
+            merged.append(line)
+        pending_break = False
+    return merged
@@ -0,0 +1,170 @@
+"""
+Memory-mapped speaker embedding bank.
+
+A bank is a directory holding a float32 matrix (embeddings.npy, one row per
+voice) and an index (index.json) mapping voice ids to rows and metadata. The
+matrix is memory-mapped read-only, so every process using the bank shares the
+same pages and lookup by voice id is a dict access plus a row view.
+
+Convert the legacy pickle or the cmu-arctic-xvectors dataset with:
+    python -m utils.embedding_bank from-pickle speaker_embeddings.pkl voices
+    python -m utils.embedding_bank from-xvectors voices
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+INDEX_FILE = "index.json"
+XVECTOR_DATASET = "Matthijs/cmu-arctic-xvectors"
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBank:
+    def __init__(self, directory: str):
+        """
+        Open an embedding bank
+
+        Args:
+            directory: Bank directory containing embeddings.npy and index.json
+
+        Raises:
+            FileNotFoundError: If the bank files do not exist
+        """
+        self.directory = Path(directory)
+        with open(self.directory / INDEX_FILE, encoding="utf-8") as f:
+            index = json.load(f)
+        self.matrix = np.load(self.directory / EMBEDDINGS_FILE, mmap_mode="r")
+        self.dim = int(index["dim"])
+        if self.matrix.ndim != 2 or self.matrix.shape[1] != self.dim:
+            raise ValueError(f"Embedding matrix shape {self.matrix.shape} does not match dim {self.dim}")
+        # JSON keys are strings; voice ids are ints everywhere else
+        self._voices = {int(voice_id): entry for voice_id, entry in index["voices"].items()}
+
+    def get(self, voice_id: int) -> np.ndarray:
+        """Read-only view of the embedding for a voice id"""
+        return self.matrix[self._voices[voice_id]["row"]]
+
+    def metadata(self, voice_id: int) -> dict:
+        """Metadata stored for a voice id (without the row number)"""
+        return {key: value for key, value in self._voices[voice_id].items() if key != "row"}
+
+    def ids(self) -> list:
+        return list(self._voices)
+
+    def __contains__(self, voice_id) -> bool:
+        return voice_id in self._voices
+
+    def __len__(self) -> int:
+        return len(self._voices)
+
+    @staticmethod
+    def write(directory: str, embeddings: Dict[int, np.ndarray], metadata: Optional[Dict[int, dict]] = None) -> "EmbeddingBank":
+        """
+        Write a bank from a mapping of voice id to embedding vector
+
+        Files are written to temporary names and renamed into place so readers
+        never see a partial bank.
+
+        Args:
+            directory: Output bank directory
+            embeddings: Voice id to 1-D embedding
+            metadata: Optional voice id to metadata dict
+
+        Returns:
+            The opened bank
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        metadata = metadata or {}
+
+        voice_ids = list(embeddings)
+        matrix = np.stack([np.asarray(embeddings[voice_id], dtype=np.float32).reshape(-1) for voice_id in voice_ids])
+        index = {
+            "dim": int(matrix.shape[1]),
+            "voices": {
+                str(voice_id): {"row": row, **metadata.get(voice_id, {})}
+                for row, voice_id in enumerate(voice_ids)
+            },
+        }
+
+        tmp_matrix = directory / f"{EMBEDDINGS_FILE}.{os.getpid()}.tmp"
+        tmp_index = directory / f"{INDEX_FILE}.{os.getpid()}.tmp"
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, matrix)
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_matrix, directory / EMBEDDINGS_FILE)
+        os.replace(tmp_index, directory / INDEX_FILE)
+        logger.info("Wrote embedding bank with %d voices to %s", len(voice_ids), directory)
+        return EmbeddingBank(directory)
+
+    @staticmethod
+    def from_pickle(pickle_path: str, directory: str, metadata: Optional[Dict[int, dict]] = None) -> "EmbeddingBank":
+        """Convert the legacy speaker_embeddings.pkl (voice id -> tensor) into a bank"""
+        with open(pickle_path, "rb") as f:
+            legacy = pickle.load(f)
+        embeddings = {
+            int(voice_id): (value.detach().cpu().numpy() if hasattr(value, "detach") else np.asarray(value)).reshape(-1)
+            for voice_id, value in legacy.items()
+        }
+        metadata = {voice_id: {"source": "pickle", **(metadata or {}).get(voice_id, {})} for voice_id in embeddings}
+        return EmbeddingBank.write(directory, embeddings, metadata)
+
+    @staticmethod
+    def from_xvectors(directory: str, split: str = "validation", dataset=None,
+                      metadata: Optional[Dict[int, dict]] = None) -> "EmbeddingBank":
+        """
+        Convert the cmu-arctic-xvectors dataset layout into a bank
+
+        Every row becomes a voice whose id is its dataset index, matching the
+        ids used by the app (e.g. 9000 is row 9000 of the validation split).
+
+        Args:
+            directory: Output bank directory
+            split: Dataset split to convert
+            dataset: Already loaded dataset with "xvector" and "filename" columns
+            metadata: Optional extra metadata for selected voice ids
+        """
+        if dataset is None:
+            from datasets import load_dataset
+            dataset = load_dataset(XVECTOR_DATASET, split=split)
+        embeddings = {index: np.asarray(vector, dtype=np.float32) for index, vector in enumerate(dataset["xvector"])}
+        filenames = dataset["filename"] if "filename" in dataset.column_names else [""] * len(embeddings)
+        voice_metadata = {}
+        for index, filename in enumerate(filenames):
+            # Filenames look like cmu_us_<speaker>_arctic-wav-arctic_a0001
+            parts = filename.split("_")
+            speaker = parts[2] if len(parts) > 2 and parts[0] == "cmu" else ""
+            voice_metadata[index] = {"source": XVECTOR_DATASET, "speaker": speaker, "utterance": filename,
+                                     **(metadata or {}).get(index, {})}
+        return EmbeddingBank.write(directory, embeddings, voice_metadata)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    pickle_parser = commands.add_parser("from-pickle", help="Convert a legacy speaker_embeddings.pkl")
+    pickle_parser.add_argument("pickle_path")
+    pickle_parser.add_argument("directory")
+    xvector_parser = commands.add_parser("from-xvectors", help=f"Convert the {XVECTOR_DATASET} dataset")
+    xvector_parser.add_argument("directory")
+    xvector_parser.add_argument("--split", default="validation")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "from-pickle":
+        EmbeddingBank.from_pickle(args.pickle_path, args.directory)
+    else:
+        EmbeddingBank.from_xvectors(args.directory, split=args.split)
+
+
+if __name__ == "__main__":
+    main()
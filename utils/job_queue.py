@@ -0,0 +1,227 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested"""
+
+
+class Job:
+    def __init__(self, job_id: str, owner: str, description: str = ""):
+        """
+        State of one background job, safe to read from any thread
+
+        Args:
+            job_id: Unique job ID
+            owner: Session that submitted the job
+            description: Short label shown in the UI
+        """
+        self.job_id = job_id
+        self.owner = owner
+        self.description = description
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = "Queued"
+        self.details = {}  # Partial results published while running
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+
+    def update(self, progress: float = None, message: str = None, **details):
+        """Publish progress from inside the job; raises JobCancelled if cancellation was requested"""
+        if progress is not None:
+            self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        self.details.update(details)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.job_id)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent running so far (or in total once finished)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = None, max_pending_per_owner: int = None, max_finished: int = 200):
+        """
+        Bounded background worker pool for long-running generation jobs
+
+        Jobs run on a fixed number of threads outside the Streamlit script, so
+        reruns and widget interactions neither block nor abort them. Callers
+        poll jobs by ID; cancellation is cooperative and takes effect at the
+        job's next progress update.
+
+        Args:
+            max_workers: Jobs running at once
+                (default: ECHOVERSE_JOB_WORKERS, or 2)
+            max_pending_per_owner: Unfinished jobs one session may have
+                (default: ECHOVERSE_JOBS_PER_SESSION, or 5)
+            max_finished: Finished jobs kept for polling before the oldest are dropped
+        """
+        self.max_workers = max_workers or int(os.getenv("ECHOVERSE_JOB_WORKERS", "2"))
+        self.max_pending_per_owner = max_pending_per_owner or int(os.getenv("ECHOVERSE_JOBS_PER_SESSION", "5"))
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="echoverse_job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # job_id -> Job, oldest first
+        self._futures = {}
+
+    def submit(self, owner: str, func: Callable[..., Any], *args, description: str = "", **kwargs) -> str:
+        """
+        Queue func(job, *args, **kwargs) to run in the background
+
+        Args:
+            owner: Session submitting the job
+            func: Callable receiving the Job first; its return value becomes job.result
+            description: Short label shown in the UI
+
+        Returns:
+            Job ID for polling and cancellation
+        """
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.owner == owner and not job.finished)
+            if pending >= self.max_pending_per_owner:
+                raise RuntimeError(f"Too many queued jobs ({pending}); wait for one to finish or cancel it")
+            job = Job(uuid.uuid4().hex[:12], owner, description)
+            self._jobs[job.job_id] = job
+            self._futures[job.job_id] = self._executor.submit(self._run, job, func, args, kwargs)
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner: str = None) -> List[Job]:
+        """Jobs in submission order, optionally only one session's"""
+        with self._lock:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a job
+
+        Queued jobs are cancelled immediately; running jobs stop at their next
+        progress update.
+
+        Returns:
+            False if the job is unknown or already finished
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job._cancel_event.set()
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                self._finish(job, CANCELLED, message="Cancelled")
+        return True
+
+    def forget(self, job_id: str):
+        """Drop a finished job once its result has been collected"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {
+            "workers": self.max_workers,
+            "queued": states.count(QUEUED),
+            "running": states.count(RUNNING),
+            "finished": sum(1 for state in states if state in FINISHED_STATES),
+        }
+
+    def close(self):
+        """Cancel everything and stop the workers"""
+        for job in self.jobs():
+            self.cancel(job.job_id)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, job: Job, func, args, kwargs):
+        with self._lock:
+            if job.finished:
+                return
+            job.state = RUNNING
+            job.started_at = time.time()
+            job.message = "Starting"
+        try:
+            job.check_cancelled()
+            result = func(job, *args, **kwargs)
+        except JobCancelled:
+            with self._lock:
+                self._finish(job, CANCELLED, message="Cancelled")
+        except Exception as e:
+            logger.exception("Job %s failed: %s", job.job_id, e)
+            with self._lock:
+                self._finish(job, FAILED, message=f"Failed: {e}", error=str(e))
+        else:
+            with self._lock:
+                self._finish(job, DONE, message="Complete", result=result)
+
+    def _finish(self, job: Job, state: str, message: str, result=None, error: str = None):
+        # Caller holds the lock
+        job.state = state
+        job.message = message
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if state == DONE:
+            job.progress = 1.0
+        job.details.clear()
+        self._futures.pop(job.job_id, None)
+
+        finished = [job_id for job_id, other in self._jobs.items() if other.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """The process-wide job queue shared by all sessions"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
@@ -0,0 +1,363 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger("echoverse.trace")
+
+# Seconds; covers sub-millisecond helpers up to multi-minute long-form jobs
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0)
+
+
+def _format_labels(label_names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in zip(label_names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing total"""
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Observation counts in cumulative buckets, plus their sum"""
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def snapshot(self, **labels) -> dict:
+        """Count and sum for one label set"""
+        with self._lock:
+            counts, total = self._values.get(self._key(labels), ([0], 0.0))
+            return {"count": sum(counts), "sum": total}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="{}"'.format(_format_value(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _CallbackMetric:
+    """Value read from a callable at export time, e.g. counters owned by a cache"""
+
+    def __init__(self, name: str, help_text: str, metric_type: str, read: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.type = metric_type
+        self.read = read
+
+    def render(self) -> list:
+        try:
+            value = float(self.read())
+        except Exception as e:
+            logger.warning("Metric %s could not be read: %s", self.name, e)
+            return []
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type}",
+                f"{self.name} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Process-wide metrics in the Prometheus text exposition format
+
+        Metric constructors are idempotent: asking for an existing name returns
+        the same metric, so modules can declare what they record at import time.
+        """
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type}")
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names=()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def gauge(self, name: str, help_text: str, label_names=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def register_callback(self, name: str, help_text: str, read: Callable[[], float], metric_type: str = "gauge"):
+        """Export read() under name at scrape time, replacing any earlier callback of that name"""
+        with self._lock:
+            self._metrics[name] = _CallbackMetric(name, help_text, metric_type, read)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text format"""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path: str):
+        """Write the current metrics to a file atomically (e.g. for the node exporter textfile collector)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (falls back to the peak where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process (0 where it cannot be read)"""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # KiB everywhere but macOS
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """The process-wide metrics registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+                _registry.register_callback("echoverse_process_peak_rss_bytes",
+                                            "Peak resident set size of the process", peak_rss_bytes)
+    return _registry
+
+
+STAGE_SECONDS = get_metrics().histogram(
+    "echoverse_stage_seconds", "Latency of each pipeline stage", label_names=("stage",)
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes would otherwise flood stderr
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(port: int = None, path: str = None, interval_seconds: float = None):
+    """
+    Start the configured metric exporters once per process
+
+    Args:
+        port: Serve /metrics over HTTP on this port (default: ECHOVERSE_METRICS_PORT, off if unset)
+        path: Rewrite this file periodically (default: ECHOVERSE_METRICS_FILE, off if unset)
+        interval_seconds: File rewrite interval (default: ECHOVERSE_METRICS_INTERVAL, or 15)
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    port = port or int(os.getenv("ECHOVERSE_METRICS_PORT", "0"))
+    path = path or os.getenv("ECHOVERSE_METRICS_FILE")
+    interval_seconds = interval_seconds or float(os.getenv("ECHOVERSE_METRICS_INTERVAL", "15"))
+
+    if port:
+        host = os.getenv("ECHOVERSE_METRICS_HOST", "127.0.0.1")
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="echoverse_metrics_http", daemon=True).start()
+        logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+
+    if path:
+        def write_periodically():
+            while True:
+                try:
+                    get_metrics().write_file(path)
+                except OSError as e:
+                    logger.warning("Could not write metrics file %s: %s", path, e)
+                time.sleep(interval_seconds)
+
+        threading.Thread(target=write_periodically, name="echoverse_metrics_file", daemon=True).start()
+        logger.info("Writing metrics to %s every %.0fs", path, interval_seconds)
+
+
+class Span:
+    def __init__(self, name: str, parent: "Span" = None, attributes: dict = None):
+        """One timed step of a request; spans nest through a context variable"""
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.duration = None
+
+    def set(self, **attributes):
+        """Attach attributes known only once the step has run (token counts, sizes, ...)"""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+_current_span = contextvars.ContextVar("echoverse_current_span", default=None)
+_trace_file_lock = threading.Lock()
+
+
+def tracing_enabled() -> bool:
+    """Spans are recorded when ECHOVERSE_TRACE=1 or ECHOVERSE_TRACE_FILE is set"""
+    return os.getenv("ECHOVERSE_TRACE", "0") == "1" or bool(os.getenv("ECHOVERSE_TRACE_FILE"))
+
+
+def _emit(span: Span):
+    record = json.dumps(span.to_dict(), default=str)
+    path = os.getenv("ECHOVERSE_TRACE_FILE")
+    if path:
+        with _trace_file_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(record + "\n")
+    else:
+        trace_logger.info(record)
+
+
+@contextmanager
+def trace_span(name: str, **attributes):
+    """
+    Time a pipeline step
+
+    The duration always goes into echoverse_stage_seconds{stage=name}. With
+    tracing enabled the step is also recorded as a span (a JSON line with
+    trace/parent IDs), nested under whichever span is active in this context.
+
+    Args:
+        name: Stage name
+        **attributes: Extra span attributes
+    """
+    span = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.set(error=type(e).__name__)
+        raise
+    finally:
+        span.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        STAGE_SECONDS.observe(span.duration, stage=name)
+        if tracing_enabled():
+            _emit(span)
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class RewriteCache:
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None):
+        """
+        In-memory memoization of rewrite results with TTL and size-bound eviction
+
+        Concurrent lookups of the same key are coalesced: the first caller runs
+        the computation and the others wait for its result.
+
+        Args:
+            max_entries: Maximum number of cached results
+                (default: ECHOVERSE_REWRITE_CACHE_SIZE or 1024)
+            ttl_seconds: Lifetime of a cached result
+                (default: ECHOVERSE_REWRITE_CACHE_TTL or 3600)
+        """
+        self.max_entries = max_entries or int(os.getenv("ECHOVERSE_REWRITE_CACHE_SIZE", "1024"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("ECHOVERSE_REWRITE_CACHE_TTL", "3600"))
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recent first
+        self._in_flight = {}  # key -> Future
+
+    @staticmethod
+    def make_key(model_id: str, tone: str, max_length: int, text: str, parameters: dict) -> str:
+        """Hash of everything that determines a rewrite; whitespace in text is normalized"""
+        payload = json.dumps(
+            [model_id, tone, max_length, " ".join(text.split()), parameters],
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Cached result for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: str):
+        """Store a result, evicting the least recently used entries over the size bound"""
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        """
+        Return the cached result for key, computing it at most once at a time
+
+        Exceptions raised by compute propagate to every waiting caller and
+        nothing is cached.
+
+        Args:
+            key: Cache key from make_key
+            compute: Callable producing the result on a miss
+
+        Returns:
+            Cached or freshly computed result
+        """
+        value, future, leader = self.claim(key)
+        if future is None:
+            return value
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            self.resolve(key, error=e)
+            raise
+        self.resolve(key, value)
+        return value
+
+    def claim(self, key: str):
+        """
+        Look up key for a caller that computes misses itself, as rewrite batches do
+
+        Returns:
+            (value, None, False) on a hit. Otherwise (None, future, leader):
+            the leader must compute the result and pass it to resolve(); other
+            callers wait on the future, which the leader's resolve() completes.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], None, False
+                del self._entries[key]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, False
+            self.misses += 1
+            future = Future()
+            self._in_flight[key] = future
+            return None, future, True
+
+    def resolve(self, key: str, value: str = None, error: BaseException = None):
+        """Finish a key claimed as leader: cache value, or pass error to its waiters without caching"""
+        with self._lock:
+            future = self._in_flight.pop(key)
+            if error is None:
+                self._store(key, value)
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _store(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
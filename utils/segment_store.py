@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_EXTENSION = ".block"
+_INFO_EXTENSION = ".json"
+
+
+class StoredSegment(NamedTuple):
+    """A rendered narration segment: its narration text and its encoded audio block"""
+    key: str
+    text: str
+    samples: int
+    path: Path
+
+    def read_block(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class SegmentStore:
+    def __init__(self, store_dir: str = None, max_bytes: int = None):
+        """
+        Content-addressed on-disk store of rendered narration segments
+
+        A segment is one rewrite chunk of a document, stored as its narration
+        text plus its audio as a block from encode_block. Entries are named by
+        a hash of the source text and every render setting, so an edited
+        document finds its unchanged segments by key. The store is capped by
+        total file size and evicts least recently used entries.
+
+        Args:
+            store_dir: Directory for segment files
+                (default: ECHOVERSE_SEGMENT_STORE_DIR or ~/.cache/echoverse/segments)
+            max_bytes: Size cap in bytes
+                (default: ECHOVERSE_SEGMENT_STORE_MB megabytes, or 2048 MB)
+        """
+        self.store_dir = Path(store_dir or os.getenv("ECHOVERSE_SEGMENT_STORE_DIR")
+                              or Path.home() / ".cache" / "echoverse" / "segments")
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or int(float(os.getenv("ECHOVERSE_SEGMENT_STORE_MB", "2048")) * 1024 * 1024)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recent first
+        self._total_bytes = 0
+        self._load_index()
+
+    @staticmethod
+    def make_key(source_text: str, settings: dict) -> str:
+        """Hash of a segment's source text and everything that determines its rendering"""
+        payload = json.dumps([" ".join(source_text.split()), settings], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[StoredSegment]:
+        """Stored segment for key, or None on a miss"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        block_path, info_path = self._paths(key)
+        try:
+            with open(info_path, encoding="utf-8") as f:
+                info = json.load(f)
+            os.utime(block_path)  # Persist recency across restarts
+        except Exception:
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return StoredSegment(key, info["text"], info["samples"], block_path)
+
+    def put(self, key: str, text: str, block: bytes, samples: int) -> Optional[StoredSegment]:
+        """Store a segment, evicting old entries if the size cap is exceeded; None if it could not be written"""
+        block_path, info_path = self._paths(key)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            # Info first: a block on disk always has its info next to it
+            for path, data in ((info_path, json.dumps({"text": text, "samples": samples}).encode("utf-8")),
+                               (block_path, block)):
+                tmp_path = path.with_name(path.name + suffix)
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Error writing segment store entry: %s", e)
+            for path in (block_path, info_path):
+                path.with_name(path.name + suffix).unlink(missing_ok=True)
+            return None
+
+        size = block_path.stat().st_size + info_path.stat().st_size
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+        return StoredSegment(key, text, samples, block_path)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _paths(self, key: str):
+        return self.store_dir / f"{key}{_BLOCK_EXTENSION}", self.store_dir / f"{key}{_INFO_EXTENSION}"
+
+    def _load_index(self):
+        """Rebuild the LRU order from block modification times"""
+        files = []
+        for block_path in self.store_dir.glob(f"*{_BLOCK_EXTENSION}"):
+            try:
+                stat = block_path.stat()
+                size = stat.st_size + block_path.with_suffix(_INFO_EXTENSION).stat().st_size
+            except OSError:
+                continue
+            files.append((stat.st_mtime, block_path.stem, size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def _forget(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            for path in self._paths(key):
+                path.unlink(missing_ok=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_segment_store() -> SegmentStore:
+    """The process-wide segment store shared by all sessions"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SegmentStore()
+    return _store
@@ -1,28 +1,64 @@
 import streamlit as st
+import uuid
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from utils.audio_spill_store import AudioSpillStore, get_spill_store
+from utils.audio_clip import AudioClip
 
 class SessionManager:
-    def __init__(self):
+    def __init__(self, spill_store: AudioSpillStore = None):
         if 'narrations' not in st.session_state:
             st.session_state.narrations = []
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
+        self.session_id = st.session_state.session_id
+        self.spill_store = spill_store or get_spill_store()
     
     def add_narration(self, narration_data: Dict[str, Any]):
-        """Add a new narration to the session history"""
-        st.session_state.narrations.append(narration_data)
+        """Add a new narration to the session history, spilling its audio to disk"""
+        narration = dict(narration_data)
+        clip = narration.pop('audio', None)
+        if clip is not None:
+            # Only the encoded payload and its metadata outlive the request
+            narration['audio_ref'] = self.spill_store.put(self.session_id, clip.view())
+            narration['audio_size'] = clip.nbytes
+            narration['audio_format'] = clip.output_format
+            narration['audio_meta'] = clip.metadata
+        st.session_state.narrations.append(narration)
         
         # Keep only last 20 narrations to avoid memory issues
         if len(st.session_state.narrations) > 20:
+            for dropped in st.session_state.narrations[:-20]:
+                self._release(dropped)
             st.session_state.narrations = st.session_state.narrations[-20:]
     
     def get_narrations(self) -> List[Dict[str, Any]]:
         """Get all narrations from current session"""
         return st.session_state.narrations
     
+    def get_audio(self, narration: Dict[str, Any]) -> Optional[AudioClip]:
+        """Load a narration's audio from the spill store, or None if it was evicted"""
+        audio_ref = narration.get('audio_ref')
+        audio_data = self.spill_store.get(audio_ref) if audio_ref else None
+        if audio_data is None:
+            return None
+        return AudioClip.from_encoded(audio_data, narration.get('audio_format', 'wav'),
+                                      metadata=narration.get('audio_meta'))
+    
+    def has_audio(self, narration: Dict[str, Any]) -> bool:
+        """Whether a narration's audio is still available"""
+        return narration.get('audio_ref') in self.spill_store
+    
     def clear_history(self):
         """Clear narration history"""
+        for narration in st.session_state.narrations:
+            self._release(narration)
         st.session_state.narrations = []
     
+    def _release(self, narration: Dict[str, Any]):
+        if narration.get('audio_ref'):
+            self.spill_store.delete(narration['audio_ref'])
+    
     def get_timestamp(self) -> str:
         """Get current timestamp as formatted string"""
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from models.tts_generator import TTSGenerator
+from utils.audio_cache import AudioCache
+
+SAMPLE_RATE = 16000
+
+
+def noise(seed, seconds=0.5):
+    # Noise compresses poorly, so every entry has about the same FLAC size
+    return np.random.default_rng(seed).uniform(-0.5, 0.5, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+
+def entry_size(tmp_path):
+    probe = AudioCache(str(tmp_path / "probe"))
+    probe.put("probe", noise(0), SAMPLE_RATE)
+    return probe.stats()["bytes"]
+
+
+def test_round_trip(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    audio = noise(1)
+    cache.put("key", audio, SAMPLE_RATE)
+    np.testing.assert_allclose(cache.get("key"), audio, atol=1 / 32767)
+    assert cache.get("other") is None
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 1
+
+
+@pytest.mark.parametrize("changed", [
+    ("hello", 9000, 1.0, "rev-2"),
+    ("hello", 5000, 1.0, "rev-1"),
+    ("hello", 9000, 1.25, "rev-1"),
+    ("hello!", 9000, 1.0, "rev-1"),
+])
+def test_key_changes_with_every_synthesis_input(changed):
+    assert AudioCache.make_key(*changed) != AudioCache.make_key("hello", 9000, 1.0, "rev-1")
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    size = entry_size(tmp_path)
+    cache = AudioCache(str(tmp_path / "cache"), max_bytes=int(size * 3.5))
+    for key in "abc":
+        cache.put(key, noise(ord(key)), SAMPLE_RATE)
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.put("d", noise(4), SAMPLE_RATE)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= stats["max_bytes"]
+    assert not (tmp_path / "cache" / "b.flac").exists()
+
+
+def test_cap_is_enforced_when_reopened_smaller(tmp_path):
+    size = entry_size(tmp_path)
+    cache = AudioCache(str(tmp_path / "cache"))
+    for key in "abc":
+        cache.put(key, noise(ord(key)), SAMPLE_RATE)
+    reopened = AudioCache(str(tmp_path / "cache"), max_bytes=int(size * 2.5))
+    assert reopened.stats()["entries"] == 2
+
+
+class CountingSynthesis:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, items):
+        self.calls += len(items)
+        return [noise(len(text)) for text, _ in items]
+
+
+@pytest.mark.parametrize("voice, speed, revision, reused", [
+    (9000, 1.0, "rev-1", True),
+    (5000, 1.0, "rev-1", False),
+    (9000, 1.5, "rev-1", False),
+    (9000, 1.0, "rev-2", False),
+])
+def test_generator_reuses_chunks_only_for_identical_settings(tmp_path, voice, speed, revision, reused):
+    generator = TTSGenerator.__new__(TTSGenerator)  # Only the cache path is exercised, not the models
+    generator.audio_cache = AudioCache(str(tmp_path))
+    generator.model_revision = "rev-1"
+    synthesis = CountingSynthesis()
+    generator._synthesize_chunks([("It was late.", 9000)], 1.0, synthesize=synthesis)
+
+    generator.model_revision = revision
+    result = generator._synthesize_chunks([("It was late.", voice)], speed, synthesize=synthesis)
+    assert synthesis.calls == (1 if reused else 2)
+    assert result[0] is not None
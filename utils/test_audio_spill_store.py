@@ -0,0 +1,102 @@
+import pytest
+
+from utils import audio_spill_store
+from utils.audio_spill_store import AudioSpillStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AudioSpillStore(str(tmp_path), session_budget_bytes=250, global_budget_bytes=500)
+    yield store
+    store.close()
+
+
+def payload(tag):
+    return bytes([tag]) * 100
+
+
+def test_round_trip(store):
+    key = store.put("a", payload(1))
+    assert key in store
+    assert store.get(key) == payload(1)
+    assert store.session_bytes("a") == 100
+
+
+def test_session_budget_evicts_least_recent_entry_of_that_session(store):
+    first = store.put("a", payload(1))
+    second = store.put("a", payload(2))
+    other = store.put("b", payload(9))
+    store.get(first)  # first is now more recent than second
+    third = store.put("a", payload(3))
+
+    assert store.get(second) is None
+    assert second not in store
+    assert not store._path(second).exists()
+    assert store.get(first) == payload(1)
+    assert store.get(third) == payload(3)
+    assert store.get(other) == payload(9)
+    assert store.session_bytes("a") == 200
+    assert store.stats()["evictions"] == 1
+
+
+def test_newest_entry_survives_its_own_session_budget(store):
+    key = store.put("a", b"x" * 400)
+    assert store.get(key) == b"x" * 400
+    assert store.stats()["evictions"] == 0
+
+
+def test_global_budget_evicts_across_sessions(store):
+    keys = [store.put(session, payload(i)) for i, session in enumerate(["a", "b", "c", "d", "e"])]
+    assert store.stats()["bytes"] == 500
+
+    newest = store.put("f", payload(6))
+    assert store.get(keys[0]) is None
+    assert store.session_bytes("a") == 0
+    assert all(store.get(key) is not None for key in keys[1:] + [newest])
+    stats = store.stats()
+    assert stats["bytes"] == 500
+    assert stats["sessions"] == 5
+    assert stats["evictions"] == 1
+
+
+def test_drop_session_removes_only_its_files(store):
+    mine = [store.put("a", payload(1)), store.put("a", payload(2))]
+    theirs = store.put("b", payload(3))
+    store.drop_session("a")
+
+    assert all(key not in store and not store._path(key).exists() for key in mine)
+    assert store.get(theirs) == payload(3)
+    assert store.stats()["bytes"] == 100
+
+
+def test_missing_file_reads_as_evicted(store):
+    key = store.put("a", payload(1))
+    store._path(key).unlink()
+    assert store.get(key) is None
+    assert key not in store
+    assert store.session_bytes("a") == 0
+
+
+def test_close_deletes_directory(tmp_path):
+    store = AudioSpillStore(str(tmp_path))
+    store.put("a", payload(1))
+    store.close()
+    assert not store.directory.exists()
+    assert store.stats()["entries"] == 0
+
+
+def test_startup_clears_directories_of_dead_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_spill_store, "_process_alive", lambda pid: pid != 99999)
+    dead = tmp_path / f"{audio_spill_store.SPILL_PREFIX}99999_abc"
+    alive = tmp_path / f"{audio_spill_store.SPILL_PREFIX}12345_abc"
+    for directory in (dead, alive):
+        directory.mkdir()
+        (directory / "x.audio").write_bytes(payload(1))
+    unrelated = tmp_path / "unrelated"
+    unrelated.mkdir()
+
+    store = AudioSpillStore(str(tmp_path))
+    assert not dead.exists()
+    assert alive.exists() and unrelated.exists()
+    assert store.directory.exists()
+    store.close()
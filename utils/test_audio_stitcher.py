@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from utils.audio_stitcher import AudioStitcher
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, amplitude=0.5, frequency=220):
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
+
+def test_segments_overlap_by_the_crossfade():
+    stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, crossfade_ms=30.0, output_format=None)
+    for _ in range(3):
+        stitcher.add(tone(0.5))
+    samples = stitcher.finish_samples()
+    crossfade = int(SAMPLE_RATE * 0.03)
+    assert stitcher.segment_count == 3
+    assert samples.size == 3 * int(0.5 * SAMPLE_RATE) - 2 * crossfade
+
+
+def test_segments_are_normalized_to_the_target_loudness():
+    stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, crossfade_ms=0.0, target_rms_db=-20.0, output_format=None)
+    stitcher.add(tone(0.5, amplitude=0.01))
+    stitcher.add(tone(0.5, amplitude=0.9))
+    samples = stitcher.finish_samples()
+    half = samples.size // 2
+    for segment in (samples[:half], samples[half:]):
+        assert 20 * np.log10(np.sqrt(np.mean(np.square(segment)))) == pytest.approx(-20.0, abs=0.1)
+
+
+def test_silence_is_left_untouched():
+    stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, output_format=None)
+    stitcher.add(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    assert not stitcher.finish_samples().any()
+
+
+def test_encoded_wav_matches_clip_metadata():
+    stitcher = AudioStitcher(sample_rate=SAMPLE_RATE, output_format="wav")
+    stitcher.add(tone(0.4))
+    stitcher.add(tone(0.6, frequency=330))
+    expected = stitcher.duration
+    clip = stitcher.finish_clip()
+    decoded, sample_rate = sf.read(io.BytesIO(clip.encoded), dtype="float32")
+    assert sample_rate == SAMPLE_RATE
+    assert len(decoded) == clip.metadata.frames == stitcher.total_samples
+    assert clip.duration == pytest.approx(expected)
+    assert np.abs(decoded).max() <= 0.95 + 1e-3
@@ -0,0 +1,69 @@
+import io
+
+from utils import book_index
+from utils.book_index import BookIndex, OPENING_TITLE, MIN_SECTION_CHARS
+
+FILLER = " ".join(["The river ran past the mill, and the miller’s daughter watched it go."] * 10)
+
+
+def book(*parts):
+    return io.BytesIO("\n\n".join(parts).encode("utf-8"))
+
+
+def test_sections_start_at_headings_and_cover_the_text():
+    stream = book("A short foreword before the story.", "Chapter 1", FILLER, "CHAPTER TWO: The Mill", FILLER,
+                  "# Epilogue", "Years later.")
+    index = BookIndex.build(stream)
+    assert [section.title for section in index.sections] == [
+        OPENING_TITLE, "Chapter 1", "CHAPTER TWO: The Mill", "Epilogue"]
+    assert index.sections[0].start == 0
+    assert index.sections[-1].end == index.size == len(stream.getvalue())
+    for previous, section in zip(index.sections, index.sections[1:]):
+        assert previous.end == section.start
+    assert index.characters == len(stream.getvalue().decode("utf-8"))
+
+
+def test_read_round_trips_multibyte_text():
+    stream = book("Chapter 1", FILLER, "Chapter 2", "Ünïcödé — “quoted” text, 日本語.")
+    index = BookIndex.build(stream)
+    assert index.read(stream) == stream.getvalue().decode("utf-8")
+    assert index.read(stream, index.sections[1:]) == "Chapter 2\n\nÜnïcödé — “quoted” text, 日本語."
+
+
+def test_leading_heading_names_the_first_section():
+    index = BookIndex.build(book("Prologue", FILLER))
+    assert [section.title for section in index.sections] == ["Prologue"]
+
+
+def test_headings_closer_than_the_minimum_section_stay_together():
+    contents = "\n".join(f"Chapter {number}" for number in range(1, 4))
+    stream = book("Contents", contents, "Chapter 1", FILLER)
+    index = BookIndex.build(stream)
+    assert len(contents) < MIN_SECTION_CHARS
+    assert [section.title for section in index.sections] == [OPENING_TITLE, "Chapter 1"]
+
+
+def test_text_without_headings_is_cut_into_parts(monkeypatch):
+    monkeypatch.setattr(book_index, "MAX_SECTION_CHARS", 2000)
+    stream = io.BytesIO(f"{FILLER}\n".encode("utf-8") * 10)
+    index = BookIndex.build(stream)
+    assert len(index.sections) > 1
+    assert index.sections[1].title == f"{OPENING_TITLE} (2)"
+    text = stream.getvalue().decode("utf-8")
+    assert index.read(stream).split() == text.split()
+
+
+def test_preview_reads_only_the_opening():
+    stream = book("Chapter 1", FILLER)
+    index = BookIndex.build(stream)
+    assert index.preview(stream, index.sections[0], characters=20) == "Chapter 1\n\nThe river..."
+
+
+def test_multibyte_characters_split_across_reads_are_counted_once(monkeypatch):
+    monkeypatch.setattr(book_index, "READ_BYTES", 16)
+    text = "\ufeffChapter 1\n\n" + "日本語の本。" * 50
+    stream = io.BytesIO(text.encode("utf-8"))
+    index = BookIndex.build(stream)
+    assert [section.title for section in index.sections] == ["Chapter 1"]
+    assert index.characters == len(text) - 1
+    assert index.read(stream) == text.lstrip("\ufeff")
@@ -0,0 +1,57 @@
+from utils.dialogue import Line, cast_voices, format_script, parse_dialogue
+
+
+def speakers(lines):
+    return [(line.speaker, line.text) for line in lines]
+
+
+def test_speech_verb_after_the_quote():
+    lines = parse_dialogue('"We should leave tonight," said Alice.')
+    assert speakers(lines) == [("Alice", "We should leave tonight"), (None, "said Alice.")]
+
+
+def test_speech_verb_before_the_quote():
+    lines = parse_dialogue('Mrs. Grey asked, "Where were you?"')
+    assert speakers(lines) == [(None, "Mrs. Grey asked"), ("Mrs. Grey", "Where were you?")]
+
+
+def test_action_beat_names_the_speaker():
+    lines = parse_dialogue('Bob shook his head. "Not yet."')
+    assert lines[-1] == Line("Not yet.", "Bob")
+
+
+def test_unattributed_speech_alternates_between_the_last_two_speakers():
+    text = '\n\n'.join([
+        '"Ready?" asked Alice.',
+        '"Almost," Bob said.',
+        '"Then hurry."',
+        '"I am hurrying."',
+    ])
+    voiced = [line.speaker for line in parse_dialogue(text) if line.speaker]
+    assert voiced == ["Alice", "Bob", "Alice", "Bob"]
+
+
+def test_pronoun_attribution_is_narrated():
+    lines = parse_dialogue('"Go home," he said.')
+    assert all(line.speaker is None for line in lines)
+
+
+def test_script_tags():
+    text = "ALICE: Where were you?\nBOB: Out.\nNote: this line is narration."
+    assert speakers(parse_dialogue(text)) == [
+        ("Alice", "Where were you?"), ("Bob", "Out."), (None, "Note: this line is narration.")]
+
+
+def test_adjacent_lines_of_one_speaker_are_merged():
+    lines = parse_dialogue("The door opened.\n\nRain fell.")
+    assert lines == [Line("The door opened.\n\nRain fell.", None)]
+
+
+def test_cast_skips_the_narrator_voice_and_cycles():
+    lines = [Line("a", None), Line("b", "Alice"), Line("c", "Bob"), Line("d", "Cy"), Line("e", "Alice")]
+    assert cast_voices(lines, 9000, [9000, 5000, 1234]) == {None: 9000, "Alice": 5000, "Bob": 1234, "Cy": 5000}
+    assert cast_voices(lines, 9000, [9000]) == {None: 9000, "Alice": 9000, "Bob": 9000, "Cy": 9000}
+
+
+def test_format_script():
+    assert format_script([Line("It was late.", None), Line("Hello.", "Alice")]) == "It was late.\n\nAlice: Hello."
@@ -0,0 +1,51 @@
+import pickle
+
+import numpy as np
+import pytest
+import torch
+
+from models.tts_generator import TTSGenerator
+from utils.embedding_bank import EmbeddingBank
+
+
+@pytest.fixture
+def bank(tmp_path):
+    legacy = {9000: torch.arange(8.0).unsqueeze(0), 42: torch.full((1, 8), 0.5)}
+    pickle_path = tmp_path / "speaker_embeddings.pkl"
+    with open(pickle_path, "wb") as f:
+        pickle.dump(legacy, f)
+    return EmbeddingBank.from_pickle(str(pickle_path), str(tmp_path / "voices"), metadata={9000: {"name": "Tina"}})
+
+
+def test_from_pickle_round_trips_every_voice(bank):
+    assert sorted(bank.ids()) == [42, 9000]
+    assert bank.dim == 8 and len(bank) == 2
+    np.testing.assert_array_equal(bank.get(9000), np.arange(8.0, dtype=np.float32))
+    np.testing.assert_array_equal(bank.get(42), np.full(8, 0.5, dtype=np.float32))
+    assert bank.metadata(9000) == {"source": "pickle", "name": "Tina"}
+
+
+def test_rows_are_read_only_views_of_a_memory_map(bank):
+    reopened = EmbeddingBank(str(bank.directory))
+    assert isinstance(reopened.matrix, np.memmap)
+    row = reopened.get(42)
+    assert not row.flags.writeable
+    with pytest.raises(ValueError):
+        row[0] = 1.0
+
+
+def test_mismatched_dimension_is_rejected(bank):
+    np.save(bank.directory / "embeddings.npy", np.zeros((2, 4), dtype=np.float32))
+    with pytest.raises(ValueError):
+        EmbeddingBank(str(bank.directory))
+
+
+def test_unknown_voice_falls_back_to_the_default(bank):
+    generator = TTSGenerator.__new__(TTSGenerator)  # Only the bank is needed, not the models
+    generator.voice_bank = bank
+    fallback = generator._get_speaker_embedding(1234)
+    assert fallback.shape == (1, 8)
+    torch.testing.assert_close(fallback, generator._get_speaker_embedding(9000))
+    # The returned tensor is a copy, safe to modify
+    fallback += 1
+    np.testing.assert_array_equal(bank.get(9000), np.arange(8.0, dtype=np.float32))
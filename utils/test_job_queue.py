@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from utils.job_queue import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=1, max_pending_per_owner=3)
+    yield queue
+    queue.close()
+
+
+def wait_finished(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not queue.get(job_id).finished:
+        assert time.monotonic() < deadline, f"job {job_id} did not finish"
+        time.sleep(0.005)
+    return queue.get(job_id)
+
+
+def blocking_job(started, release):
+    def run(job):
+        started.set()
+        while not release.wait(0.01):
+            job.update(message="Working")
+        return "released"
+    return run
+
+
+def test_completed_job_keeps_result(queue):
+    job = wait_finished(queue, queue.submit("a", lambda job, x: x * 2, 21))
+    assert job.state == DONE
+    assert job.result == 42
+    assert job.progress == 1.0 and job.error is None
+
+
+def test_failed_job_records_error(queue):
+    def boom(job):
+        job.update(0.5, "Halfway", partial=[1])
+        raise ValueError("vocoder exploded")
+
+    job = wait_finished(queue, queue.submit("a", boom))
+    assert job.state == FAILED
+    assert job.error == "vocoder exploded"
+    assert job.message == "Failed: vocoder exploded"
+    assert job.result is None and job.details == {}
+    assert job.progress == 0.5
+
+
+def test_cancel_running_job_stops_at_next_update(queue):
+    started, release = threading.Event(), threading.Event()
+    job_id = queue.submit("a", blocking_job(started, release))
+    assert started.wait(5)
+    assert queue.get(job_id).state == RUNNING
+
+    assert queue.cancel(job_id)
+    job = wait_finished(queue, job_id)
+    assert job.state == CANCELLED
+    assert job.result is None and job.message == "Cancelled"
+
+
+def test_cancel_queued_job_never_runs(queue):
+    started, release = threading.Event(), threading.Event()
+    blocker = queue.submit("a", blocking_job(started, release))
+    assert started.wait(5)
+    ran = []
+    queued = queue.submit("a", lambda job: ran.append(job))
+    assert queue.get(queued).state == QUEUED
+
+    assert queue.cancel(queued)
+    assert queue.get(queued).state == CANCELLED
+    release.set()
+    assert wait_finished(queue, blocker).state == DONE
+    assert ran == []
+
+
+def test_cancel_finished_or_unknown_job_is_refused(queue):
+    job_id = queue.submit("a", lambda job: None)
+    wait_finished(queue, job_id)
+    assert not queue.cancel(job_id)
+    assert queue.get(job_id).state == DONE
+    assert not queue.cancel("missing")
+
+
+def test_pending_limit_counts_only_unfinished_jobs(queue):
+    started, release = threading.Event(), threading.Event()
+    blocker = queue.submit("a", blocking_job(started, release))
+    queue.submit("a", lambda job: None)
+    queue.submit("a", lambda job: None)
+    with pytest.raises(RuntimeError, match="Too many queued jobs"):
+        queue.submit("a", lambda job: None)
+    queue.submit("b", lambda job: None)
+
+    queue.cancel(blocker)
+    wait_finished(queue, blocker)
+    queue.submit("a", lambda job: None)
@@ -0,0 +1,118 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import rewrite_cache
+from utils.rewrite_cache import RewriteCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the cache's view of time, not the time module itself
+    monkeypatch.setattr(rewrite_cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_key_normalizes_whitespace_only():
+    key = RewriteCache.make_key("model", "neutral", 300, "It  was\nlate.", {"do_sample": False})
+    assert key == RewriteCache.make_key("model", "neutral", 300, "It was late.", {"do_sample": False})
+    assert key != RewriteCache.make_key("model", "suspenseful", 300, "It was late.", {"do_sample": False})
+    assert key != RewriteCache.make_key("other", "neutral", 300, "It was late.", {"do_sample": False})
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = RewriteCache(ttl_seconds=60)
+    cache.put("key", "value")
+    clock.now += 59
+    assert cache.get("key") == "value"
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_are_recomputed(clock):
+    cache = RewriteCache(ttl_seconds=60)
+    calls = []
+    compute = lambda: calls.append(1) or f"value {len(calls)}"
+    assert cache.get_or_compute("key", compute) == "value 1"
+    assert cache.get_or_compute("key", compute) == "value 1"
+    clock.now += 61
+    assert cache.get_or_compute("key", compute) == "value 2"
+
+
+def test_size_bound_evicts_least_recently_used():
+    cache = RewriteCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = RewriteCache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        assert release.wait(5)
+        return "rewritten"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 4:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["rewritten"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = RewriteCache()
+    release = threading.Event()
+
+    def compute():
+        assert release.wait(5)
+        raise ConnectionError("down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_compute("key", compute)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 3
+    assert cache.get_or_compute("key", lambda: "ok") == "ok"
@@ -0,0 +1,41 @@
+import pytest
+
+from utils.text_chunker import TextChunker
+
+
+def test_sentences_are_packed_up_to_the_budget():
+    text = "One two three. Four five six. Seven eight nine."
+    assert TextChunker(max_tokens=30).split(text) == ["One two three. Four five six.", "Seven eight nine."]
+
+
+def test_chunks_never_span_a_paragraph_break():
+    chunks = TextChunker(max_tokens=1000).split("First paragraph.\n\nSecond\nparagraph.")
+    assert chunks == ["First paragraph.", "Second paragraph."]
+
+
+def test_oversized_sentence_splits_on_clauses_then_words():
+    sentence = "alpha beta gamma, delta epsilon zeta, eta theta iota kappa lambda mu nu xi omicron"
+    chunks = TextChunker(max_tokens=20).split(sentence)
+    assert chunks[:2] == ["alpha beta gamma,", "delta epsilon zeta,"]
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks) == sentence
+
+
+def test_long_word_is_hard_split():
+    assert TextChunker(max_tokens=4).split("abcdefghij") == ["abcd", "efgh", "ij"]
+
+
+def test_custom_token_counter():
+    words = lambda text: len(text.split())
+    chunks = TextChunker(max_tokens=5, count_tokens=words).split("a b. c d. e f g h i j.")
+    assert chunks == ["a b. c d.", "e f g h i", "j."]
+
+
+def test_empty_and_bytes_input():
+    assert TextChunker().split("  \n\n  ") == []
+    assert TextChunker().split("Caf\xe9 au lait.".encode("utf-8")) == ["Caf\xe9 au lait."]
+
+
+def test_budget_must_be_positive():
+    with pytest.raises(ValueError):
+        TextChunker(max_tokens=0)
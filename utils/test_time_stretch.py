@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from utils.time_stretch import iter_time_stretch, time_stretch
+
+SAMPLE_RATE = 16000
+
+
+def sine(frequency, seconds=1.0):
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return 0.5 * np.sin(2 * np.pi * frequency * t)
+
+
+def peak_frequency(audio):
+    spectrum = np.abs(np.fft.rfft(audio * np.hanning(audio.size)))
+    return np.argmax(spectrum) * SAMPLE_RATE / audio.size
+
+
+@pytest.mark.parametrize("rate", [0.5, 0.8, 1.25, 2.0])
+def test_length_scales_with_rate(rate):
+    audio = sine(220)
+    assert time_stretch(audio, rate, sample_rate=SAMPLE_RATE).size == int(round(audio.size / rate))
+
+
+@pytest.mark.parametrize("rate", [0.75, 1.5])
+def test_pitch_is_preserved(rate):
+    stretched = time_stretch(sine(440), rate, sample_rate=SAMPLE_RATE)
+    assert peak_frequency(stretched) == pytest.approx(440, abs=5)
+
+
+def test_blocks_join_to_the_whole_clip():
+    audio = sine(330, seconds=2.0)
+    blocks = list(iter_time_stretch(audio, 1.3, sample_rate=SAMPLE_RATE, block_frames=16))
+    assert len(blocks) > 1
+    np.testing.assert_array_equal(np.concatenate(blocks), time_stretch(audio, 1.3, sample_rate=SAMPLE_RATE))
+
+
+def test_unit_rate_and_empty_input_pass_through():
+    audio = sine(220, seconds=0.1)
+    np.testing.assert_array_equal(time_stretch(audio, 1.0), audio)
+    assert time_stretch(np.zeros(0, dtype=np.float32), 1.5).size == 0
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        list(iter_time_stretch(sine(220), 0))
@@ -0,0 +1,108 @@
+import re
+from typing import Callable, Iterator, List, Optional
+
+# Sentence boundaries: terminal punctuation (optionally followed by closing
+# quotes/brackets) and whitespace. Paragraph boundaries are blank lines.
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])[\"'”’)\]]*\s+")
+_CLAUSE_RE = re.compile(r"(?<=[,;:—])\s+")
+
+
+class TextChunker:
+    def __init__(self, max_tokens: int = 250, count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Split long text into token-budgeted chunks on sentence/paragraph boundaries
+
+        Args:
+            max_tokens: Maximum number of tokens per chunk
+            count_tokens: Callable returning the token count of a string
+                (defaults to the character count)
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens or len
+
+    def split(self, text: str) -> List[str]:
+        """
+        Split text into chunks that each fit within the token budget
+
+        Args:
+            text: Input text of any length
+
+        Returns:
+            List of non-empty chunks in reading order
+        """
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """Lazily yield chunks; sentences are packed until the budget is reached
+        and a chunk never spans a paragraph break."""
+        if isinstance(text, bytes):
+            text = text.decode('utf-8', errors='replace')
+
+        for paragraph in _PARAGRAPH_RE.split(text):
+            paragraph = " ".join(paragraph.split())
+            if not paragraph:
+                continue
+
+            current = []
+            current_tokens = 0
+            for sentence in self._iter_sentences(paragraph):
+                sentence_tokens = self.count_tokens(sentence)
+                # +1 accounts for the joining space
+                if current and current_tokens + sentence_tokens + 1 > self.max_tokens:
+                    yield " ".join(current)
+                    current = []
+                    current_tokens = 0
+                current.append(sentence)
+                current_tokens += sentence_tokens + (1 if len(current) > 1 else 0)
+            if current:
+                yield " ".join(current)
+
+    def _iter_sentences(self, paragraph: str) -> Iterator[str]:
+        """Yield sentences, breaking any sentence over the budget into smaller pieces"""
+        for sentence in _SENTENCE_RE.split(paragraph):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if self.count_tokens(sentence) <= self.max_tokens:
+                yield sentence
+            else:
+                yield from self._split_oversized(sentence)
+
+    def _split_oversized(self, sentence: str) -> Iterator[str]:
+        """Split an over-long sentence on clause punctuation, then on words"""
+        pieces = []
+        for clause in _CLAUSE_RE.split(sentence):
+            if self.count_tokens(clause) <= self.max_tokens:
+                pieces.append(clause)
+            else:
+                pieces.extend(clause.split())
+
+        current = ""
+        for piece in pieces:
+            candidate = f"{current} {piece}" if current else piece
+            if current and self.count_tokens(candidate) > self.max_tokens:
+                yield current
+                current = piece
+            else:
+                current = candidate
+            # A single word longer than the budget is hard-split
+            while self.count_tokens(current) > self.max_tokens:
+                cut = self._hard_cut(current)
+                yield current[:cut]
+                current = current[cut:]
+        if current:
+            yield current
+
+    def _hard_cut(self, text: str) -> int:
+        """Largest prefix length of text that fits within the budget"""
+        low, high = 1, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.count_tokens(text[:mid]) <= self.max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return low
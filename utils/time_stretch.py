@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def iter_time_stretch(audio: np.ndarray, rate: float, sample_rate: int = 16000,
+                      frame_ms: float = 32.0, block_frames: int = 256):
+    """
+    Pitch-preserving WSOLA time stretch, yielding the output in blocks
+
+    Frames are overlap-added at a fixed synthesis hop while the analysis hop
+    is scaled by rate. Each frame position is nudged within a small tolerance
+    to the point that best continues the previous frame, which keeps the
+    waveform phase-coherent without changing pitch. Working memory is bounded
+    by block_frames regardless of clip length.
+
+    Args:
+        audio: Mono float waveform
+        rate: Speed factor (> 1 is faster/shorter, < 1 is slower/longer)
+        sample_rate: Sample rate of audio, used to size frames
+        frame_ms: Analysis frame length in milliseconds
+        block_frames: Number of synthesis hops per yielded block
+
+    Yields:
+        Consecutive float32 blocks of the stretched waveform
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    x = np.asarray(audio, dtype=np.float32).flatten()
+    if rate == 1.0 or x.size == 0:
+        yield x.copy()
+        return
+
+    frame_length = max(32, int(sample_rate * frame_ms / 1000) // 2 * 2)
+    hop = frame_length // 2
+    analysis_hop = hop * rate
+    tolerance = frame_length // 8
+    # Periodic Hann windows at 50% overlap sum to one
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_length) / frame_length)).astype(np.float32)
+
+    out_length = int(round(x.size / rate))
+    frame_count = -(-out_length // hop) + 1
+
+    front = hop + tolerance
+    back = max(0, int(np.ceil(frame_count * analysis_hop)) + tolerance + frame_length + hop - x.size)
+    padded = np.concatenate([np.zeros(front, dtype=np.float32), x, np.zeros(back, dtype=np.float32)])
+
+    overlap = np.zeros(hop, dtype=np.float32)
+    block = np.empty(block_frames * hop, dtype=np.float32)
+    filled = 0
+    emitted = 0
+    previous = None
+
+    for k in range(frame_count):
+        nominal = front + int(round(k * analysis_hop)) - hop
+        if previous is None:
+            start = nominal
+        else:
+            # Pick the candidate most similar to the natural continuation of the previous frame
+            template = padded[previous + hop:previous + hop + frame_length]
+            region = padded[nominal - tolerance:nominal + tolerance + frame_length]
+            scores = np.correlate(region, template, mode="valid")
+            start = nominal - tolerance + int(np.argmax(scores))
+        previous = start
+
+        frame = padded[start:start + frame_length] * window
+        finished = overlap + frame[:hop]
+        overlap = frame[hop:]
+        if k == 0:
+            continue  # First half-frame lies before time zero
+
+        take = min(hop, out_length - emitted)
+        block[filled:filled + take] = finished[:take]
+        filled += take
+        emitted += take
+        if filled == block.size or emitted == out_length:
+            yield block[:filled].copy()
+            filled = 0
+        if emitted == out_length:
+            return
+
+
+def time_stretch(audio: np.ndarray, rate: float, sample_rate: int = 16000, frame_ms: float = 32.0) -> np.ndarray:
+    """
+    Pitch-preserving WSOLA time stretch of a whole clip
+
+    Args:
+        audio: Mono float waveform
+        rate: Speed factor (> 1 is faster/shorter, < 1 is slower/longer)
+        sample_rate: Sample rate of audio, used to size frames
+        frame_ms: Analysis frame length in milliseconds
+
+    Returns:
+        Stretched float32 waveform of length round(len(audio) / rate)
+    """
+    x = np.asarray(audio, dtype=np.float32).flatten()
+    out = np.empty(int(round(x.size / rate)) if rate > 0 else 0, dtype=np.float32)
+    position = 0
+    for block in iter_time_stretch(x, rate, sample_rate=sample_rate, frame_ms=frame_ms):
+        out[position:position + block.size] = block
+        position += block.size
+    return out[:position]